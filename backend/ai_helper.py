@@ -1,25 +1,66 @@
 import os
+import io
 import base64
+import asyncio
+import hashlib
 from typing import Optional
 from dotenv import load_dotenv
 from openai import AsyncOpenAI
+from PIL import Image
 
 load_dotenv()
 
 # Use Emergent LLM API key from environment
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
 
+# "openai", or "fake" for deterministic local captions in development and tests
+CAPTION_MODEL = os.environ.get('CAPTION_MODEL', 'openai')
+
 client = AsyncOpenAI(
     api_key=EMERGENT_LLM_KEY,
     base_url="https://api.emergentagent.com/v1"
 ) if EMERGENT_LLM_KEY else None
 
+# The vision request uses detail "low", which the model sees at 512px anyway
+CAPTION_IMAGE_MAX_SIDE = 512
+
+
+def downscale_image(image_content: bytes, max_side: int = CAPTION_IMAGE_MAX_SIDE) -> bytes:
+    """
+    Shrink an image to fit max_side x max_side and re-encode it as JPEG.
+    Returns the original bytes if the image cannot be decoded.
+    """
+    try:
+        with Image.open(io.BytesIO(image_content)) as img:
+            img.thumbnail((max_side, max_side))
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            out = io.BytesIO()
+            img.save(out, format="JPEG", quality=80)
+            return out.getvalue()
+    except Exception:
+        return image_content
+
+
+async def fake_image_caption(image_content: bytes, context: str = "hotel") -> dict:
+    """Deterministic caption derived from the image bytes; never calls a model."""
+    digest = hashlib.sha256(image_content).hexdigest()[:8]
+    return {
+        "caption": f"Spencer Green Hotel {context} {digest}",
+        "alt_text": f"Spencer Green Hotel Batu {context} image {digest}",
+        "success": True
+    }
+
 
 async def generate_image_caption(image_content: bytes, context: str = "hotel") -> dict:
     """
     Generate caption and alt text for an image using GPT-4 Vision.
+    The image is downscaled to CAPTION_IMAGE_MAX_SIDE before encoding.
     Returns dict with 'caption' and 'alt_text' keys.
     """
+    if CAPTION_MODEL == "fake":
+        return await fake_image_caption(image_content, context)
+    
     if not client:
         return {
             "caption": "",
@@ -29,8 +70,9 @@ async def generate_image_caption(image_content: bytes, context: str = "hotel") -
         }
     
     try:
-        # Convert image bytes to base64
-        base64_image = base64.b64encode(image_content).decode('utf-8')
+        # Downscaled images are re-encoded as JPEG; base64 only what the model sees
+        small_image = await asyncio.to_thread(downscale_image, image_content)
+        base64_image = base64.b64encode(small_image).decode('utf-8')
         
         # Determine image type (assume jpeg if unknown)
         image_type = "image/jpeg"
@@ -174,3 +216,32 @@ async def translate_content(text: str, target_language: str) -> str:
         return response.choices[0].message.content.strip()
     except Exception:
         return text
+
+
+async def translate_batch(texts: list, target_language: str) -> Optional[list]:
+    """
+    Translate several strings in a single request.
+    Returns translations in input order, or None if the batch failed.
+    """
+    if not client:
+        return None
+    
+    import json
+    try:
+        lang_map = {"zh": "Chinese (Mandarin, Simplified)", "en": "English", "id": "Indonesian"}
+        target = lang_map.get(target_language, "English")
+        response = await client.chat.completions.create(
+            model="gpt-4o-mini",
+            messages=[
+                {"role": "system", "content": f"""Translate each string of the JSON array to {target}.
+Respond ONLY with a JSON array of the translations, same length and order as the input."""},
+                {"role": "user", "content": json.dumps(texts, ensure_ascii=False)}
+            ]
+        )
+        result_text = response.choices[0].message.content.strip()
+        result = json.loads(result_text[result_text.index("["):result_text.rindex("]") + 1])
+        if not isinstance(result, list) or len(result) != len(texts):
+            return None
+        return [str(t).strip() for t in result]
+    except Exception:
+        return None
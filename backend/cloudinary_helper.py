@@ -1,11 +1,26 @@
 import cloudinary
 import cloudinary.uploader
-from cloudinary.api import delete_resources_by_prefix
+import cloudinary.api
+from cloudinary import exceptions as cloudinary_errors
+from cloudinary.utils import api_sign_request, verify_api_response_signature, verify_notification_signature
 import os
+import hashlib
+import time
+import uuid
+import random
+import asyncio
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
 from typing import Optional, List
 
-from config import CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET
+from config import (
+    CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY, CLOUDINARY_API_SECRET,
+    MEDIA_BACKEND, MEDIA_MAX_WORKERS, MEDIA_MAX_RETRIES,
+    MEDIA_IMAGE_CONCURRENCY, MEDIA_VIDEO_CONCURRENCY, MEDIA_ADMIN_CONCURRENCY,
+    MEDIA_IMAGE_TIMEOUT_SECONDS, MEDIA_VIDEO_TIMEOUT_SECONDS, MEDIA_ADMIN_TIMEOUT_SECONDS
+)
 
 logger = logging.getLogger(__name__)
 
@@ -22,10 +37,268 @@ ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png", "image/webp", "image/jpg"}
 ALLOWED_VIDEO_TYPES = {"video/mp4", "video/quicktime", "video/mpeg"}
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_VIDEO_SIZE = 500 * 1024 * 1024  # 500MB
+VIDEO_CHUNK_SIZE = 20 * 1024 * 1024  # upload_large chunk size (Cloudinary minimum is 5MB)
+
+# Responsive image widths. Each is generated eagerly on upload and delivered
+# as /upload/<responsive_transformation(width)>/..., the same transformation
+# the eager derivative was created with.
+IMAGE_WIDTHS = (400, 800, 1200, 1600)
+
+
+# ==================== STORAGE BACKENDS ====================
+
+class CloudinaryBackend:
+    """Synchronous Cloudinary SDK calls used by the helpers below."""
+
+    def upload(self, file, **params) -> dict:
+        if hasattr(file, "seek"):
+            file.seek(0)  # Retries re-send from the start
+        return cloudinary.uploader.upload(file, **params)
+
+    def upload_large(self, file, **params) -> dict:
+        if hasattr(file, "seek"):
+            file.seek(0)
+        return cloudinary.uploader.upload_large(file, **params)
+
+    def destroy(self, public_id: str, **params) -> dict:
+        return cloudinary.uploader.destroy(public_id, **params)
+
+    def delete_by_prefix(self, prefix: str, **params) -> dict:
+        return cloudinary.api.delete_resources_by_prefix(prefix, **params)
+
+    def delete_resources(self, public_ids: list, **params) -> dict:
+        return cloudinary.api.delete_resources(public_ids, **params)
+
+    def resources(self, **params) -> dict:
+        return cloudinary.api.resources(**params)
+
+    def resource(self, public_id: str, **params) -> dict:
+        return cloudinary.api.resource(public_id, **params)
+
+    def explicit(self, public_id: str, **params) -> dict:
+        return cloudinary.uploader.explicit(public_id, **params)
+
+    def sign_direct_upload(self, params: dict, resource_type: str) -> dict:
+        signed = dict(params)
+        signed["signature"] = api_sign_request(params, CLOUDINARY_API_SECRET)
+        signed["api_key"] = CLOUDINARY_API_KEY
+        return {
+            "upload_url": f"https://api.cloudinary.com/v1_1/{CLOUDINARY_CLOUD_NAME}/{resource_type}/upload",
+            "fields": signed
+        }
+
+    def verify_upload_response(self, public_id: str, version, signature: str) -> bool:
+        return verify_api_response_signature(public_id, version, signature)
+
+    def verify_notification(self, body: str, timestamp: int, signature: str) -> bool:
+        return verify_notification_signature(body, timestamp, signature)
+
+    def video_thumbnail_url(self, public_id: str) -> str:
+        return cloudinary.CloudinaryImage(public_id).build_url(
+            resource_type="video",
+            format="jpg",
+            transformation=[
+                {"width": 400, "height": 300, "crop": "fill", "gravity": "auto"},
+                {"start_offset": "auto"}
+            ]
+        )
+
+
+class FakeMediaBackend:
+    """
+    In-memory stand-in for Cloudinary (MEDIA_BACKEND=fake).
+
+    Returns responses shaped like the real API so routes and tests can run
+    without credentials or network access. Nothing is persisted.
+    """
+
+    BASE_URL = "https://fake-media.local"
+
+    def __init__(self):
+        self.assets = {}
+
+    @staticmethod
+    def _size(file) -> int:
+        if isinstance(file, (bytes, bytearray)):
+            return len(file)
+        if hasattr(file, "seek"):
+            file.seek(0, os.SEEK_END)
+            size = file.tell()
+            file.seek(0)
+            return size
+        if isinstance(file, str) and os.path.exists(file):
+            return os.path.getsize(file)
+        return 0
+
+    def upload(self, file, **params) -> dict:
+        resource_type = params.get("resource_type", "image")
+        public_id = params.get("public_id") or uuid.uuid4().hex[:20]
+        if params.get("folder"):
+            public_id = f"{params['folder']}/{public_id}"
+        file_format = params.get("format") or ("mp4" if resource_type == "video" else "jpg")
+        version = int(time.time())
+
+        asset = {
+            "public_id": public_id,
+            "resource_type": resource_type,
+            "type": "upload",
+            "format": file_format,
+            "version": version,
+            "width": None,
+            "height": None,
+            "bytes": self._size(file),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "secure_url": f"{self.BASE_URL}/{resource_type}/upload/v{version}/{public_id}.{file_format}",
+            "tags": params.get("tags", []),
+            "context": params.get("context", {}),
+            "eager": []
+        }
+        self.assets[(resource_type, public_id)] = asset
+        return dict(asset)
+
+    def upload_large(self, file, chunk_size: int = None, **params) -> dict:
+        return self.upload(file, **params)
+
+    def destroy(self, public_id: str, resource_type: str = "image", **params) -> dict:
+        found = self.assets.pop((resource_type, public_id), None)
+        return {"result": "ok" if found else "not found"}
+
+    def delete_by_prefix(self, prefix: str, resource_type: str = "image", **params) -> dict:
+        deleted = {}
+        for key in [k for k in self.assets if k[0] == resource_type and k[1].startswith(prefix)]:
+            self.assets.pop(key)
+            deleted[key[1]] = "deleted"
+        return {"deleted": deleted}
+
+    def delete_resources(self, public_ids: list, resource_type: str = "image", **params) -> dict:
+        deleted = {}
+        for public_id in public_ids:
+            found = self.assets.pop((resource_type, public_id), None)
+            deleted[public_id] = "deleted" if found else "not_found"
+        return {"deleted": deleted}
+
+    def resources(self, resource_type: str = "image", prefix: str = None, max_results: int = 50,
+                  next_cursor: str = None, **params) -> dict:
+        matches = sorted(
+            (a for (rtype, pid), a in self.assets.items()
+             if rtype == resource_type and (not prefix or pid.startswith(prefix))),
+            key=lambda a: a["created_at"],
+            reverse=True
+        )
+        offset = int(next_cursor or 0)
+        page = matches[offset:offset + max_results]
+        has_more = offset + max_results < len(matches)
+        return {
+            "resources": [dict(a) for a in page],
+            "next_cursor": str(offset + max_results) if has_more else None
+        }
+
+    def resource(self, public_id: str, resource_type: str = "image", **params) -> dict:
+        asset = self.assets.get((resource_type, public_id))
+        if not asset:
+            raise cloudinary_errors.NotFound(f"Resource not found - {public_id}")
+        return dict(asset)
+
+    def explicit(self, public_id: str, resource_type: str = "image", **params) -> dict:
+        return self.resource(public_id, resource_type=resource_type)
+
+    # Stands in for the API secret when signing and verifying
+    SECRET = "fake-media-secret"
+
+    def _sign(self, payload: str) -> str:
+        return hashlib.sha1((payload + self.SECRET).encode()).hexdigest()
+
+    def sign_direct_upload(self, params: dict, resource_type: str) -> dict:
+        payload = "&".join(f"{k}={v}" for k, v in sorted(params.items()))
+        return {
+            "upload_url": f"{self.BASE_URL}/{resource_type}/upload",
+            "fields": {**params, "signature": self._sign(payload), "api_key": "fake"}
+        }
+
+    def verify_upload_response(self, public_id: str, version, signature: str) -> bool:
+        return signature == self._sign(f"public_id={public_id}&version={version}")
+
+    def verify_notification(self, body: str, timestamp: int, signature: str, valid_for: int = 7200) -> bool:
+        # Same freshness check as cloudinary.utils.verify_notification_signature
+        if timestamp < time.time() - valid_for:
+            return False
+        return signature == self._sign(f"{body}{timestamp}")
+
+    def video_thumbnail_url(self, public_id: str) -> str:
+        return f"{self.BASE_URL}/video/upload/{public_id}.jpg"
+
+
+media_backend = FakeMediaBackend() if MEDIA_BACKEND == "fake" else CloudinaryBackend()
+
+
+# ==================== CALL RUNNER ====================
+
+# The SDK is blocking, so every call runs on a dedicated pool. Each kind of
+# operation has its own concurrency cap and timeout, so a few large video
+# uploads cannot starve image uploads or admin API calls.
+_executor = ThreadPoolExecutor(max_workers=MEDIA_MAX_WORKERS, thread_name_prefix="media")
+_limits = {
+    "image": asyncio.Semaphore(MEDIA_IMAGE_CONCURRENCY),
+    "video": asyncio.Semaphore(MEDIA_VIDEO_CONCURRENCY),
+    "admin": asyncio.Semaphore(MEDIA_ADMIN_CONCURRENCY)
+}
+_timeouts = {
+    "image": MEDIA_IMAGE_TIMEOUT_SECONDS,
+    "video": MEDIA_VIDEO_TIMEOUT_SECONDS,
+    "admin": MEDIA_ADMIN_TIMEOUT_SECONDS
+}
+
+# SDK errors that a retry cannot fix
+_PERMANENT_ERRORS = (
+    cloudinary_errors.BadRequest,
+    cloudinary_errors.AuthorizationRequired,
+    cloudinary_errors.NotAllowed,
+    cloudinary_errors.NotFound,
+    cloudinary_errors.AlreadyExists
+)
+
+RETRY_BASE_DELAY = 0.5
+RETRY_MAX_DELAY = 8.0
+
+
+async def _call(kind: str, func, *args, retry_on_timeout: bool = True, **kwargs):
+    """
+    Run a blocking storage call on the media pool.
+
+    Transient failures are retried up to MEDIA_MAX_RETRIES times with
+    exponential backoff and full jitter. Uploads pass retry_on_timeout=False,
+    since a timed-out upload may still have completed.
+    """
+    timeout = _timeouts[kind]
+    # The SDK's own socket timeout also frees the worker thread
+    kwargs.setdefault("timeout", timeout)
+    loop = asyncio.get_running_loop()
+
+    async with _limits[kind]:
+        for attempt in range(MEDIA_MAX_RETRIES + 1):
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(_executor, partial(func, *args, **kwargs)),
+                    timeout
+                )
+            except _PERMANENT_ERRORS:
+                raise
+            except asyncio.TimeoutError:
+                if not retry_on_timeout or attempt == MEDIA_MAX_RETRIES:
+                    raise Exception(f"timed out after {timeout:.0f}s")
+                error = "timeout"
+            except Exception as e:
+                if attempt == MEDIA_MAX_RETRIES:
+                    raise
+                error = str(e)
+
+            delay = random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt))
+            logger.warning(f"Media {kind} call failed ({error}), retry {attempt + 1} in {delay:.1f}s")
+            await asyncio.sleep(delay)
 
 
 async def upload_image(
-    file_content: bytes,
+    file_content,
     folder: str,
     eager_transforms: Optional[List[dict]] = None,
     force_format: str = None,
@@ -35,7 +308,7 @@ async def upload_image(
     Upload an image to Cloudinary with automatic optimization.
     
     Args:
-        file_content: The file bytes to upload
+        file_content: The file bytes or a binary file object to upload
         folder: Cloudinary folder path (e.g., "spencer-green/rooms")
         eager_transforms: List of eager transformations to apply
         force_format: Force specific format (e.g., "webp")
@@ -66,13 +339,11 @@ async def upload_image(
         if eager_transforms:
             upload_params["eager"] = eager_transforms
         else:
-            # Default transformations for hotel images
-            upload_params["eager"] = [
-                {"width": 400, "height": 300, "crop": "fill", "gravity": "auto", "quality": "auto"},
-                {"width": 800, "height": 600, "crop": "fill", "gravity": "auto", "quality": "auto"}
-            ]
+            # Responsive widths, so srcset derivatives are ready before the first visit
+            upload_params["eager"] = responsive_eager()
+            upload_params["eager_async"] = True
         
-        result = cloudinary.uploader.upload(file_content, **upload_params)
+        result = await _call("image", media_backend.upload, file_content, retry_on_timeout=False, **upload_params)
         
         return {
             "public_id": result.get("public_id"),
@@ -91,11 +362,14 @@ async def upload_image(
 
 
 async def upload_video(
-    file_content: bytes,
+    file_content,
     folder: str
 ) -> dict:
     """
     Upload a video to Cloudinary with automatic transcoding and thumbnail generation.
+    
+    The video is sent in VIDEO_CHUNK_SIZE chunks, so a file object is never
+    held in memory as a whole.
     """
     try:
         upload_params = {
@@ -110,17 +384,17 @@ async def upload_video(
             "eager_async": True
         }
         
-        result = cloudinary.uploader.upload(file_content, **upload_params)
+        result = await _call(
+            "video",
+            media_backend.upload_large,
+            file_content,
+            chunk_size=VIDEO_CHUNK_SIZE,
+            retry_on_timeout=False,
+            **upload_params
+        )
         
         # Generate thumbnail URL
-        thumbnail_url = cloudinary.CloudinaryImage(result.get("public_id")).build_url(
-            resource_type="video",
-            format="jpg",
-            transformation=[
-                {"width": 400, "height": 300, "crop": "fill", "gravity": "auto"},
-                {"start_offset": "auto"}
-            ]
-        )
+        thumbnail_url = media_backend.video_thumbnail_url(result.get("public_id"))
         
         return {
             "public_id": result.get("public_id"),
@@ -152,7 +426,9 @@ async def delete_media(public_id: str, resource_type: str = "image") -> dict:
         Dictionary containing deletion result
     """
     try:
-        result = cloudinary.uploader.destroy(
+        result = await _call(
+            "admin",
+            media_backend.destroy,
             public_id,
             resource_type=resource_type,
             invalidate=True
@@ -175,22 +451,75 @@ async def delete_media(public_id: str, resource_type: str = "image") -> dict:
         raise Exception(f"Cloudinary delete error: {str(e)}")
 
 
-async def delete_folder(folder_path: str) -> dict:
+# Admin API limit of public_ids per delete_resources call
+DELETE_BATCH_SIZE = 100
+
+
+async def delete_media_batch(public_ids: List[str], resource_type: str = "image") -> dict:
+    """
+    Delete many assets with one Admin API call per DELETE_BATCH_SIZE ids.
+    
+    Batches run concurrently within the admin call limit. A failed batch
+    marks its ids as "error" instead of failing the others.
+    
+    Returns:
+        Dictionary of public_id -> "deleted", "not_found" or "error: ..."
+    """
+    batches = [public_ids[i:i + DELETE_BATCH_SIZE] for i in range(0, len(public_ids), DELETE_BATCH_SIZE)]
+    
+    async def run(batch: List[str]) -> dict:
+        try:
+            result = await _call(
+                "admin",
+                media_backend.delete_resources,
+                batch,
+                resource_type=resource_type,
+                invalidate=True
+            )
+            deleted = result.get("deleted", {})
+            return {public_id: deleted.get(public_id, "not_found") for public_id in batch}
+        except Exception as e:
+            logger.error(f"Cloudinary batch delete error: {str(e)}")
+            return {public_id: f"error: {str(e)}" for public_id in batch}
+    
+    results = {}
+    for result in await asyncio.gather(*(run(b) for b in batches)):
+        results.update(result)
+    return results
+
+
+async def delete_folder(folder_path: str, resource_type: str = "image") -> dict:
     """
     Delete all media assets in a folder.
     
+    Cloudinary deletes at most 1000 assets per call and reports "partial"
+    when more remain, so the call is repeated until the folder is empty.
+    
     Args:
         folder_path: The folder path to delete (e.g., "spencer-green/rooms/room-123")
+        resource_type: Type of resource (image, video, raw)
     
     Returns:
         Dictionary containing deletion result
     """
     try:
-        result = delete_resources_by_prefix(folder_path, invalidate=True)
+        deleted = {}
+        while True:
+            result = await _call(
+                "admin",
+                media_backend.delete_by_prefix,
+                folder_path,
+                resource_type=resource_type,
+                invalidate=True
+            )
+            deleted.update(result.get("deleted", {}))
+            if not result.get("partial"):
+                break
         
         return {
             "success": True,
-            "deleted_count": result.get("deleted", {}),
+            "deleted_count": len(deleted),
+            "deleted": deleted,
             "folder": folder_path
         }
     except Exception as e:
@@ -268,7 +597,133 @@ def generate_upload_signature(params: dict = None) -> dict:
     }
 
 
-def list_gallery_images(folder_prefix: str = None, resource_type: str = "image", max_results: int = 50, next_cursor: str = None) -> dict:
+def responsive_transformation(width: int) -> str:
+    """Delivery transformation of one responsive width (never upscales)."""
+    return f"c_limit,q_auto,w_{width}"
+
+
+def responsive_eager() -> List[dict]:
+    """Eager transformations matching responsive_transformation() for IMAGE_WIDTHS."""
+    return [{"crop": "limit", "quality": "auto", "width": w} for w in IMAGE_WIDTHS]
+
+
+def derivative_url(secure_url: str, transformation: str) -> Optional[str]:
+    """
+    URL of a derivative of an uploaded image, or None if the URL is not a
+    Cloudinary-style /image/upload/ URL.
+    """
+    if not secure_url or "/image/upload/" not in secure_url:
+        return None
+    return secure_url.replace("/image/upload/", f"/image/upload/{transformation}/", 1)
+
+
+def public_id_from_url(url: str) -> Optional[str]:
+    """
+    Extract the public_id from a delivery URL.
+    URL format: https://res.cloudinary.com/{cloud}/image/upload/[{transformation}/][v{version}/]{public_id}.{format}
+    """
+    if not url or "/upload/" not in url:
+        return None
+    parts = url.split("/upload/", 1)[1].split("/")
+    # Drop transformation segments, then the version
+    while len(parts) > 1 and ("," in parts[0] or parts[0][:2] in ("c_", "w_", "h_", "q_", "f_")):
+        parts = parts[1:]
+    if len(parts) > 1 and parts[0].startswith("v") and parts[0][1:].isdigit():
+        parts = parts[1:]
+    path = "/".join(parts)
+    return path.rsplit(".", 1)[0] if "." in parts[-1] else path
+
+
+def build_derivatives(media: dict) -> List[dict]:
+    """
+    Responsive variants of an image asset, smallest first.
+    Widths at or above the original are left out; the original closes the
+    list when its width is known.
+    """
+    url = media.get("secure_url")
+    if (media.get("resource_type") or "image") != "image" or not derivative_url(url, ""):
+        return []
+    width, height = media.get("width"), media.get("height")
+    variants = []
+    for w in IMAGE_WIDTHS:
+        if width and w >= width:
+            break
+        variants.append({
+            "width": w,
+            "height": round(height * w / width) if width and height else None,
+            "format": media.get("format"),
+            "url": derivative_url(url, responsive_transformation(w))
+        })
+    if width:
+        variants.append({"width": width, "height": height, "format": media.get("format"), "url": url})
+    return variants
+
+
+async def generate_derivatives(public_id: str) -> dict:
+    """Ask Cloudinary to (re)generate the responsive derivatives of an existing image."""
+    return await _call(
+        "admin",
+        media_backend.explicit,
+        public_id,
+        type="upload",
+        resource_type="image",
+        eager=responsive_eager(),
+        eager_async=True
+    )
+
+
+def media_from_response(result: dict, resource_type: str = "image") -> dict:
+    """Normalize an Admin API or notification payload to the upload helpers' shape."""
+    media = {
+        "public_id": result.get("public_id"),
+        "secure_url": result.get("secure_url"),
+        "resource_type": result.get("resource_type"),
+        "format": result.get("format"),
+        "width": result.get("width"),
+        "height": result.get("height"),
+        "bytes": result.get("bytes"),
+        "created_at": result.get("created_at")
+    }
+    if resource_type == "video":
+        media["duration"] = result.get("duration")
+        media["thumbnail_url"] = media_backend.video_thumbnail_url(result.get("public_id"))
+    return media
+
+
+async def get_media(public_id: str, resource_type: str = "image") -> dict:
+    """Fetch an asset's authoritative metadata from the Admin API."""
+    result = await _call("admin", media_backend.resource, public_id, resource_type=resource_type)
+    return media_from_response(result, resource_type)
+
+
+def sign_direct_upload(public_id: str, resource_type: str, extra_params: dict = None) -> dict:
+    """
+    Sign a browser-to-Cloudinary upload for one fixed public_id.
+    
+    The public_id is part of the signature, so the browser cannot upload
+    anywhere else with it.
+    
+    Returns:
+        Dictionary with "upload_url" and the form "fields" to post with the file
+    """
+    params = {"public_id": public_id, "timestamp": int(time.time()), **(extra_params or {})}
+    return media_backend.sign_direct_upload(params, resource_type)
+
+
+def verify_upload_response(public_id: str, version, signature: str) -> bool:
+    """Check the signature Cloudinary returned to the browser for an upload."""
+    return media_backend.verify_upload_response(public_id, version, signature)
+
+
+def verify_notification(body: str, timestamp: int, signature: str) -> bool:
+    """
+    Check an upload notification webhook (X-Cld-Signature).
+    `timestamp` is the X-Cld-Timestamp header as an int; stale notifications fail.
+    """
+    return media_backend.verify_notification(body, timestamp, signature)
+
+
+async def list_gallery_images(folder_prefix: str = None, resource_type: str = "image", max_results: int = 50, next_cursor: str = None) -> dict:
     """
     List images from Cloudinary folder.
     
@@ -299,16 +754,14 @@ def list_gallery_images(folder_prefix: str = None, resource_type: str = "image",
         if next_cursor:
             params["next_cursor"] = next_cursor
             
-        print(f"DEBUG: Listing Cloudinary resources with params: {params}")
-        result = cloudinary.api.resources(**params)
-        print(f"DEBUG: Cloudinary list result count: {len(result.get('resources', []))}")
+        logger.debug(f"Listing Cloudinary resources with params: {params}")
+        result = await _call("admin", media_backend.resources, **params)
+        logger.debug(f"Cloudinary list result count: {len(result.get('resources', []))}")
         
         return {
             "resources": result.get("resources", []),
             "next_cursor": result.get("next_cursor")
         }
     except Exception as e:
-        error_msg = f"Cloudinary list resources error: {str(e)}"
-        print(f"DEBUG ERROR: {error_msg}")
-        logger.error(error_msg)
+        logger.error(f"Cloudinary list resources error: {str(e)}")
         return {"resources": [], "error": str(e)}
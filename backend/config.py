@@ -14,6 +14,36 @@ DB_NAME = os.environ.get('DB_NAME', "spencer_green_hms")
 JWT_SECRET = os.environ.get('JWT_SECRET', 'spencer-green-hotel-secret-key-2024')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
+PRINCIPAL_CACHE_TTL_SECONDS = int(os.environ.get('PRINCIPAL_CACHE_TTL_SECONDS', '30'))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.environ.get('PRINCIPAL_CACHE_MAX_ENTRIES', '1000'))
+
+# Password hashing
+BCRYPT_ROUNDS = int(os.environ.get('BCRYPT_ROUNDS', '12'))
+PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', '2'))
+PASSWORD_HASH_QUEUE_SIZE = int(os.environ.get('PASSWORD_HASH_QUEUE_SIZE', '32'))
+
+# Pricing
+QUOTE_EXPIRATION_MINUTES = int(os.environ.get('QUOTE_EXPIRATION_MINUTES', '30'))
+PRICING_CACHE_TTL_SECONDS = int(os.environ.get('PRICING_CACHE_TTL_SECONDS', '60'))
+
+# Inventory holds older than this without a settled booking are reaped (0 disables the sweep)
+HOLD_TIMEOUT_MINUTES = int(os.environ.get('HOLD_TIMEOUT_MINUTES', '15'))
+
+# Analytics write-behind buffer
+ANALYTICS_FLUSH_INTERVAL_SECONDS = float(os.environ.get('ANALYTICS_FLUSH_INTERVAL_SECONDS', '5'))
+ANALYTICS_MAX_PENDING_COUNTERS = int(os.environ.get('ANALYTICS_MAX_PENDING_COUNTERS', '5000'))
+ANALYTICS_EVENT_BATCH_SIZE = int(os.environ.get('ANALYTICS_EVENT_BATCH_SIZE', '500'))
+ANALYTICS_EVENT_MAX_LATENCY_SECONDS = float(os.environ.get('ANALYTICS_EVENT_MAX_LATENCY_SECONDS', '1'))
+ANALYTICS_EVENT_QUEUE_SIZE = int(os.environ.get('ANALYTICS_EVENT_QUEUE_SIZE', '10000'))
+
+# Audit log write-behind
+AUDIT_BATCH_SIZE = int(os.environ.get('AUDIT_BATCH_SIZE', '200'))
+AUDIT_MAX_LATENCY_SECONDS = float(os.environ.get('AUDIT_MAX_LATENCY_SECONDS', '1'))
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', '5000'))
+
+# Public response cache
+RESPONSE_CACHE_TTL_SECONDS = int(os.environ.get('RESPONSE_CACHE_TTL_SECONDS', '300'))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES', '1000'))
 
 # SMTP Email (Rackrock / cPanel)
 SMTP_HOST = os.environ.get('SMTP_HOST', 'mail.spencergreenhotel.com')
@@ -27,8 +57,42 @@ CLOUDINARY_CLOUD_NAME = os.environ.get('CLOUDINARY_CLOUD_NAME')
 CLOUDINARY_API_KEY = os.environ.get('CLOUDINARY_API_KEY')
 CLOUDINARY_API_SECRET = os.environ.get('CLOUDINARY_API_SECRET')
 
+# Media storage client ("cloudinary", or "fake" for local development and tests)
+MEDIA_BACKEND = os.environ.get('MEDIA_BACKEND', 'cloudinary')
+MEDIA_MAX_WORKERS = int(os.environ.get('MEDIA_MAX_WORKERS', '8'))
+MEDIA_IMAGE_CONCURRENCY = int(os.environ.get('MEDIA_IMAGE_CONCURRENCY', '4'))
+MEDIA_VIDEO_CONCURRENCY = int(os.environ.get('MEDIA_VIDEO_CONCURRENCY', '2'))
+MEDIA_ADMIN_CONCURRENCY = int(os.environ.get('MEDIA_ADMIN_CONCURRENCY', '4'))
+MEDIA_IMAGE_TIMEOUT_SECONDS = float(os.environ.get('MEDIA_IMAGE_TIMEOUT_SECONDS', '60'))
+MEDIA_VIDEO_TIMEOUT_SECONDS = float(os.environ.get('MEDIA_VIDEO_TIMEOUT_SECONDS', '900'))
+MEDIA_ADMIN_TIMEOUT_SECONDS = float(os.environ.get('MEDIA_ADMIN_TIMEOUT_SECONDS', '30'))
+MEDIA_MAX_RETRIES = int(os.environ.get('MEDIA_MAX_RETRIES', '3'))
+# Seconds between full re-syncs of the local media index with Cloudinary; 0 disables
+MEDIA_RECONCILE_INTERVAL_SECONDS = int(os.environ.get('MEDIA_RECONCILE_INTERVAL_SECONDS', '21600'))
+# Public URL of /api/media/webhooks/cloudinary; direct uploads notify it when set
+MEDIA_NOTIFICATION_URL = os.environ.get('MEDIA_NOTIFICATION_URL', '')
+
+# Outbound mail: concurrent sends (= pooled SMTP sessions) and retry schedule
+MAIL_CONCURRENCY = int(os.environ.get('MAIL_CONCURRENCY', '2'))
+SMTP_TIMEOUT_SECONDS = float(os.environ.get('SMTP_TIMEOUT_SECONDS', '30'))
+SMTP_IDLE_TIMEOUT_SECONDS = float(os.environ.get('SMTP_IDLE_TIMEOUT_SECONDS', '60'))
+# How often a cached email template re-checks its config version in the database
+EMAIL_TEMPLATE_CHECK_SECONDS = float(os.environ.get('EMAIL_TEMPLATE_CHECK_SECONDS', '60'))
+# Send rate (messages per second, 0 = unlimited) and burst size, per worker
+# process: with N uvicorn workers the overall rate is up to N times this
+MAIL_RATE_PER_SECOND = float(os.environ.get('MAIL_RATE_PER_SECOND', '5'))
+MAIL_RATE_BURST = int(os.environ.get('MAIL_RATE_BURST', '10'))
+MAIL_MAX_ATTEMPTS = int(os.environ.get('MAIL_MAX_ATTEMPTS', '6'))
+MAIL_RETRY_BASE_SECONDS = float(os.environ.get('MAIL_RETRY_BASE_SECONDS', '30'))
+MAIL_RETRY_MAX_SECONDS = float(os.environ.get('MAIL_RETRY_MAX_SECONDS', '3600'))
+
 # Emergent LLM
 EMERGENT_LLM_KEY = os.environ.get('EMERGENT_LLM_KEY', '')
+CAPTION_WORKERS = int(os.environ.get('CAPTION_WORKERS', '2'))
+CAPTION_QUEUE_SIZE = int(os.environ.get('CAPTION_QUEUE_SIZE', '500'))
+# Strings per translation request and concurrent text generation requests
+TRANSLATION_BATCH_SIZE = int(os.environ.get('TRANSLATION_BATCH_SIZE', '40'))
+AI_TEXT_CONCURRENCY = int(os.environ.get('AI_TEXT_CONCURRENCY', '4'))
 
 # Resend Email API
 RESEND_API_KEY = os.environ.get('RESEND_API_KEY', '')
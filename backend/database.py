@@ -1,6 +1,10 @@
+import logging
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, TEXT, IndexModel
 from config import MONGO_URL, DB_NAME
 
+logger = logging.getLogger(__name__)
+
 # Legacy MongoDB Client (Deprecated - causing issues if Mongo not present)
 # We initialized it with a default URL in config, so this won't crash immediately,
 # but functionality will be broken until refactored to Prisma.
@@ -14,3 +18,261 @@ except Exception as e:
 
 async def close_db():
     client.close()
+
+
+# ==================== INDEXES ====================
+
+# Indexes every hot query relies on, keyed by collection.
+# Names are explicit so ensure_indexes() can tell which ones are missing.
+INDEXES = {
+    "room_inventory": [
+        IndexModel([("room_type_id", ASCENDING), ("date", ASCENDING)], name="room_type_date", unique=True),
+        IndexModel([("date", ASCENDING)], name="date"),
+    ],
+    "room_types": [
+        IndexModel([("room_type_id", ASCENDING)], name="room_type_id", unique=True),
+        IndexModel([("is_active", ASCENDING), ("display_order", ASCENDING)], name="active_display_order"),
+    ],
+    "reservations": [
+        IndexModel([("reservation_id", ASCENDING)], name="reservation_id", unique=True),
+        IndexModel([("booking_code", ASCENDING)], name="booking_code", unique=True),
+        IndexModel([("guest_email", ASCENDING)], name="guest_email"),
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        IndexModel([("created_at", DESCENDING), ("reservation_id", DESCENDING)], name="created_at_reservation_id"),
+        IndexModel([("status", ASCENDING), ("check_in", ASCENDING)], name="status_check_in"),
+    ],
+    "rate_plans": [
+        IndexModel([("rate_plan_id", ASCENDING)], name="rate_plan_id", unique=True),
+    ],
+    "promo_codes": [
+        IndexModel([("promo_id", ASCENDING)], name="promo_id", unique=True),
+        IndexModel([("code", ASCENDING)], name="code"),
+        IndexModel([("created_at", DESCENDING), ("promo_id", DESCENDING)], name="created_at_promo_id"),
+    ],
+    "users": [
+        IndexModel([("user_id", ASCENDING)], name="user_id", unique=True),
+        IndexModel([("email", ASCENDING)], name="email", unique=True),
+        IndexModel([("created_at", DESCENDING), ("user_id", DESCENDING)], name="created_at_user_id"),
+    ],
+    "daily_stats": [
+        IndexModel([("date", ASCENDING)], name="date", unique=True),
+    ],
+    "analytics_events": [
+        IndexModel([("event_name", ASCENDING), ("timestamp", ASCENDING)], name="event_name_timestamp"),
+        IndexModel([("timestamp", ASCENDING)], name="timestamp"),
+    ],
+    "daily_rollups": [
+        IndexModel([("date", ASCENDING)], name="date", unique=True),
+    ],
+    "rollup_totals": [
+        IndexModel([("key", ASCENDING)], name="key", unique=True),
+    ],
+    "audit_logs": [
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        IndexModel([("created_at", DESCENDING), ("log_id", DESCENDING)], name="created_at_log_id"),
+    ],
+    "site_content": [
+        IndexModel([("page", ASCENDING), ("section", ASCENDING)], name="page_section"),
+        IndexModel([("content_id", ASCENDING)], name="content_id"),
+    ],
+    "upload_intents": [
+        IndexModel([("intent_id", ASCENDING)], name="intent_id", unique=True),
+        IndexModel([("public_id", ASCENDING)], name="public_id", unique=True),
+    ],
+    "media_assets": [
+        IndexModel([("resource_type", ASCENDING), ("public_id", ASCENDING)], name="type_public_id", unique=True),
+        IndexModel([("resource_type", ASCENDING), ("created_at", DESCENDING), ("public_id", DESCENDING)], name="type_created_at"),
+        IndexModel([("tags", ASCENDING)], name="tags"),
+        IndexModel([("secure_url", ASCENDING)], name="secure_url"),
+        IndexModel(
+            [("caption", TEXT), ("alt_text", TEXT), ("public_id", TEXT), ("tags", TEXT),
+             ("context.caption", TEXT), ("context.alt", TEXT)],
+            name="search_text"
+        ),
+    ],
+    "email_logs": [
+        IndexModel([("reservation_id", ASCENDING), ("sent_at", DESCENDING)], name="reservation_sent_at"),
+    ],
+    "mail_outbox": [
+        IndexModel([("message_id", ASCENDING)], name="message_id", unique=True),
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt"),
+        IndexModel([("meta.reservation_id", ASCENDING)], name="reservation_id"),
+    ],
+    "caption_jobs": [
+        IndexModel([("job_id", ASCENDING)], name="job_id", unique=True),
+        IndexModel([("status", ASCENDING), ("created_at", ASCENDING)], name="status_created_at"),
+        IndexModel([("public_id", ASCENDING)], name="public_id"),
+    ],
+    "caption_cache": [
+        IndexModel([("content_hash", ASCENDING), ("context", ASCENDING)], name="hash_context", unique=True),
+    ],
+    "ai_text_cache": [
+        IndexModel([("kind", ASCENDING), ("variant", ASCENDING), ("source_hash", ASCENDING)], name="kind_variant_hash", unique=True),
+    ],
+    "reviews": [
+        IndexModel([("is_visible", ASCENDING), ("created_at", DESCENDING)], name="visible_created_at"),
+        IndexModel([("created_at", DESCENDING), ("review_id", DESCENDING)], name="created_at_review_id"),
+    ],
+}
+
+# Representative shapes of the hot queries, checked by explain_hot_queries().
+# Values only need the right type; the planner choice is what matters.
+HOT_QUERIES = [
+    {
+        "name": "availability_inventory",
+        "collection": "room_inventory",
+        "filter": {"room_type_id": {"$in": ["room"]}, "date": {"$gte": "2024-01-01", "$lt": "2024-01-15"}},
+    },
+    {
+        "name": "inventory_by_date",
+        "collection": "room_inventory",
+        "filter": {"date": "2024-01-01"},
+    },
+    {
+        "name": "active_rooms",
+        "collection": "room_types",
+        "filter": {"is_active": True},
+        "sort": [("display_order", ASCENDING)],
+    },
+    {
+        "name": "reservation_by_booking_code",
+        "collection": "reservations",
+        "filter": {"booking_code": "SGH-00000000-000000"},
+    },
+    {
+        "name": "reservation_by_guest_email",
+        "collection": "reservations",
+        "filter": {"guest_email": "guest@example.com"},
+    },
+    {
+        "name": "recent_reservations",
+        "collection": "reservations",
+        "filter": {},
+        "sort": [("created_at", DESCENDING)],
+    },
+    {
+        "name": "reservations_by_status",
+        "collection": "reservations",
+        "filter": {"status": {"$in": ["confirmed", "checked_in"]}, "check_in": {"$lte": "2024-01-01"}},
+    },
+    {
+        "name": "daily_stats_range",
+        "collection": "daily_stats",
+        "filter": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}},
+        "sort": [("date", ASCENDING)],
+    },
+    {
+        "name": "dashboard_rollups_range",
+        "collection": "daily_rollups",
+        "filter": {"date": {"$gte": "2024-01-01", "$lte": "2024-01-31"}},
+        "sort": [("date", ASCENDING)],
+    },
+    {
+        "name": "funnel_events",
+        "collection": "analytics_events",
+        "filter": {
+            "event_name": {"$in": ["view_room_detail", "booking_success"]},
+            "timestamp": {"$gte": "2024-01-01T00:00:00", "$lte": "2024-01-31T23:59:59"}
+        },
+    },
+    {
+        "name": "recent_audit_logs",
+        "collection": "audit_logs",
+        "filter": {},
+        "sort": [("created_at", DESCENDING)],
+    },
+    {
+        "name": "page_content",
+        "collection": "site_content",
+        "filter": {"page": "home", "section": "hero"},
+    },
+    {
+        "name": "visible_reviews",
+        "collection": "reviews",
+        "filter": {"is_visible": True},
+        "sort": [("created_at", DESCENDING)],
+    },
+]
+
+
+async def ensure_indexes() -> dict:
+    """
+    Create any declared index that does not exist yet.
+
+    Failures (e.g. a unique index over existing duplicates) are logged and
+    reported instead of aborting startup.
+
+    Returns:
+        Dictionary with "created" and "failed" index names per collection
+    """
+    report = {"created": [], "failed": []}
+
+    for collection_name, indexes in INDEXES.items():
+        collection = db[collection_name]
+        try:
+            existing = await collection.index_information()
+        except Exception as e:
+            # Most likely the server is unreachable, don't retry every collection
+            logger.error(f"Could not read indexes for {collection_name}, skipping index bootstrap: {e}")
+            report["failed"].append(collection_name)
+            return report
+
+        for index in indexes:
+            name = index.document["name"]
+            if name in existing:
+                continue
+            try:
+                await collection.create_indexes([index])
+                report["created"].append(f"{collection_name}.{name}")
+            except Exception as e:
+                logger.error(f"Failed to create index {collection_name}.{name}: {e}")
+                report["failed"].append(f"{collection_name}.{name}")
+
+    if report["created"]:
+        logger.info(f"Created indexes: {', '.join(report['created'])}")
+    return report
+
+
+def _plan_stages(plan: dict) -> list:
+    """Flatten a query plan tree into its list of stages."""
+    stages = [plan]
+    if "inputStage" in plan:
+        stages.extend(_plan_stages(plan["inputStage"]))
+    for child in plan.get("inputStages", []):
+        stages.extend(_plan_stages(child))
+    return stages
+
+
+async def explain_hot_queries() -> list:
+    """
+    Run explain() on every registered hot query and report how it is served.
+
+    Returns:
+        List of dicts with the query name, collection, index used (if any)
+        and whether the winning plan is a collection scan
+    """
+    results = []
+    for query in HOT_QUERIES:
+        cursor = db[query["collection"]].find(query["filter"])
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+
+        try:
+            explain = await cursor.limit(50).explain()
+        except Exception as e:
+            results.append({"name": query["name"], "collection": query["collection"], "error": str(e)})
+            continue
+
+        winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+        # Newer servers wrap the classic plan under "queryPlan"
+        stages = _plan_stages(winning_plan.get("queryPlan", winning_plan))
+        index_names = [s["indexName"] for s in stages if s.get("indexName")]
+
+        results.append({
+            "name": query["name"],
+            "collection": query["collection"],
+            "collection_scan": any(s.get("stage") == "COLLSCAN" for s in stages),
+            "indexes_used": index_names,
+            "stages": [s.get("stage") for s in stages]
+        })
+    return results
@@ -1,15 +1,17 @@
 from models.user import UserCreate, UserLogin, UserResponse
-from models.room import RoomType, RoomInventory, BulkUpdateRequest
+from models.room import RoomType, RoomInventory, DateRange, BulkUpdateRequest
 from models.reservation import ReservationCreate, Reservation
 from models.review import ReviewCreate, Review
 from models.promo import PromoCode
-from models.content import SiteContent
+from models.content import SiteContent, TranslateRequest, CopyRequest
+from models.quote import Quote
 
 __all__ = [
     "UserCreate", "UserLogin", "UserResponse",
-    "RoomType", "RoomInventory", "BulkUpdateRequest",
+    "RoomType", "RoomInventory", "DateRange", "BulkUpdateRequest",
     "ReservationCreate", "Reservation",
     "ReviewCreate", "Review",
     "PromoCode",
-    "SiteContent"
+    "SiteContent", "TranslateRequest", "CopyRequest",
+    "Quote"
 ]
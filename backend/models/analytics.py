@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
 class DailyStats(BaseModel):
     date: str
@@ -7,3 +7,9 @@ class DailyStats(BaseModel):
     unique_visitors: int = 0
     page_views: Dict[str, int] = {}
     last_updated: str = ""
+
+class AnalyticsEvent(BaseModel):
+    event_name: str
+    category: Optional[str] = None
+    label: Optional[str] = None
+    metadata: Dict[str, Any] = {}
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional
 from datetime import datetime, timezone
 import uuid
 
@@ -10,3 +10,12 @@ class SiteContent(BaseModel):
     content_type: str
     content: Dict[str, Any]
     updated_at: str = Field(default_factory=lambda: datetime.now(timezone.utc).isoformat())
+
+class TranslateRequest(BaseModel):
+    target_language: str = Field(pattern="^(zh|en|id)$")
+    section: Optional[str] = None
+    save: bool = False
+
+class CopyRequest(BaseModel):
+    prompts: List[str] = Field(min_length=1, max_length=50)
+    content_type: str = "general"
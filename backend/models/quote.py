@@ -0,0 +1,12 @@
+from pydantic import BaseModel
+
+
+class Quote(BaseModel):
+    room_type_id: str
+    check_in: str
+    check_out: str
+    nights: int
+    rate_plan_id: str = "standard"
+    rate_plan_name: str = "Room Only"
+    base_price: float  # Sum of nightly inventory rates before the rate plan
+    total_price: float  # Price after the rate plan, before any promo discount
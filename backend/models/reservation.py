@@ -13,6 +13,7 @@ class ReservationCreate(BaseModel):
     rate_plan_id: str = ""
     special_requests: str = ""
     promo_code: str = ""
+    quote_token: str = ""  # Signed quote from /availability, skips re-pricing
 
 class Reservation(BaseModel):
     reservation_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
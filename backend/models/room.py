@@ -25,10 +25,16 @@ class RoomInventory(BaseModel):
     rate: float
     is_closed: bool = False
 
-class BulkUpdateRequest(BaseModel):
-    room_type_id: str
+class DateRange(BaseModel):
     start_date: str
     end_date: str
+
+class BulkUpdateRequest(BaseModel):
+    room_type_id: Optional[str] = None # Legacy: single room
+    room_type_ids: List[str] = [] # Several rooms in one request
+    start_date: Optional[str] = None # Legacy: single range
+    end_date: Optional[str] = None
+    date_ranges: List[DateRange] = [] # Several ranges in one request
     allotment: Optional[int] = None
     rate: Optional[float] = None
     is_closed: Optional[bool] = None
@@ -1,9 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from datetime import datetime, timezone
 
-from database import db
-from services.auth import hash_password, require_admin
+from database import db, explain_hot_queries
+from services.auth import hash_password_async, require_admin, invalidate_principal
 from services.audit import log_activity, get_changes
+from services.mailer import mail_queue
+from services.email_templates import render_preview
+from services.pagination import paginate, set_cursor_header
 
 router = APIRouter(prefix="/admin", tags=["admin"])
 
@@ -81,9 +84,17 @@ async def get_dashboard_stats(user: dict = Depends(require_admin)):
 
 # User Management
 @router.get("/users")
-async def get_users(user: dict = Depends(require_admin)):
-    users = await db.users.find({}, {"_id": 0, "password": 0}).to_list(100)
-    return users
+async def get_users(
+    response: Response,
+    limit: int = 100,
+    cursor: str = None,
+    count: str = None,
+    user: dict = Depends(require_admin)
+):
+    """Users, newest first; the next page's cursor is in X-Next-Cursor"""
+    page = await paginate(db.users, {}, "user_id", limit, cursor, {"password": 0}, count)
+    set_cursor_header(response, page)
+    return page["items"]
 
 @router.put("/users/{user_id}")
 async def update_user(user_id: str, user_data: dict, request: Request, current_user: dict = Depends(require_admin)):
@@ -93,12 +104,13 @@ async def update_user(user_id: str, user_data: dict, request: Request, current_u
         raise HTTPException(status_code=404, detail="User not found")
     
     if "password" in user_data:
-        user_data["password"] = hash_password(user_data["password"])
+        user_data["password"] = await hash_password_async(user_data["password"])
     user_data["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     result = await db.users.update_one({"user_id": user_id}, {"$set": user_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate_principal(user_id)
     
     # Log the activity
     changes = get_changes(old_user, user_data, ["name", "email", "role", "permissions"])
@@ -126,6 +138,7 @@ async def delete_user(user_id: str, request: Request, current_user: dict = Depen
     result = await db.users.delete_one({"user_id": user_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="User not found")
+    invalidate_principal(user_id)
     
     # Log the activity
     await log_activity(
@@ -142,14 +155,21 @@ async def delete_user(user_id: str, request: Request, current_user: dict = Depen
 # Activity Logs
 @router.get("/logs")
 async def get_activity_logs(
-    page: int = 1,
+    response: Response,
     limit: int = 50,
+    cursor: str = None,
+    count: str = "estimated",
     resource: str = None,
     action: str = None,
     user_id: str = None,
     current_user: dict = Depends(require_admin)
 ):
-    """Get activity logs with optional filters"""
+    """
+    Get activity logs with optional filters, newest first.
+    
+    Pass the returned next_cursor to get the following page. `count` is
+    "estimated" (default), "exact", or empty to skip counting.
+    """
     query = {}
     
     if resource:
@@ -159,15 +179,46 @@ async def get_activity_logs(
     if user_id:
         query["user_id"] = user_id
     
-    skip = (page - 1) * limit
-    
-    logs = await db.audit_logs.find(query, {"_id": 0}).sort("created_at", -1).skip(skip).limit(limit).to_list(limit)
-    total = await db.audit_logs.count_documents(query)
+    page = await paginate(db.audit_logs, query, "log_id", limit, cursor, count_mode=count or None)
+    set_cursor_header(response, page)
     
+    result = {"logs": page["items"], "next_cursor": page["next_cursor"], "total": page["total"]}
+    if page["total"] is not None:
+        result["pages"] = (page["total"] + limit - 1) // limit
+    return result
+
+# Mail Outbox
+@router.get("/mail-outbox")
+async def get_mail_outbox(
+    status: str = "dead",
+    limit: int = 50,
+    current_user: dict = Depends(require_admin)
+):
+    """List outbound mail by status (pending, sending, sent, dead); dead-lettered by default"""
+    messages = await db.mail_outbox.find(
+        {"status": status}, {"_id": 0, "html": 0}
+    ).sort("created_at", -1).limit(limit).to_list(limit)
+    return {"messages": messages}
+
+@router.post("/mail-outbox/{message_id}/retry")
+async def retry_mail(message_id: str, current_user: dict = Depends(require_admin)):
+    """Re-queue a dead-lettered message"""
+    if not await mail_queue.retry(message_id):
+        raise HTTPException(status_code=404, detail="Dead-lettered message not found")
+    return {"message": "Message queued"}
+
+# Email Preview
+@router.get("/email/preview")
+async def preview_email(resend: bool = False, current_user: dict = Depends(require_admin)):
+    """Render the reservation email with a sample booking from the compiled template cache"""
+    return await render_preview(is_resend=resend)
+
+# Database Health
+@router.get("/db/index-report")
+async def get_index_report(current_user: dict = Depends(require_admin)):
+    """Run explain() on every registered hot query and report collection scans"""
+    queries = await explain_hot_queries()
     return {
-        "logs": logs,
-        "total": total,
-        "page": page,
-        "pages": (total + limit - 1) // limit
+        "queries": queries,
+        "collection_scans": [q["name"] for q in queries if q.get("collection_scan")]
     }
-
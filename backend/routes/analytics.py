@@ -1,12 +1,17 @@
 import uuid
-from fastapi import APIRouter, Request, Depends, Body
+from typing import List
+from fastapi import APIRouter, HTTPException, Request, Depends, Body
 from datetime import datetime, timezone, timedelta
 from database import db
-from models.analytics import DailyStats
+from models.analytics import DailyStats, AnalyticsEvent
 from services.auth import require_admin
+from services.analytics import daily_stats_buffer, event_sink
+from services.rollups import get_rollups, get_room_popularity, rebuild_rollups
 
 router = APIRouter(tags=["analytics"])
 
+MAX_EVENTS_PER_REQUEST = 100
+
 @router.post("/analytics/track")
 async def track_visit(
     request: Request, 
@@ -63,27 +68,13 @@ async def track_visit(
     else:
          inc_update["traffic_sources.Other"] = 1
 
-    await db.daily_stats.update_one(
-        {"date": today},
-        {
-            "$inc": inc_update,
-            "$set": {"last_updated": datetime.now(timezone.utc).isoformat()}
-        },
-        upsert=True
-    )
+    # Coalesced in memory and flushed to daily_stats in the background
+    daily_stats_buffer.add(today, inc_update)
     
     return {"status": "ok"}
 
-@router.post("/analytics/event")
-async def track_event(
-    request: Request,
-    event_name: str = Body(...),
-    category: str = Body(None),
-    label: str = Body(None),
-    metadata: dict = Body({})
-):
-    """Store granular events"""
-    event_doc = {
+def build_event_doc(request: Request, event_name: str, category: str, label: str, metadata: dict) -> dict:
+    return {
         "event_id": str(uuid.uuid4()),
         "event_name": event_name,
         "category": category,
@@ -93,10 +84,45 @@ async def track_event(
         "user_agent": request.headers.get("user-agent"),
         "timestamp": datetime.now(timezone.utc).isoformat()
     }
+
+@router.post("/analytics/event")
+async def track_event(
+    request: Request,
+    event_name: str = Body(...),
+    category: str = Body(None),
+    label: str = Body(None),
+    metadata: dict = Body({})
+):
+    """Store granular events"""
+    event_doc = build_event_doc(request, event_name, category, label, metadata)
     
-    await db.analytics_events.insert_one(event_doc)
+    # Written in batches by the event sink; shed (not errored) under overload
+    if not event_sink.submit(event_doc):
+        return {"status": "dropped"}
     return {"status": "recorded", "event_id": event_doc["event_id"]}
 
+@router.post("/analytics/events")
+async def track_events(request: Request, events: List[AnalyticsEvent] = Body(...)):
+    """Store a batch of events sent by the client in one request"""
+    if len(events) > MAX_EVENTS_PER_REQUEST:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_EVENTS_PER_REQUEST} events per request")
+    
+    accepted = 0
+    for event in events:
+        event_doc = build_event_doc(request, event.event_name, event.category, event.label, event.metadata)
+        if event_sink.submit(event_doc):
+            accepted += 1
+    
+    return {"status": "recorded", "accepted": accepted, "dropped": len(events) - accepted}
+
+@router.get("/admin/analytics/ingest-stats")
+async def get_ingest_stats(user: dict = Depends(require_admin)):
+    """Queue depth, write and load-shedding counters of the analytics buffers"""
+    return {
+        "daily_stats": daily_stats_buffer.stats(),
+        "events": event_sink.stats()
+    }
+
 @router.get("/admin/dashboard-stats")
 async def get_dashboard_stats(
     days: int = 30, 
@@ -112,10 +138,6 @@ async def get_dashboard_stats(
         query_end = end_date
         # For daily_stats, we need to match the date string format YYYY-MM-DD
         date_query = {"date": {"$gte": query_start, "$lte": query_end}}
-        # For timestamps (ISO), we usually assume start of day to end of day
-        # But for simplicity, let's treat the inputs as inclusive YYYY-MM-DD
-        iso_start = f"{query_start}T00:00:00"
-        iso_end = f"{query_end}T23:59:59"
     else:
         # Default to 'days' lookback
         query_end = datetime.now().strftime("%Y-%m-%d")
@@ -123,77 +145,41 @@ async def get_dashboard_stats(
         query_start = dt_start.strftime("%Y-%m-%d")
         
         date_query = {"date": {"$gte": query_start, "$lte": query_end}}
-        iso_start = dt_start.isoformat()
-        iso_end = datetime.now().isoformat()
 
     # 1. Fetch Daily Stats (Traffic, Demographics)
     cursor = db.daily_stats.find(date_query, {"_id": 0}).sort("date", 1) # Sort ascending for chart
     daily_data = await cursor.to_list(None)
     # daily_data is already chronological if sorted by date: 1
     
-    # 2. Key Metrics (Revenue, Bookings) from Reservations
-    pipeline = [
-        {
-            "$match": {
-                "created_at": {"$gte": iso_start, "$lte": iso_end},
-                "status": {"$nin": ["cancelled"]}
-            }
-        },
-        {
-            "$group": {
-                "_id": {"$substr": ["$created_at", 0, 10]}, # Group by YYYY-MM-DD
-                "daily_revenue": {"$sum": "$total_amount"},
-                "daily_bookings": {"$sum": 1}
-            }
-        },
-        {"$sort": {"_id": 1}}
-    ]
-    
-    revenue_trend = await db.reservations.aggregate(pipeline).to_list(None)
+    # 2. Pre-aggregated reservation / funnel rollups, one row per day
+    rollups = await get_rollups(query_start, query_end)
     
-    # 3. Overall KPI (In Selected Period)
-    kpi_pipeline = [
+    revenue_trend = [
         {
-            "$match": {
-                "created_at": {"$gte": iso_start, "$lte": iso_end}
-            }
-        },
-        {
-            "$group": {
-                "_id": None,
-                "total_revenue": {
-                    "$sum": {
-                        "$cond": [{"$ne": ["$status", "cancelled"]}, "$total_amount", 0]
-                    }
-                },
-                "total_bookings": {"$sum": 1},
-                "confirmed_bookings": {
-                    "$sum": {
-                        "$cond": [{"$ne": ["$status", "cancelled"]}, 1, 0]
-                    }
-                },
-                "cancelled_bookings": {
-                    "$sum": {
-                        "$cond": [{"$eq": ["$status", "cancelled"]}, 1, 0]
-                    }
-                }
-            }
+            "_id": day["date"],
+            "daily_revenue": day.get("revenue", 0),
+            "daily_bookings": day.get("bookings", 0) - day.get("cancelled", 0)
         }
+        for day in rollups
+        if day.get("bookings", 0) > 0
     ]
-    kpi_result = await db.reservations.aggregate(kpi_pipeline).to_list(1)
-    kpi = kpi_result[0] if kpi_result else {"total_revenue": 0, "total_bookings": 0, "confirmed_bookings": 0, "cancelled_bookings": 0}
+    
+    # 3. Overall KPI (In Selected Period)
+    total_bookings = sum(day.get("bookings", 0) for day in rollups)
+    cancelled_bookings = sum(day.get("cancelled", 0) for day in rollups)
+    kpi = {
+        "_id": None,
+        "total_revenue": sum(day.get("revenue", 0) for day in rollups),
+        "total_bookings": total_bookings,
+        "confirmed_bookings": total_bookings - cancelled_bookings,
+        "cancelled_bookings": cancelled_bookings
+    }
     
     # Calculate ADR
     kpi["adr"] = kpi["total_revenue"] / kpi["confirmed_bookings"] if kpi["confirmed_bookings"] > 0 else 0
     
-    # 4. Room Popularity
-    room_pop_pipeline = [
-        {"$match": {"status": {"$ne": "cancelled"}}}, # All time or limited? Let's do All Time for popularity
-        {"$group": {"_id": "$room_type_name", "count": {"$sum": 1}}},
-        {"$sort": {"count": -1}},
-        {"$limit": 5}
-    ]
-    room_stats = await db.reservations.aggregate(room_pop_pipeline).to_list(5)
+    # 4. Room Popularity (All Time, kept as a running total)
+    room_stats = await get_room_popularity(5)
     
     # 5. Recent Activity
     recent_logs = await db.audit_logs.find({}, {"_id": 0}).sort("created_at", -1).limit(10).to_list(10)
@@ -215,25 +201,11 @@ async def get_dashboard_stats(
              source = s.replace("_", ".") # Restore dots
              traffic_sources[source] = traffic_sources.get(source, 0) + count
 
-    # 7. Funnel Analysis (from analytics_events)
-    # Pipeline to count events by name for the last 30 days
-    # Pipeline to count events by name for the last 30 days
-    funnel_pipeline = [
-        {
-            "$match": {
-                "timestamp": {"$gte": iso_start, "$lte": iso_end},
-                "event_name": {"$in": ["view_room_detail", "click_book_now", "view_guest_info", "view_payment", "booking_success"]}
-            }
-        },
-        {
-            "$group": {
-                "_id": "$event_name",
-                "count": {"$sum": 1}
-            }
-        }
-    ]
-    funnel_data_raw = await db.analytics_events.aggregate(funnel_pipeline).to_list(None)
-    funnel_map = {item["_id"]: item["count"] for item in funnel_data_raw}
+    # 7. Funnel Analysis (from the daily funnel counters)
+    funnel_map = {}
+    for day in rollups:
+        for event_name, count in day.get("funnel", {}).items():
+            funnel_map[event_name] = funnel_map.get(event_name, 0) + count
     
     # Construct Funnel (Fill gaps with 0)
     funnel = [
@@ -246,33 +218,9 @@ async def get_dashboard_stats(
     ]
     
     # 8. Booking Lead Time & Look-to-Book
-    # Lead Time calculation
-    lead_time_pipeline = [
-         {
-            "$match": {
-                "created_at": {"$gte": iso_start, "$lte": iso_end},
-                "status": {"$nin": ["cancelled"]}
-            }
-        },
-        {
-             "$project": {
-                  "lead_days": {
-                       "$divide": [
-                            {"$subtract": [{"$toDate": "$check_in"}, {"$toDate": "$created_at"}]},
-                            1000 * 60 * 60 * 24 # Milliseconds to Days
-                       ]
-                  }
-             }
-        },
-        {
-             "$group": {
-                  "_id": None,
-                  "avg_lead_time": {"$avg": "$lead_days"}
-             }
-        }
-    ]
-    lead_time_res = await db.reservations.aggregate(lead_time_pipeline).to_list(1)
-    avg_lead_time = round(lead_time_res[0]["avg_lead_time"], 1) if lead_time_res else 0
+    lead_days_sum = sum(day.get("lead_days_sum", 0) for day in rollups)
+    lead_count = sum(day.get("lead_count", 0) for day in rollups)
+    avg_lead_time = round(lead_days_sum / lead_count, 1) if lead_count > 0 else 0
     
     # Look-to-Book
     total_room_views = funnel_map.get("view_room_detail", 0)
@@ -302,6 +250,23 @@ async def get_dashboard_stats(
         "funnel": funnel
     }
 
+@router.post("/admin/analytics/rollups/rebuild")
+async def rebuild_dashboard_rollups(
+    start_date: str = None,
+    end_date: str = None,
+    user: dict = Depends(require_admin)
+):
+    """Recompute dashboard rollups from reservations and events (all history by default)"""
+    for value in (start_date, end_date):
+        if value:
+            try:
+                datetime.strptime(value, "%Y-%m-%d")
+            except ValueError:
+                raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    
+    result = await rebuild_rollups(start_date, end_date)
+    return {"message": "Rollups rebuilt", **result}
+
 @router.get("/admin/analytics")
 async def get_analytics(days: int = 7, user: dict = Depends(require_admin)):
     # ... legacy endpoint ...
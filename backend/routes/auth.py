@@ -5,7 +5,9 @@ import uuid
 
 from database import db
 from models.user import UserCreate, UserLogin, UserResponse
-from services.auth import hash_password, verify_password, create_token, get_current_user, require_admin
+from services.auth import (
+    hash_password_async, verify_password_async, needs_rehash, create_token, get_current_user, require_admin
+)
 from services.email import send_password_reset_email
 
 router = APIRouter(prefix="/auth", tags=["auth"])
@@ -19,7 +21,7 @@ async def register(user: UserCreate, current_user: dict = Depends(require_admin)
     user_doc = {
         "user_id": str(uuid.uuid4()),
         "email": user.email,
-        "password": hash_password(user.password),
+        "password": await hash_password_async(user.password),
         "name": user.name,
         "role": user.role,
         "permissions": user.permissions.model_dump() if user.permissions else {},
@@ -29,12 +31,26 @@ async def register(user: UserCreate, current_user: dict = Depends(require_admin)
     del user_doc["password"]
     return user_doc
 
+async def rehash_password(user_id: str, password: str, old_hash: str):
+    """Upgrade a password hash to the current cost factor, unless it changed meanwhile"""
+    try:
+        new_hash = await hash_password_async(password)
+    except HTTPException:
+        return  # Hash pool is saturated; the next login retries
+    await db.users.update_one(
+        {"user_id": user_id, "password": old_hash},
+        {"$set": {"password": new_hash}}
+    )
+
 @router.post("/login")
-async def login(credentials: UserLogin):
+async def login(credentials: UserLogin, background_tasks: BackgroundTasks):
     user = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user or not verify_password(credentials.password, user["password"]):
+    if not user or not await verify_password_async(credentials.password, user["password"]):
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    if needs_rehash(user["password"]):
+        background_tasks.add_task(rehash_password, user["user_id"], credentials.password, user["password"])
+    
     token = create_token(user["user_id"], user["email"], user["role"])
     return {
         "token": token,
@@ -72,9 +88,10 @@ async def reset_password(token: str, new_password: str):
     if datetime.fromisoformat(reset_doc["expires_at"]) < datetime.now(timezone.utc):
         raise HTTPException(status_code=400, detail="Token expired")
     
+    new_hash = await hash_password_async(new_password)
     await db.users.update_one(
         {"email": reset_doc["email"]},
-        {"$set": {"password": hash_password(new_password)}}
+        {"$set": {"password": new_hash}}
     )
     await db.password_resets.delete_one({"token": token})
     return {"message": "Password reset successful"}
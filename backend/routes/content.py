@@ -3,21 +3,26 @@ from datetime import datetime, timezone
 import uuid
 
 from database import db
-from models.content import SiteContent
+from models.content import SiteContent, TranslateRequest, CopyRequest
 from services.auth import require_admin
 from services.audit import log_activity
+from services.cache import cached_response, invalidate
+from services.translation import translate_page, generate_copy_batch
+from services.email_templates import invalidate_email_template
 
 router = APIRouter(tags=["content"])
 
 @router.get("/content")
-async def get_all_content():
-    content = await db.site_content.find({}, {"_id": 0}).to_list(500)
-    return content
+async def get_all_content(request: Request):
+    async def load():
+        return await db.site_content.find({}, {"_id": 0}).to_list(500)
+    return await cached_response(request, ["site_content"], load)
 
 @router.get("/content/{page}")
-async def get_page_content(page: str):
-    content = await db.site_content.find({"page": page}, {"_id": 0}).to_list(100)
-    return content
+async def get_page_content(page: str, request: Request):
+    async def load():
+        return await db.site_content.find({"page": page}, {"_id": 0}).to_list(100)
+    return await cached_response(request, ["site_content"], load)
 
 @router.post("/admin/content")
 async def create_content(content: SiteContent, request: Request, user: dict = Depends(require_admin)):
@@ -33,12 +38,20 @@ async def create_content(content: SiteContent, request: Request, user: dict = De
         action = "update"
         await db.site_content.update_one(
             {"content_id": existing["content_id"]},
-            {"$set": {"content": content_doc["content"], "updated_at": datetime.now(timezone.utc).isoformat()}}
+            {
+                "$set": {"content": content_doc["content"], "updated_at": datetime.now(timezone.utc).isoformat()},
+                # Saved translations are of the old text
+                "$unset": {"translations": ""}
+            }
         )
         content_doc["content_id"] = existing["content_id"]
     else:
         await db.site_content.insert_one(content_doc)
     
+    invalidate("site_content")
+    if content_doc["page"] == "email":
+        invalidate_email_template()
+    
     # Log activity
     await log_activity(
         user=user,
@@ -56,10 +69,18 @@ async def create_content(content: SiteContent, request: Request, user: dict = De
 @router.put("/admin/content/{content_id}")
 async def update_content(content_id: str, content: dict, request: Request, user: dict = Depends(require_admin)):
     content["updated_at"] = datetime.now(timezone.utc).isoformat()
-    result = await db.site_content.update_one({"content_id": content_id}, {"$set": content})
+    update = {"$set": content}
+    if "content" in content and "translations" not in content:
+        # Saved translations are of the old text
+        update["$unset"] = {"translations": ""}
+    result = await db.site_content.update_one({"content_id": content_id}, update)
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Content not found")
         
+    invalidate("site_content")
+    # The page is not known here; recompiling the email template is cheap
+    invalidate_email_template()
+    
     await log_activity(
         user=user,
         action="update",
@@ -77,6 +98,10 @@ async def delete_content(page: str, section: str, request: Request, user: dict =
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Content not found")
         
+    invalidate("site_content")
+    if page == "email":
+        invalidate_email_template()
+    
     await log_activity(
         user=user,
         action="delete",
@@ -88,6 +113,44 @@ async def delete_content(page: str, section: str, request: Request, user: dict =
         
     return {"message": "Content deleted"}
 
+@router.post("/admin/content/generate-copy")
+async def generate_content_copy(data: CopyRequest, user: dict = Depends(require_admin)):
+    """Generate marketing copy for a list of prompts; repeated prompts are served from cache"""
+    copies = await generate_copy_batch(data.prompts, data.content_type)
+    return {"copies": copies}
+
+@router.post("/admin/content/{page}/translate")
+async def translate_page_content(page: str, data: TranslateRequest, request: Request, user: dict = Depends(require_admin)):
+    """
+    Translate all sections of a page (or one section) in batched requests.
+    With save=True the result is stored on each section under translations.<lang>.
+    Sections with strings that failed to translate are never stored; if there
+    are any, the response is a 502 naming them.
+    """
+    result, incomplete = await translate_page(page, data.target_language, section=data.section, save=data.save)
+    if not result:
+        raise HTTPException(status_code=404, detail="Content not found")
+    
+    saved = [s for s in result if s not in incomplete]
+    if data.save and saved:
+        invalidate("site_content")
+        await log_activity(
+            user=user,
+            action="update",
+            resource="content",
+            resource_id=page,
+            details={"translated": data.target_language, "sections": saved},
+            ip_address=request.client.host if request.client else None
+        )
+    
+    if incomplete:
+        raise HTTPException(
+            status_code=502,
+            detail=f"Translation failed for sections: {', '.join(incomplete)}"
+        )
+    
+    return {"page": page, "target_language": data.target_language, "sections": result}
+
 @router.post("/admin/content/fix-duplicates")
 async def fix_duplicate_content(user: dict = Depends(require_admin)):
     """
@@ -119,14 +182,19 @@ async def fix_duplicate_content(user: dict = Depends(require_admin)):
                 stats["deleted"] += 1
             
             stats["merged"] += 1
+    
+    invalidate("site_content")
             
     return {"message": "Deduplication complete", "stats": stats}
 
 # ==================== SPECIAL OFFERS ====================
 
 @router.get("/special-offers")
-async def get_special_offers():
+async def get_special_offers(request: Request):
     """Public endpoint to get all active special offers"""
+    return await cached_response(request, ["site_content"], load_special_offers)
+
+async def load_special_offers():
     offers = await db.site_content.find(
         {"section": "special_offer"},
         {"_id": 0}
@@ -176,6 +244,8 @@ async def create_special_offer(offer: dict, request: Request, user: dict = Depen
     }
     await db.site_content.insert_one(doc)
     
+    invalidate("site_content")
+    
     await log_activity(
         user=user,
         action="create",
@@ -213,6 +283,8 @@ async def update_special_offer(offer_id: str, offer: dict, request: Request, use
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Offer not found")
     
+    invalidate("site_content")
+    
     await log_activity(
         user=user,
         action="update",
@@ -232,6 +304,8 @@ async def delete_special_offer(offer_id: str, request: Request, user: dict = Dep
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Offer not found")
     
+    invalidate("site_content")
+    
     await log_activity(
         user=user,
         action="delete",
@@ -247,8 +321,11 @@ async def delete_special_offer(offer_id: str, request: Request, user: dict = Dep
 # ==================== FACILITIES (DYNAMIC) ====================
 
 @router.get("/facilities")
-async def get_facilities():
+async def get_facilities(request: Request):
     """Public endpoint to get all active facilities"""
+    return await cached_response(request, ["site_content"], load_facilities)
+
+async def load_facilities():
     facilities = await db.site_content.find(
         {"section": "facility"},
         {"_id": 0}
@@ -321,6 +398,8 @@ async def create_facility(facility: dict, request: Request, user: dict = Depends
     }
     await db.site_content.insert_one(doc)
     
+    invalidate("site_content")
+    
     await log_activity(
         user=user,
         action="create",
@@ -357,6 +436,8 @@ async def update_facility(fid: str, facility: dict, request: Request, user: dict
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Facility not found")
         
+    invalidate("site_content")
+    
     await log_activity(
         user=user,
         action="update",
@@ -374,6 +455,8 @@ async def delete_facility(fid: str, request: Request, user: dict = Depends(requi
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Facility not found")
         
+    invalidate("site_content")
+    
     await log_activity(
         user=user,
         action="delete",
@@ -3,7 +3,8 @@ from datetime import datetime, timezone, timedelta
 import uuid
 
 from database import db
-from services.auth import hash_password
+from services.auth import hash_password_async
+from services.cache import invalidate
 
 router = APIRouter(tags=["init"])
 
@@ -16,7 +17,7 @@ async def init_default_data():
     admin_user = {
         "user_id": str(uuid.uuid4()),
         "email": "admin@spencergreenhotel.com",
-        "password": hash_password("admin123"),
+        "password": await hash_password_async("admin123"),
         "name": "Admin",
         "role": "admin",
         "created_at": datetime.now(timezone.utc).isoformat()
@@ -157,5 +158,6 @@ async def init_default_data():
             "updated_at": datetime.now(timezone.utc).isoformat()
         })
     await db.site_content.insert_many(gallery_docs)
+    invalidate("room_types", "room_inventory", "site_content")
     
     return {"message": "Default data initialized", "admin_email": "admin@spencergreenhotel.com", "admin_password": "admin123"}
@@ -1,19 +1,103 @@
-from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Query, Body, Form
+from fastapi import APIRouter, HTTPException, Depends, File, UploadFile, Query, Body, Form, Request
 from config import CLOUDINARY_CLOUD_NAME, CLOUDINARY_API_KEY
 
-from typing import Optional
+import os
+import json
+import asyncio
+import logging
+from typing import Optional, List
 from datetime import datetime, timezone
+from fastapi.routing import APIRoute
+from starlette.concurrency import run_in_threadpool
 
 from database import db
+from services.cache import invalidate
 from services.auth import require_admin
 from cloudinary_helper import (
-    upload_image, upload_video, delete_media, delete_folder,
+    upload_image, upload_video, delete_media, delete_media_batch, delete_folder,
     validate_image_file, validate_video_file, generate_upload_signature,
-    list_gallery_images
+    MAX_VIDEO_SIZE, public_id_from_url, verify_upload_response, verify_notification, media_from_response
 )
-from ai_helper import generate_image_caption
+from services.uploads import create_upload_intent, complete_upload, get_upload_intent
+from services.captions import caption_queue, get_caption_job
+from services.media_index import (
+    index_asset, remove_asset, remove_assets, remove_prefix, list_assets, reconcile_media_index
+)
+from services.responsive import responsive_images, backfill_derivatives
+
+# Largest accepted request body: the biggest allowed file plus multipart overhead
+MAX_UPLOAD_REQUEST_SIZE = MAX_VIDEO_SIZE + 1024 * 1024
+
+
+class UploadLimitRoute(APIRoute):
+    """Reject oversized bodies from Content-Length before they are parsed and spooled."""
+
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+
+        async def limited_handler(request):
+            length = request.headers.get("content-length")
+            if length and length.isdigit() and int(length) > MAX_UPLOAD_REQUEST_SIZE:
+                raise HTTPException(status_code=413, detail="Upload too large")
+            return await handler(request)
+
+        return limited_handler
+
+
+router = APIRouter(prefix="/media", tags=["media"], route_class=UploadLimitRoute)
 
-router = APIRouter(prefix="/media", tags=["media"])
+logger = logging.getLogger(__name__)
+
+
+# All delete paths treat the index the same way: an asset Cloudinary deleted
+# or no longer has ("gone either way") leaves the index; when the delete call
+# itself fails, the entry stays for the next reconcile to settle.
+
+async def _delete_asset(public_id: str, resource_type: str = "image") -> bool:
+    """Delete one asset and drop it from the index. Returns False if the delete call failed."""
+    try:
+        await delete_media(public_id, resource_type)
+    except Exception as e:
+        logger.warning(f"Could not delete {resource_type} {public_id}: {e}")
+        return False
+    await remove_asset(public_id, resource_type)
+    return True
+
+
+def _spooled_size(fileobj) -> int:
+    fileobj.seek(0, os.SEEK_END)
+    size = fileobj.tell()
+    fileobj.seek(0)
+    return size
+
+
+async def check_upload(file: UploadFile, validate) -> int:
+    """
+    Validate an upload's content type and size without reading it into memory.
+    
+    The multipart parser spools files larger than 1MB to a temp file, so the
+    size is taken from the spooled file and file.file can be handed to the
+    storage client as-is.
+    
+    Returns:
+        File size in bytes
+    """
+    size = file.size
+    if size is None:
+        size = await run_in_threadpool(_spooled_size, file.file)
+    
+    is_valid, error = validate(file.content_type, size)
+    if not is_valid:
+        raise HTTPException(status_code=400, detail=error)
+    
+    await file.seek(0)
+    return size
+
+
+async def read_for_caption(file: UploadFile) -> bytes:
+    """Read an (already size-checked) image upload for captioning"""
+    await file.seek(0)
+    return await file.read()
 
 
 @router.post("/upload/gallery")
@@ -26,25 +110,21 @@ async def upload_gallery_image(
     """
     Upload gallery image for the hotel.
     Categories: general, rooms, facilities, restaurant, pool, spa, lobby
-    If auto_caption is True, AI will generate caption and alt_text.
+    If auto_caption is True, a caption job is queued to generate caption and alt_text.
     """
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_image_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
+    await check_upload(file, validate_image_file)
     
     result = await upload_image(
-        file_content=file_content,
+        file_content=file.file,
         folder=f"gallery/{category}",
         force_format="webp"
     )
+    await index_asset(result)
     
-    # Generate AI caption if requested
+    # Queue AI captioning; poll /media/caption-jobs/{job_id} for the result
     ai_result = {"caption": "", "alt_text": "", "success": False}
     if auto_caption:
-        ai_result = await generate_image_caption(file_content, context="gallery")
+        ai_result = await caption_queue.submit(await read_for_caption(file), context="gallery", media=result)
     
     return {
         "success": True,
@@ -62,41 +142,35 @@ async def upload_room_image(
 ):
     """
     Upload image for a specific room type.
-    If auto_caption is True, AI will generate caption and alt_text.
+    If auto_caption is True, a caption job is queued to generate caption and alt_text.
     """
     if not room_type_id:
         raise HTTPException(status_code=400, detail="room_type_id is required")
     
-    room = await db.room_types.find_one({"room_type_id": room_type_id}, {"_id": 0})
+    room = await db.room_types.find_one({"room_type_id": room_type_id}, {"_id": 1})
     if not room:
         raise HTTPException(status_code=404, detail="Room type not found")
     
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_image_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
+    await check_upload(file, validate_image_file)
     
     result = await upload_image(
-        file_content=file_content,
+        file_content=file.file,
         folder=f"rooms/{room_type_id}",
         force_format="webp"
     )
+    await index_asset(result)
     
     # Update room with new image
-    current_images = room.get("images", [])
-    current_images.append(result["secure_url"])
-    
     await db.room_types.update_one(
         {"room_type_id": room_type_id},
-        {"$set": {"images": current_images, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$push": {"images": result["secure_url"]}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    invalidate("room_types")
     
-    # Generate AI caption if requested
+    # Queue AI captioning; poll /media/caption-jobs/{job_id} for the result
     ai_result = {"caption": "", "alt_text": "", "success": False}
     if auto_caption:
-        ai_result = await generate_image_caption(file_content, context="room")
+        ai_result = await caption_queue.submit(await read_for_caption(file), context="room", media=result)
     
     return {
         "success": True,
@@ -105,6 +179,68 @@ async def upload_room_image(
     }
 
 
+# Most files accepted by one multi-file upload
+MAX_BATCH_FILES = 20
+
+
+@router.post("/upload/room-images")
+async def upload_room_images(
+    files: List[UploadFile] = File(...),
+    room_type_id: str = None,
+    auto_caption: bool = Query(True, description="Generate AI caption for each image"),
+    user: dict = Depends(require_admin)
+):
+    """
+    Upload several images to a room type at once.
+    Files upload in parallel within the image upload limit, and every successful
+    upload is added to the room with one $push. Returns one result per file, in order.
+    """
+    if not room_type_id:
+        raise HTTPException(status_code=400, detail="room_type_id is required")
+    if len(files) > MAX_BATCH_FILES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_FILES} files per upload")
+    
+    room = await db.room_types.find_one({"room_type_id": room_type_id}, {"_id": 1})
+    if not room:
+        raise HTTPException(status_code=404, detail="Room type not found")
+    
+    async def upload_one(file: UploadFile) -> dict:
+        try:
+            await check_upload(file, validate_image_file)
+            result = await upload_image(
+                file_content=file.file,
+                folder=f"rooms/{room_type_id}",
+                force_format="webp"
+            )
+        except HTTPException as e:
+            return {"filename": file.filename, "success": False, "error": e.detail}
+        except Exception as e:
+            return {"filename": file.filename, "success": False, "error": str(e)}
+        
+        await index_asset(result)
+        ai_result = {"caption": "", "alt_text": "", "success": False}
+        if auto_caption:
+            ai_result = await caption_queue.submit(await read_for_caption(file), context="room", media=result)
+        return {"filename": file.filename, "success": True, "data": result, "ai_caption": ai_result}
+    
+    results = await asyncio.gather(*(upload_one(f) for f in files))
+    
+    urls = [r["data"]["secure_url"] for r in results if r["success"]]
+    if urls:
+        await db.room_types.update_one(
+            {"room_type_id": room_type_id},
+            {"$push": {"images": {"$each": urls}}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}}
+        )
+        invalidate("room_types")
+    
+    return {
+        "success": len(urls) == len(results),
+        "uploaded": len(urls),
+        "failed": len(results) - len(urls),
+        "results": results
+    }
+
+
 @router.post("/upload/room-video")
 async def upload_room_video(
     file: UploadFile = File(...),
@@ -121,17 +257,13 @@ async def upload_room_video(
     if not room:
         raise HTTPException(status_code=404, detail="Room type not found")
     
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_video_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
+    await check_upload(file, validate_video_file)
     
     result = await upload_video(
-        file_content=file_content,
+        file_content=file.file,
         folder=f"rooms/{room_type_id}/videos"
     )
+    await index_asset(result)
     
     # Update room with video URL
     await db.room_types.update_one(
@@ -143,6 +275,7 @@ async def upload_room_video(
             "updated_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    invalidate("room_types")
     
     return {
         "success": True,
@@ -160,24 +293,20 @@ async def upload_content_image(
     """
     Upload image for CMS content sections.
     Sections: hero, about, facilities, promo, banner
-    If auto_caption is True, AI will generate caption and alt_text.
+    If auto_caption is True, a caption job is queued to generate caption and alt_text.
     """
-    file_content = await file.read()
-    file_size = len(file_content)
-    
-    is_valid, error = validate_image_file(file.content_type, file_size)
-    if not is_valid:
-        raise HTTPException(status_code=400, detail=error)
+    await check_upload(file, validate_image_file)
     
     result = await upload_image(
-        file_content=file_content,
+        file_content=file.file,
         folder=f"content/{section}"
     )
+    await index_asset(result)
     
-    # Generate AI caption if requested
+    # Queue AI captioning; poll /media/caption-jobs/{job_id} for the result
     ai_result = {"caption": "", "alt_text": "", "success": False}
     if auto_caption:
-        ai_result = await generate_image_caption(file_content, context="hotel")
+        ai_result = await caption_queue.submit(await read_for_caption(file), context="hotel", media=result)
     
     return {
         "success": True,
@@ -186,6 +315,15 @@ async def upload_content_image(
     }
 
 
+@router.get("/caption-jobs/{job_id}")
+async def get_caption_job_status(job_id: str, user: dict = Depends(require_admin)):
+    """Status of a queued AI caption; caption and alt_text are set once it is done."""
+    job = await get_caption_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Caption job not found")
+    return job
+
+
 @router.post("/convert")
 async def convert_media(
     file: UploadFile = File(...),
@@ -197,18 +335,24 @@ async def convert_media(
     Images -> WebP
     Videos -> Optimized MP4/WebM
     """
-    content = await file.read()
-    content_type = file.content_type
+    content_type = file.content_type or ""
+    if content_type.startswith("image/"):
+        await check_upload(file, validate_image_file)
+    elif content_type.startswith("video/"):
+        await check_upload(file, validate_video_file)
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported media type")
     
     try:
         if content_type.startswith("image/"):
             # Image optimization (force WebP)
             result = await upload_image(
-                file_content=content,
+                file_content=file.file,
                 folder="optimized",
                 force_format="webp",
                 public_id=filename # Use provided filename as public_id (SEO)
             )
+            await index_asset(result)
             return {
                 "message": "Image converted to WebP successfully",
                 "original_name": file.filename,
@@ -218,12 +362,13 @@ async def convert_media(
                 "public_id": result.get("public_id")
             }
             
-        elif content_type.startswith("video/"):
+        else:
             # Video optimization
             result = await upload_video(
-                file_content=content,
+                file_content=file.file,
                 folder="optimized-videos"
             )
+            await index_asset(result)
             return {
                 "message": "Video optimized successfully",
                 "original_name": file.filename,
@@ -234,9 +379,6 @@ async def convert_media(
                 "public_id": result.get("public_id")
             }
             
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported media type")
-            
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -250,7 +392,12 @@ async def delete_media_file(
     """
     Delete a media file from Cloudinary.
     """
-    result = await delete_media(public_id, resource_type)
+    try:
+        result = await delete_media(public_id, resource_type)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    # Gone from Cloudinary either way
+    await remove_asset(public_id, resource_type)
     
     if not result["success"]:
         raise HTTPException(status_code=404, detail=result["message"])
@@ -258,6 +405,122 @@ async def delete_media_file(
     return result
 
 
+# Most assets accepted by one bulk delete
+MAX_BULK_DELETE = 1000
+
+
+@router.post("/bulk-delete")
+async def bulk_delete_media(
+    payload: dict = Body(...),
+    user: dict = Depends(require_admin)
+):
+    """
+    Delete many media files at once.
+    Body: {"public_ids": [...] or "urls": [...], "resource_type": "image", "room_type_id": optional}
+    With room_type_id, the deleted images are also removed from that room with one $pull.
+    Returns the status of every public_id: deleted, not_found or error.
+    """
+    resource_type = payload.get("resource_type", "image")
+    public_ids = list(payload.get("public_ids") or [])
+    public_ids += [public_id_from_url(u) for u in payload.get("urls") or []]
+    public_ids = list(dict.fromkeys(p for p in public_ids if p))
+    if not public_ids:
+        raise HTTPException(status_code=400, detail="public_ids or urls are required")
+    if len(public_ids) > MAX_BULK_DELETE:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BULK_DELETE} files per request")
+    
+    room_type_id = payload.get("room_type_id")
+    room = None
+    if room_type_id:
+        room = await db.room_types.find_one({"room_type_id": room_type_id}, {"_id": 0, "images": 1})
+        if not room:
+            raise HTTPException(status_code=404, detail="Room type not found")
+    
+    statuses = await delete_media_batch(public_ids, resource_type)
+    
+    # Gone from Cloudinary either way
+    gone = {public_id for public_id, status in statuses.items() if status in ("deleted", "not_found")}
+    await remove_assets(list(gone), resource_type)
+    
+    if room:
+        urls = [u for u in room.get("images", []) if public_id_from_url(u) in gone]
+        if urls:
+            await db.room_types.update_one(
+                {"room_type_id": room_type_id},
+                {"$pull": {"images": {"$in": urls}}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}}
+            )
+            invalidate("room_types")
+    
+    return {
+        "success": len(gone) == len(public_ids),
+        "results": [{"public_id": public_id, "status": statuses[public_id]} for public_id in public_ids]
+    }
+
+
+@router.delete("/folder")
+async def purge_media_folder(
+    folder: str,
+    user: dict = Depends(require_admin)
+):
+    """
+    Delete every image and video in a media folder, e.g. "rooms/<room_type_id>" or "gallery/pool".
+    For a folder under rooms/<room_type_id>, the room also drops its images and video
+    from that folder.
+    Returns the status of every deleted public_id, like /bulk-delete.
+    """
+    folder = folder.strip().strip("/")
+    if not folder or ".." in folder.split("/"):
+        raise HTTPException(status_code=400, detail="A folder inside the media library is required")
+    
+    path = f"spencer-green/{folder}/"
+    try:
+        images, videos = await asyncio.gather(delete_folder(path, "image"), delete_folder(path, "video"))
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=str(e))
+    await remove_prefix(path)
+    
+    parts = folder.split("/")
+    if parts[0] == "rooms" and len(parts) > 1:
+        await _drop_room_media(parts[1], path)
+    
+    results = [
+        {"public_id": public_id, "resource_type": resource_type, "status": status}
+        for resource_type, deleted in (("image", images["deleted"]), ("video", videos["deleted"]))
+        for public_id, status in deleted.items()
+    ]
+    return {
+        "success": all(r["status"] in ("deleted", "not_found") for r in results),
+        "folder": path,
+        "results": results
+    }
+
+
+async def _drop_room_media(room_type_id: str, path: str):
+    """Remove a room's images and video that live under a purged folder."""
+    room = await db.room_types.find_one(
+        {"room_type_id": room_type_id},
+        {"_id": 0, "images": 1, "video_url": 1, "video_public_id": 1}
+    )
+    if not room:
+        return
+    
+    def in_folder(public_id) -> bool:
+        return bool(public_id) and public_id.startswith(path)
+    
+    update = {}
+    urls = [u for u in room.get("images", []) if in_folder(public_id_from_url(u))]
+    if urls:
+        update["$pull"] = {"images": {"$in": urls}}
+    if in_folder(room.get("video_public_id") or public_id_from_url(room.get("video_url"))):
+        update["$set"] = {"video_url": "", "video_thumbnail": "", "video_public_id": ""}
+    if not update:
+        return
+    
+    update.setdefault("$set", {})["updated_at"] = datetime.now(timezone.utc).isoformat()
+    await db.room_types.update_one({"room_type_id": room_type_id}, update)
+    invalidate("room_types")
+
+
 @router.delete("/delete-room-image")
 async def delete_room_image(
     room_type_id: str,
@@ -275,29 +538,17 @@ async def delete_room_image(
     if image_url not in current_images:
         raise HTTPException(status_code=404, detail="Image not found in room")
     
-    # Extract public_id from URL
-    # URL format: https://res.cloudinary.com/{cloud}/image/upload/{version}/{public_id}.{format}
-    try:
-        url_parts = image_url.split("/upload/")
-        if len(url_parts) > 1:
-            path_with_extension = url_parts[1]
-            # Remove version if present (v1234567890/)
-            if path_with_extension.startswith("v"):
-                path_with_extension = "/".join(path_with_extension.split("/")[1:])
-            # Remove extension
-            public_id = ".".join(path_with_extension.split(".")[:-1])
-            
-            # Try to delete from Cloudinary
-            await delete_media(public_id, "image")
-    except Exception as e:
-        pass  # Continue even if Cloudinary delete fails
+    public_id = public_id_from_url(image_url)
+    if public_id:
+        # The room loses the image even if the Cloudinary delete fails
+        await _delete_asset(public_id, "image")
     
     # Remove from room images
-    current_images.remove(image_url)
     await db.room_types.update_one(
         {"room_type_id": room_type_id},
-        {"$set": {"images": current_images, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$pull": {"images": image_url}, "$set": {"updated_at": datetime.now(timezone.utc).isoformat()}}
     )
+    invalidate("room_types")
     
     return {"success": True, "message": "Image deleted"}
 
@@ -316,10 +567,8 @@ async def delete_room_video(
     
     video_public_id = room.get("video_public_id")
     if video_public_id:
-        try:
-            await delete_media(video_public_id, "video")
-        except Exception:
-            pass  # Continue even if Cloudinary delete fails
+        # The room loses the video even if the Cloudinary delete fails
+        await _delete_asset(video_public_id, "video")
     
     # Clear video from room
     await db.room_types.update_one(
@@ -331,6 +580,7 @@ async def delete_room_video(
             "updated_at": datetime.now(timezone.utc).isoformat()
         }}
     )
+    invalidate("room_types")
     
     return {"success": True, "message": "Video deleted"}
 
@@ -347,17 +597,120 @@ async def get_signature(
     return generate_upload_signature(params_to_sign)
 
 
+@router.post("/upload-intents")
+async def create_direct_upload(
+    payload: dict = Body(...),
+    user: dict = Depends(require_admin)
+):
+    """
+    Start a direct browser-to-Cloudinary upload.
+    Body: {"kind": "room_image" | "room_video" | "gallery" | "content", "target_id": room_type_id / category / section}
+    Returns the upload URL and signed form fields for one fixed public_id.
+    """
+    return await create_upload_intent(payload.get("kind"), payload.get("target_id"), user)
+
+
+@router.post("/upload-intents/{intent_id}/complete")
+async def complete_direct_upload(
+    intent_id: str,
+    payload: dict = Body(...),
+    user: dict = Depends(require_admin)
+):
+    """
+    Confirm a direct upload with the public_id, version and signature
+    Cloudinary returned to the browser, and attach it to its target.
+    """
+    intent = await get_upload_intent(intent_id=intent_id)
+    if not intent:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    if payload.get("public_id") != intent["public_id"] or not verify_upload_response(
+        intent["public_id"], payload.get("version"), payload.get("signature", "")
+    ):
+        raise HTTPException(status_code=400, detail="Invalid upload signature")
+    
+    try:
+        media = await complete_upload(intent)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Could not confirm upload: {str(e)}")
+    
+    return {"success": True, "data": media}
+
+
+@router.post("/webhooks/cloudinary")
+async def cloudinary_webhook(request: Request):
+    """
+    Upload notifications from Cloudinary (notification_url of direct uploads).
+    Attaches the asset even if the browser never called /complete.
+    """
+    body = (await request.body()).decode("utf-8")
+    try:
+        # The SDK compares the timestamp against time.time()
+        timestamp = int(request.headers.get("x-cld-timestamp", ""))
+    except ValueError:
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    if not verify_notification(body, timestamp, request.headers.get("x-cld-signature", "")):
+        raise HTTPException(status_code=401, detail="Invalid signature")
+    
+    payload = json.loads(body)
+    if payload.get("notification_type") != "upload":
+        return {"status": "ignored"}
+    
+    intent = await get_upload_intent(public_id=payload.get("public_id"))
+    if not intent:
+        return {"status": "ignored"}
+    
+    await complete_upload(intent, media_from_response(payload, intent["resource_type"]))
+    return {"status": "ok"}
+
+
 @router.get("/gallery")
 async def get_gallery(
     prefix: Optional[str] = None,
     resource_type: str = "image",
+    tags: Optional[str] = Query(None, description="Comma-separated tags the asset must all have"),
+    q: Optional[str] = Query(None, description="Search captions, alt text and names"),
+    limit: int = Query(50, ge=1, le=200),
     next_cursor: Optional[str] = None,
     user: dict = Depends(require_admin)
 ):
     """
-    Get list of images from Cloudinary.
+    Get list of images from the local media index (kept in sync with Cloudinary).
+    """
+    tag_list = [t.strip() for t in tags.split(",") if t.strip()] if tags else None
+    return await list_assets(
+        prefix=prefix, resource_type=resource_type, tags=tag_list, q=q, limit=limit, next_cursor=next_cursor
+    )
+
+
+@router.post("/gallery/reconcile")
+async def reconcile_gallery(user: dict = Depends(require_admin)):
+    """
+    Re-sync the local media index with Cloudinary now instead of waiting for the periodic job.
+    """
+    return await reconcile_media_index()
+
+
+@router.get("/responsive")
+async def get_responsive_images(
+    url: List[str] = Query(..., description="Image URL; repeat for several images"),
+    sizes: str = Query("full", description="card, detail, full, thumb or a literal sizes attribute")
+):
+    """
+    Public: srcset/sizes data for room and content images, keyed by URL.
+    
+    Not cached: it is one indexed lookup, and caching arbitrary public URL
+    sets would let any client fill the response cache.
+    """
+    return await responsive_images(url[:100], sizes=sizes)
+
+
+@router.post("/derivatives/backfill")
+async def backfill_image_derivatives(user: dict = Depends(require_admin)):
+    """
+    Register and generate responsive derivatives for existing room and content images.
     """
-    return list_gallery_images(folder_prefix=prefix, resource_type=resource_type, next_cursor=next_cursor)
+    return await backfill_derivatives()
 
 
 @router.get("/config")
@@ -1,17 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from datetime import datetime, timezone
 
 from database import db
 from models.promo import PromoCode
 from services.auth import require_admin
 from services.audit import log_activity, get_changes
+from services.pricing import invalidate_pricing_cache
+from services.pagination import paginate, set_cursor_header
 
 router = APIRouter(prefix="/admin/promo-codes", tags=["promo"])
 
 @router.get("")
-async def get_promo_codes(user: dict = Depends(require_admin)):
-    promos = await db.promo_codes.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return promos
+async def get_promo_codes(
+    response: Response,
+    limit: int = 100,
+    cursor: str = None,
+    count: str = None,
+    user: dict = Depends(require_admin)
+):
+    """Promo codes, newest first; the next page's cursor is in X-Next-Cursor"""
+    page = await paginate(db.promo_codes, {}, "promo_id", limit, cursor, count_mode=count)
+    set_cursor_header(response, page)
+    return page["items"]
 
 @router.post("")
 async def create_promo_code(promo: PromoCode, request: Request, user: dict = Depends(require_admin)):
@@ -34,6 +44,7 @@ async def create_promo_code(promo: PromoCode, request: Request, user: dict = Dep
             raise HTTPException(status_code=400, detail="Promo code already exists")
         
         await db.promo_codes.insert_one(promo_doc)
+        invalidate_pricing_cache()
         
         # Fix: Ensure _id is removed before returning if it was added
         promo_doc.pop("_id", None)
@@ -68,6 +79,7 @@ async def update_promo_code(promo_id: str, promo: dict, request: Request, user:
     promo["updated_at"] = datetime.now(timezone.utc).isoformat()
     
     result = await db.promo_codes.update_one({"promo_id": promo_id}, {"$set": promo})
+    invalidate_pricing_cache()
     
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Promo code not found")
@@ -93,6 +105,7 @@ async def delete_promo_code(promo_id: str, request: Request, user: dict = Depend
         raise HTTPException(status_code=404, detail="Promo code not found")
 
     result = await db.promo_codes.delete_one({"promo_id": promo_id})
+    invalidate_pricing_cache()
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Promo code not found")
         
@@ -6,11 +6,18 @@ from database import db
 from models.rate_plan import RatePlan, RatePlanCreate
 from services.auth import require_admin
 from services.audit import log_activity
+from services.pricing import invalidate_pricing_cache
+from services.cache import cached_response, invalidate
 
 router = APIRouter(tags=["rate_plans"])
 
 @router.get("/rate-plans")
-async def get_rate_plans(room_type_id: str = None):
+async def get_rate_plans(request: Request, room_type_id: str = None):
+    async def load():
+        return await db.rate_plans.find(rate_plan_query(room_type_id), {"_id": 0}).to_list(100)
+    return await cached_response(request, ["rate_plans"], load)
+
+def rate_plan_query(room_type_id: str = None) -> dict:
     query = {}
     if room_type_id:
         # Fetch global plans (None) OR specific room plans (legacy) OR specific room plans (new list)
@@ -19,9 +26,7 @@ async def get_rate_plans(room_type_id: str = None):
             {"room_type_id": room_type_id}, # Legacy match
             {"room_type_ids": room_type_id} # New list match
         ]
-    
-    plans = await db.rate_plans.find(query, {"_id": 0}).to_list(100)
-    return plans
+    return query
 
 @router.get("/admin/rate-plans")
 async def get_all_rate_plans(user: dict = Depends(require_admin)):
@@ -38,6 +43,8 @@ async def create_rate_plan(plan: RatePlanCreate, request: Request, user: dict =
     plan_doc = RatePlan(**plan_dict).model_dump()
     
     await db.rate_plans.insert_one(plan_doc)
+    invalidate_pricing_cache()
+    invalidate("rate_plans")
     
     # Exclude _id
     plan_doc.pop("_id", None)
@@ -87,6 +94,8 @@ async def update_rate_plan(rate_plan_id: str, plan_update: dict, request: Reques
         {"rate_plan_id": rate_plan_id},
         {"$set": plan_update}
     )
+    invalidate_pricing_cache()
+    invalidate("rate_plans")
     
     await log_activity(
         user=user,
@@ -104,6 +113,8 @@ async def delete_rate_plan(rate_plan_id: str, request: Request, user: dict = Dep
     result = await db.rate_plans.delete_one({"rate_plan_id": rate_plan_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Rate plan not found")
+    invalidate_pricing_cache()
+    invalidate("rate_plans")
         
     await log_activity(
         user=user,
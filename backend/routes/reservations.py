@@ -1,20 +1,32 @@
-from fastapi import APIRouter, HTTPException, Depends, BackgroundTasks, Request
-from datetime import datetime, timezone, timedelta
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
+from datetime import datetime, timezone
+import re
+import uuid
+from pymongo import ReturnDocument
 
 from database import db
 from models.reservation import ReservationCreate, Reservation
 from services.auth import require_admin, require_super_admin
-from services.email import send_reservation_email
+from services.email import send_reservation_email, queue_reservation_email
 from services.audit import log_activity
+from services.pagination import paginate, set_cursor_header
+from services.availability import stay_dates, load_inventory_grid, nightly_rates, unavailable_dates
+from services.inventory import hold_inventory, release_inventory, commit_hold
+from services.pricing import (
+    get_active_rate_plan, get_active_promo, build_quote, verify_quote, promo_discount, claim_promo_usage
+)
+from services.rollups import record_reservation_change
 
 router = APIRouter(tags=["reservations"])
 
 @router.delete("/reservations/{reservation_id}")
 async def delete_reservation(reservation_id: str, request: Request, user: dict = Depends(require_super_admin)):
-    result = await db.reservations.delete_one({"reservation_id": reservation_id})
-    if result.deleted_count == 0:
+    deleted = await db.reservations.find_one_and_delete({"reservation_id": reservation_id}, {"_id": 0})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Reservation not found")
     
+    await record_reservation_change(before=deleted)
+    
     await log_activity(
         user=user,
         action="delete",
@@ -26,134 +38,91 @@ async def delete_reservation(reservation_id: str, request: Request, user: dict =
     return {"message": "Reservation deleted permanently"}
 
 @router.post("/reservations")
-async def create_reservation(reservation: ReservationCreate, background_tasks: BackgroundTasks):
+async def create_reservation(reservation: ReservationCreate):
     room = await db.room_types.find_one({"room_type_id": reservation.room_type_id}, {"_id": 0})
     if not room:
         raise HTTPException(status_code=404, detail="Room type not found")
     
     check_in = datetime.strptime(reservation.check_in, "%Y-%m-%d")
-    check_out = datetime.strptime(reservation.check_out, "%Y-%m-%d")
-    nights = (check_out - check_in).days
+    dates = stay_dates(reservation.check_in, reservation.check_out)
+    nights = len(dates)
     
     if nights <= 0:
         raise HTTPException(status_code=400, detail="Invalid dates")
     
-    inventory = await db.room_inventory.find({
-        "room_type_id": reservation.room_type_id,
-        "date": {"$gte": reservation.check_in, "$lt": reservation.check_out}
-    }, {"_id": 0}).to_list(nights)
+    # Reuse the price signed at search time when it matches this booking
+    rate_plan_id = reservation.rate_plan_id or "standard"
+    quote = verify_quote(reservation.quote_token) if reservation.quote_token else None
+    if quote and (
+        quote.room_type_id != reservation.room_type_id
+        or quote.check_in != reservation.check_in
+        or quote.check_out != reservation.check_out
+        or quote.rate_plan_id != rate_plan_id
+    ):
+        quote = None
     
-    total_rate = 0
-    for i in range(nights):
-        date_str = (check_in + timedelta(days=i)).strftime("%Y-%m-%d")
-        inv = next((x for x in inventory if x["date"] == date_str), None)
-        
-        if inv:
-            if inv.get("is_closed", False) or inv.get("allotment", 0) <= 0:
-                raise HTTPException(status_code=400, detail=f"Room not available on {date_str}")
-            total_rate += inv.get("rate", room.get("base_price", 500000))
-        else:
-            total_rate += room.get("base_price", 500000)
-    
-    # Apply Rate Plan
-    rate_plan_name = "Room Only"
-    if reservation.rate_plan_id and reservation.rate_plan_id != "standard":
-        rate_plan = await db.rate_plans.find_one({
-            "rate_plan_id": reservation.rate_plan_id,
-            "is_active": True
-        }, {"_id": 0})
-        
-        if rate_plan:
-            rate_plan_name = rate_plan["name"]
-            if rate_plan["price_modifier_type"] == "percent":
-                modifier = rate_plan["price_modifier_val"] / 100
-                total_rate = total_rate * (1 + modifier)
-            elif rate_plan["price_modifier_type"] == "absolute_add":
-                total_rate = total_rate + (rate_plan["price_modifier_val"] * nights)
-            elif rate_plan["price_modifier_type"] == "absolute_total":
-                total_rate = total_rate + rate_plan["price_modifier_val"]
-        else:
-            # Fallback or error? Let's treat invalid ID as Standard for robustness, or error?
-            # Ideally strict validation
-            raise HTTPException(status_code=400, detail="Invalid rate plan")
-    
-    discount = 0
-    if reservation.promo_code:
-        promo = await db.promo_codes.find_one({
-            "code": reservation.promo_code.upper(),
-            "is_active": True
-        }, {"_id": 0})
-        
-        if promo:
-            now = datetime.now(timezone.utc).isoformat()
-            if promo["valid_from"] <= now <= promo["valid_until"]:
-                if promo["current_usage"] < promo["max_usage"]:
-                    if not promo["room_type_ids"] or reservation.room_type_id in promo["room_type_ids"]:
-                        # Check valid_days (0=Sunday, 6=Saturday in JS convention)
-                        # Python weekday: 0=Monday, so we convert
-                        valid_days = promo.get("valid_days", [])
-                        if valid_days:
-                            # Convert Python weekday (0=Mon) to JS (0=Sun)
-                            py_weekday = check_in.weekday()  # 0=Mon, 6=Sun
-                            js_weekday = (py_weekday + 1) % 7  # 0=Sun, 6=Sat
-                            if js_weekday not in valid_days:
-                                # Promo not valid for this day
-                                pass
-                            else:
-                                # Day is valid, apply discount
-                                if promo["discount_type"] == "percent":
-                                    discount = total_rate * (promo["discount_value"] / 100)
-                                else:
-                                    discount = promo["discount_value"]
-                                
-                                await db.promo_codes.update_one(
-                                    {"promo_id": promo["promo_id"]},
-                                    {"$inc": {"current_usage": 1}}
-                                )
-                        else:
-                            # No day restriction, apply discount
-                            if promo["discount_type"] == "percent":
-                                discount = total_rate * (promo["discount_value"] / 100)
-                            else:
-                                discount = promo["discount_value"]
-                            
-                            await db.promo_codes.update_one(
-                                {"promo_id": promo["promo_id"]},
-                                {"$inc": {"current_usage": 1}}
-                            )
-    
-    res_doc = Reservation(
-        guest_name=reservation.guest_name,
-        guest_email=reservation.guest_email,
-        guest_phone=reservation.guest_phone,
-        room_type_id=reservation.room_type_id,
-        room_type_name=room["name"],
-        rate_plan_id=reservation.rate_plan_id,
-        rate_plan_name=rate_plan_name,
-        check_in=reservation.check_in,
-        check_out=reservation.check_out,
-        guests=reservation.guests,
-        nights=nights,
-        rate_per_night=total_rate / nights,
-        total_amount=total_rate - discount,
-        discount_amount=discount,
-        promo_code=reservation.promo_code,
-        special_requests=reservation.special_requests,
-        status="pending"
-    ).model_dump()
-    
-    await db.reservations.insert_one(res_doc)
-    
-    # Update inventory
-    for i in range(nights):
-        date_str = (check_in + timedelta(days=i)).strftime("%Y-%m-%d")
-        await db.room_inventory.update_one(
-            {"room_type_id": reservation.room_type_id, "date": date_str},
-            {"$inc": {"allotment": -1}}
-        )
+    if quote is None:
+        plan = None
+        if rate_plan_id != "standard":
+            plan = await get_active_rate_plan(rate_plan_id)
+            if not plan:
+                raise HTTPException(status_code=400, detail="Invalid rate plan")
+        grid = await load_inventory_grid([reservation.room_type_id], reservation.check_in, reservation.check_out)
+        unavailable = unavailable_dates(reservation.room_type_id, dates, grid)
+        if unavailable:
+            raise HTTPException(status_code=400, detail=f"Room not available on {unavailable[0]}")
+        night_rates = nightly_rates(room, dates, grid)
+        quote = build_quote(reservation.room_type_id, reservation.check_in, reservation.check_out, night_rates, plan)
+    
+    # Take the allotment for every night atomically before anything is written
+    reservation_id = str(uuid.uuid4())
+    unavailable = await hold_inventory(reservation.room_type_id, dates, reservation_id)
+    if unavailable:
+        raise HTTPException(status_code=400, detail=f"Room not available on {unavailable[0]}")
+    
+    # Anything failing before the reservation is stored gives the rooms back
+    try:
+        total_rate = quote.total_price
+        rate_plan_name = quote.rate_plan_name
+    
+        discount = 0
+        if reservation.promo_code:
+            promo = await get_active_promo(reservation.promo_code)
+            discount = promo_discount(promo, total_rate, reservation.room_type_id, check_in)
+            if discount and not await claim_promo_usage(promo):
+                discount = 0
     
-    # Send email in background
-    background_tasks.add_task(send_reservation_email, res_doc, room)
+        res_doc = Reservation(
+            reservation_id=reservation_id,
+            guest_name=reservation.guest_name,
+            guest_email=reservation.guest_email,
+            guest_phone=reservation.guest_phone,
+            room_type_id=reservation.room_type_id,
+            room_type_name=room["name"],
+            rate_plan_id=reservation.rate_plan_id,
+            rate_plan_name=rate_plan_name,
+            check_in=reservation.check_in,
+            check_out=reservation.check_out,
+            guests=reservation.guests,
+            nights=nights,
+            rate_per_night=total_rate / nights,
+            total_amount=total_rate - discount,
+            discount_amount=discount,
+            promo_code=reservation.promo_code,
+            special_requests=reservation.special_requests,
+            status="pending"
+        ).model_dump()
+    
+        await db.reservations.insert_one(res_doc)
+    except Exception:
+        await release_inventory(reservation.room_type_id, dates, reservation_id)
+        raise
+    await commit_hold(reservation.room_type_id, dates, reservation_id)
+    
+    await record_reservation_change(after=res_doc)
+    
+    # Queue confirmation emails; the mail dispatcher delivers and retries them
+    await queue_reservation_email(res_doc)
     
     # Return clean response without MongoDB _id
     clean_response = {k: v for k, v in res_doc.items() if k != '_id'}
@@ -181,10 +150,7 @@ async def verify_promo(request: dict):
     if not code:
         raise HTTPException(status_code=400, detail="Promo code is required")
     
-    promo = await db.promo_codes.find_one({
-        "code": code,
-        "is_active": True
-    }, {"_id": 0})
+    promo = await get_active_promo(code)
     
     if not promo:
         raise HTTPException(status_code=404, detail="Invalid promo code")
@@ -225,11 +191,20 @@ async def verify_promo(request: dict):
 # Admin routes
 @router.get("/admin/reservations")
 async def get_all_reservations(
+    response: Response,
     status: str = None,
     start_date: str = None,
     end_date: str = None,
+    q: str = None,
+    limit: int = 200,
+    cursor: str = None,
+    count: str = None,
     user: dict = Depends(require_admin)
 ):
+    """
+    Reservations, newest first; the next page's cursor is in X-Next-Cursor.
+    `q` matches booking code, guest name or guest email (case-insensitive).
+    """
     query = {}
     if status:
         query["status"] = status
@@ -237,9 +212,13 @@ async def get_all_reservations(
         query["check_in"] = {"$gte": start_date}
     if end_date:
         query["check_out"] = {"$lte": end_date}
+    if q and q.strip():
+        pattern = {"$regex": re.escape(q.strip()), "$options": "i"}
+        query["$or"] = [{"booking_code": pattern}, {"guest_name": pattern}, {"guest_email": pattern}]
     
-    reservations = await db.reservations.find(query, {"_id": 0}).sort("created_at", -1).to_list(1000)
-    return reservations
+    page = await paginate(db.reservations, query, "reservation_id", limit, cursor, count_mode=count)
+    set_cursor_header(response, page)
+    return page["items"]
 
 @router.put("/admin/reservations/{reservation_id}/status")
 async def update_reservation_status(reservation_id: str, status: str, request: Request, user: dict = Depends(require_admin)):
@@ -247,12 +226,16 @@ async def update_reservation_status(reservation_id: str, status: str, request: R
     if status not in valid_statuses:
         raise HTTPException(status_code=400, detail="Invalid status")
     
-    result = await db.reservations.update_one(
+    previous = await db.reservations.find_one_and_update(
         {"reservation_id": reservation_id},
-        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc).isoformat()}}
+        {"$set": {"status": status, "updated_at": datetime.now(timezone.utc).isoformat()}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE
     )
-    if result.matched_count == 0:
+    if not previous:
         raise HTTPException(status_code=404, detail="Reservation not found")
+    
+    await record_reservation_change(before=previous, after={**previous, "status": status})
         
     await log_activity(
         user=user,
@@ -289,6 +272,9 @@ async def update_reservation_details(reservation_id: str, updates: dict, request
         {"$set": update_data}
     )
     
+    # Amount and check-in date feed revenue and lead time
+    await record_reservation_change(before=reservation, after={**reservation, **update_data})
+    
     await log_activity(
         user=user,
         action="update_details",
@@ -307,16 +293,13 @@ async def resend_reservation_email(reservation_id: str, request: Request, user:
     if not reservation:
         raise HTTPException(status_code=404, detail="Reservation not found")
     
-    room = await db.room_types.find_one({"room_type_id": reservation["room_type_id"]}, {"_id": 0})
-    if not room:
-        room = {"name": reservation.get("room_type_name", "N/A")}
-    
     import logging
     logger = logging.getLogger(__name__)
     logger.info(f"Attempting to resend email for reservation {reservation_id} to {reservation['guest_email']}")
     
     try:
-        success = await send_reservation_email(reservation, room, is_resend=True)
+        result = await send_reservation_email(reservation, is_resend=True)
+        success = result["success"]
         logger.info(f"Resend email result for {reservation_id}: {success}")
     except Exception as e:
         logger.error(f"Error resending email for {reservation_id}: {str(e)}")
@@ -332,7 +315,11 @@ async def resend_reservation_email(reservation_id: str, request: Request, user:
     )
     
     if success:
-        return {"message": "Email sent successfully", "success": True}
+        return {"message": "Email sent successfully", "success": True, "recipients": result["recipients"]}
     else:
-        raise HTTPException(status_code=500, detail="Failed to send email")
+        failed = [r for r in result["recipients"] if r["status"] != "sent"]
+        raise HTTPException(
+            status_code=500,
+            detail="Failed to send email to " + ", ".join(f"{r['to_email']} ({r['error']})" for r in failed)
+        )
 
@@ -1,8 +1,10 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from database import db
 from models.review import ReviewCreate, Review
 from services.auth import require_admin, require_super_admin
 from services.audit import log_activity, get_changes
+from services.cache import cached_response, invalidate
+from services.pagination import paginate, set_cursor_header
 
 router = APIRouter(tags=["reviews"])
 
@@ -16,6 +18,7 @@ async def delete_review(review_id: str, request: Request, user: dict = Depends(r
     result = await db.reviews.delete_one({"review_id": review_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Review not found")
+    invalidate("reviews")
     
     # Log activity
     await log_activity(
@@ -30,9 +33,10 @@ async def delete_review(review_id: str, request: Request, user: dict = Depends(r
     return {"message": "Review deleted permanently"}
 
 @router.get("/reviews")
-async def get_visible_reviews():
-    reviews = await db.reviews.find({"is_visible": True}, {"_id": 0}).sort("created_at", -1).to_list(50)
-    return reviews
+async def get_visible_reviews(request: Request):
+    async def load():
+        return await db.reviews.find({"is_visible": True}, {"_id": 0}).sort("created_at", -1).to_list(50)
+    return await cached_response(request, ["reviews"], load)
 
 @router.post("/reviews")
 async def create_review(review: ReviewCreate, request: Request):
@@ -53,9 +57,17 @@ async def create_review(review: ReviewCreate, request: Request):
     return {"message": "Review submitted for approval"}
 
 @router.get("/admin/reviews")
-async def get_all_reviews(user: dict = Depends(require_admin)):
-    reviews = await db.reviews.find({}, {"_id": 0}).sort("created_at", -1).to_list(100)
-    return reviews
+async def get_all_reviews(
+    response: Response,
+    limit: int = 100,
+    cursor: str = None,
+    count: str = None,
+    user: dict = Depends(require_admin)
+):
+    """Reviews, newest first; the next page's cursor is in X-Next-Cursor"""
+    page = await paginate(db.reviews, {}, "review_id", limit, cursor, count_mode=count)
+    set_cursor_header(response, page)
+    return page["items"]
 
 @router.put("/admin/reviews/{review_id}/visibility")
 async def toggle_review_visibility(review_id: str, is_visible: bool, request: Request, user: dict = Depends(require_admin)):
@@ -70,6 +82,7 @@ async def toggle_review_visibility(review_id: str, is_visible: bool, request: Re
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Review not found")
+    invalidate("reviews")
         
     # Log activity
     await log_activity(
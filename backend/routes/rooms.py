@@ -1,17 +1,38 @@
-from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi import APIRouter, HTTPException, Depends, Request, Response
 from datetime import datetime, timezone, timedelta
+from typing import Optional
 import uuid
+from pymongo import UpdateOne
+
+try:
+    import msgpack
+except ImportError:  # Optional: only needed for format=msgpack
+    msgpack = None
 
 from database import db
 from models.room import RoomType, RoomInventory, BulkUpdateRequest
 from services.auth import require_admin
 from services.audit import log_activity, get_changes
+from services.availability import get_room_availability
+from services.inventory import build_inventory_calendar
+from services.cache import cached_response, invalidate
+from services.responsive import responsive_images
+from services.pricing import (
+    STANDARD_PLAN, get_active_rate_plans, plans_for_room, build_quote, sign_quote,
+    invalidate_pricing_cache
+)
 
 router = APIRouter(tags=["rooms"])
 
+MAX_GRID_DAYS = 400
+
 # Public routes
 @router.get("/rooms")
-async def get_rooms():
+async def get_rooms(request: Request):
+    # Today's rate/allotment come from inventory, so both collections tag it
+    return await cached_response(request, ["room_types", "room_inventory", "media_assets"], load_rooms)
+
+async def load_rooms():
     rooms = await db.room_types.find({"is_active": True}, {"_id": 0}).sort("display_order", 1).to_list(100)
     
     # Enrich with today's rate/availability
@@ -41,15 +62,24 @@ async def get_rooms():
             # User said "jika ada harga tersedia di allotment".
             # I will just set available_rate.
             pass
+    
+    # srcset/sizes for every room image, aligned with room["images"]
+    variants = await responsive_images([u for r in rooms for u in r.get("images") or []], sizes="detail")
+    for room in rooms:
+        room["image_set"] = [variants[u] for u in room.get("images") or [] if u in variants]
             
     return rooms
 
 @router.get("/rooms/{room_type_id}")
-async def get_room(room_type_id: str):
-    room = await db.room_types.find_one({"room_type_id": room_type_id}, {"_id": 0})
-    if not room:
-        raise HTTPException(status_code=404, detail="Room not found")
-    return room
+async def get_room(room_type_id: str, request: Request):
+    async def load():
+        room = await db.room_types.find_one({"room_type_id": room_type_id}, {"_id": 0})
+        if not room:
+            raise HTTPException(status_code=404, detail="Room not found")
+        variants = await responsive_images(room.get("images") or [], sizes="detail")
+        room["image_set"] = [variants[u] for u in room.get("images") or [] if u in variants]
+        return room
+    return await cached_response(request, ["room_types", "media_assets"], load)
 
 # Admin routes
 @router.post("/admin/rooms")
@@ -58,6 +88,7 @@ async def create_room(room: RoomType, request: Request, user: dict = Depends(req
     await db.room_types.insert_one(room_doc)
     # Exclude _id from response (MongoDB adds it during insert)
     room_doc.pop("_id", None)
+    invalidate("room_types")
     
     # Log the activity
     await log_activity(
@@ -82,6 +113,7 @@ async def update_room(room_type_id: str, room: dict, request: Request, user: dic
     result = await db.room_types.update_one({"room_type_id": room_type_id}, {"$set": room})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Room not found")
+    invalidate("room_types")
     
     # Log the activity
     changes = get_changes(old_room, room, ["name", "description", "base_price", "max_guests", "amenities"])
@@ -109,6 +141,7 @@ async def delete_room(room_type_id: str, request: Request, user: dict = Depends(
     )
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Room not found")
+    invalidate("room_types")
     
     # Log the activity
     await log_activity(
@@ -134,6 +167,7 @@ async def reorder_rooms(order_data: dict, user: dict = Depends(require_admin)):
             {"room_type_id": room_id},
             {"$set": {"display_order": index}}
         )
+    invalidate("room_types")
             
     return {"message": "Rooms reordered successfully"}
 
@@ -208,6 +242,8 @@ async def fix_duplicate_rooms(user: dict = Depends(require_admin)):
             
             stats["merged"] += 1
             
+    invalidate_pricing_cache()
+    invalidate("room_types", "room_inventory", "rate_plans")
     return {"message": "Deduplication complete", "stats": stats}
 
 # Inventory routes
@@ -219,9 +255,37 @@ async def get_inventory(room_type_id: str = None, start_date: str = None, end_da
     if start_date and end_date:
         query["date"] = {"$gte": start_date, "$lte": end_date}
     
-    inventory = await db.room_inventory.find(query, {"_id": 0}).to_list(1000)
+    inventory = await db.room_inventory.find(query, {"_id": 0, "holds": 0}).to_list(1000)
     return inventory
 
+@router.get("/inventory/grid")
+async def get_inventory_grid(
+    start_date: str,
+    end_date: str,
+    room_type_ids: Optional[str] = None,
+    format: str = "json"
+):
+    """
+    Columnar inventory calendar for all room types in one request.
+    room_type_ids is an optional comma-separated filter; format=msgpack
+    returns the same payload msgpack-encoded.
+    """
+    try:
+        days = (datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(start_date, "%Y-%m-%d")).days
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Dates must be YYYY-MM-DD")
+    if days < 0 or days > MAX_GRID_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range must be between 1 and {MAX_GRID_DAYS + 1} days")
+    
+    ids = [rid for rid in room_type_ids.split(",") if rid] if room_type_ids else None
+    grid = await build_inventory_calendar(start_date, end_date, ids)
+    
+    if format == "msgpack":
+        if msgpack is None:
+            raise HTTPException(status_code=400, detail="msgpack encoding is not available")
+        return Response(content=msgpack.packb(grid), media_type="application/x-msgpack")
+    return grid
+
 @router.post("/admin/inventory")
 async def create_inventory(inventory: RoomInventory, user: dict = Depends(require_admin)):
     existing = await db.room_inventory.find_one({
@@ -236,186 +300,125 @@ async def create_inventory(inventory: RoomInventory, user: dict = Depends(requir
         )
     else:
         await db.room_inventory.insert_one(inventory.model_dump())
+    invalidate("room_inventory")
     
     return inventory.model_dump()
 
 @router.post("/admin/inventory/bulk-update")
 async def bulk_update_inventory(request: BulkUpdateRequest, req: Request, user: dict = Depends(require_admin)):
-    start = datetime.strptime(request.start_date, "%Y-%m-%d")
-    end = datetime.strptime(request.end_date, "%Y-%m-%d")
+    room_type_ids = list(dict.fromkeys(
+        request.room_type_ids + ([request.room_type_id] if request.room_type_id else [])
+    ))
+    date_ranges = [(r.start_date, r.end_date) for r in request.date_ranges]
+    if request.start_date and request.end_date:
+        date_ranges.append((request.start_date, request.end_date))
+    
+    if not room_type_ids:
+        raise HTTPException(status_code=400, detail="room_type_id or room_type_ids is required")
+    if not date_ranges:
+        raise HTTPException(status_code=400, detail="start_date/end_date or date_ranges is required")
     
-    room = await db.room_types.find_one({"room_type_id": request.room_type_id}, {"_id": 0})
-    if not room:
+    rooms = await db.room_types.find({"room_type_id": {"$in": room_type_ids}}, {"_id": 0}).to_list(None)
+    if len(rooms) != len(room_type_ids):
         raise HTTPException(status_code=404, detail="Room type not found")
     
-    current = start
-    updated_count = 0
-    while current <= end:
-        # Check day validation if specific days are requested
-        # Python weekday: 0=Mon, 6=Sun
-        if request.days_of_week is not None and len(request.days_of_week) > 0:
-            if current.weekday() not in request.days_of_week:
-                current += timedelta(days=1)
+    # Precompute the target dates once for all rooms
+    # Python weekday: 0=Mon, 6=Sun
+    dates = set()
+    for start_date, end_date in date_ranges:
+        start = datetime.strptime(start_date, "%Y-%m-%d")
+        end = datetime.strptime(end_date, "%Y-%m-%d")
+        for i in range((end - start).days + 1):
+            day = start + timedelta(days=i)
+            if request.days_of_week and day.weekday() not in request.days_of_week:
                 continue
-                
-        date_str = current.strftime("%Y-%m-%d")
-        update_fields = {}
-        
-        if request.allotment is not None:
-            update_fields["allotment"] = request.allotment
-        if request.rate is not None:
-            update_fields["rate"] = request.rate
-        if request.is_closed is not None:
-            update_fields["is_closed"] = request.is_closed
-        
-        if update_fields:
-            existing = await db.room_inventory.find_one({
-                "room_type_id": request.room_type_id,
-                "date": date_str
-            }, {"_id": 0})
-            
-            if existing:
-                await db.room_inventory.update_one(
-                    {"inventory_id": existing["inventory_id"]},
-                    {"$set": update_fields}
-                )
-            else:
-                new_inventory = {
-                    "inventory_id": str(uuid.uuid4()),
-                    "room_type_id": request.room_type_id,
-                    "date": date_str,
-                    "allotment": request.allotment if request.allotment is not None else 5,
-                    "rate": request.rate if request.rate is not None else room.get("base_price", 500000),
-                    "is_closed": request.is_closed if request.is_closed is not None else False
-                }
-                await db.room_inventory.insert_one(new_inventory)
-            
-            updated_count += 1
+            dates.add(day.strftime("%Y-%m-%d"))
+    dates = sorted(dates)
+    
+    update_fields = {}
+    if request.allotment is not None:
+        update_fields["allotment"] = request.allotment
+    if request.rate is not None:
+        update_fields["rate"] = request.rate
+    if request.is_closed is not None:
+        update_fields["is_closed"] = request.is_closed
+    
+    updated_count = 0
+    if update_fields and dates:
+        operations = []
+        for room in rooms:
+            # Defaults only apply to days that have no inventory record yet
+            defaults = {
+                "allotment": 5,
+                "rate": room.get("base_price", 500000),
+                "is_closed": False
+            }
+            for field in update_fields:
+                defaults.pop(field)
+            for date_str in dates:
+                operations.append(UpdateOne(
+                    {"room_type_id": room["room_type_id"], "date": date_str},
+                    {
+                        "$set": update_fields,
+                        "$setOnInsert": {"inventory_id": str(uuid.uuid4()), **defaults}
+                    },
+                    upsert=True
+                ))
         
-        current += timedelta(days=1)
+        await db.room_inventory.bulk_write(operations, ordered=False)
+        updated_count = len(dates)
+    invalidate("room_inventory")
     
     # Log the activity
     await log_activity(
         user=user,
         action="update",
         resource="inventory",
-        resource_id=request.room_type_id,
+        resource_id=room_type_ids[0] if len(room_type_ids) == 1 else ",".join(room_type_ids),
         details={
-            "room_name": room.get("name"),
-            "range": f"{request.start_date} to {request.end_date}",
+            "room_name": ", ".join(r.get("name", "") for r in rooms),
+            "range": ", ".join(f"{start} to {end}" for start, end in date_ranges),
             "days_updated": updated_count,
-            "updates": {
-                k: v for k, v in request.model_dump().items() 
-                if k in ["allotment", "rate", "is_closed"] and v is not None
-            }
+            "rooms_updated": len(rooms),
+            "updates": update_fields
         },
         ip_address=req.client.host if req.client else None
     )
     
+    if len(rooms) > 1:
+        return {"message": f"Updated {updated_count} days across {len(rooms)} room types"}
     return {"message": f"Updated {updated_count} days"}
 
 # Availability
 @router.get("/availability")
 async def check_availability(check_in: str, check_out: str):
     rooms = await db.room_types.find({"is_active": True}, {"_id": 0}).sort("display_order", 1).to_list(100)
+    rate_plans = await get_active_rate_plans()
     available_rooms = []
-    
-    # Get active rate plans
-    rate_plans = await db.rate_plans.find({"is_active": True}, {"_id": 0}).to_list(100)
-    
-    # Organize rate plans by room_type_id (None = global)
-    global_plans = [p for p in rate_plans if not p.get("room_type_id")]
-    specific_plans = {p["room_type_id"]: [] for p in rate_plans if p.get("room_type_id")}
-    for p in rate_plans:
-        if p.get("room_type_id"):
-            specific_plans[p["room_type_id"]].append(p)
 
-    for room in rooms:
-        # Check inventory availability first
-        inventory = await db.room_inventory.find({
-            "room_type_id": room["room_type_id"],
-            "date": {"$gte": check_in, "$lt": check_out}
-        }, {"_id": 0}).to_list(100)
-        
-        # Calculate base rate per night logic
-        # We need to know the total base price for the stay to apply rate plans correctly
-        is_available = True
-        total_base_price = 0
-        night_rates = []
+    # Inventory for every room and night comes from a single query
+    for room, night_rates in await get_room_availability(rooms, check_in, check_out):
+        # "Room Only" is always offered at the plain inventory price
+        plans = [STANDARD_PLAN] + plans_for_room(rate_plans, room["room_type_id"])
         
-        check_in_date = datetime.strptime(check_in, "%Y-%m-%d")
-        check_out_date = datetime.strptime(check_out, "%Y-%m-%d")
-        nights = (check_out_date - check_in_date).days
+        calculated_plans = []
+        for plan in plans:
+            quote = build_quote(room["room_type_id"], check_in, check_out, night_rates, plan)
+            calculated_plans.append({
+                "rate_plan_id": plan["rate_plan_id"],
+                "name": plan["name"],
+                "description": plan["description"],
+                "total_price": quote.total_price,
+                "nightly_price": quote.total_price / quote.nights,
+                "conditions": plan.get("conditions", []),
+                # Handed back on booking so the price is not recomputed
+                "quote_token": sign_quote(quote)
+            })
         
-        if nights <= 0:
-            is_available = False
-        else:
-            for i in range(nights):
-                date_str = (check_in_date + timedelta(days=i)).strftime("%Y-%m-%d")
-                inv = next((x for x in inventory if x["date"] == date_str), None)
-                
-                if inv:
-                    if inv.get("is_closed", False) or inv.get("allotment", 0) <= 0:
-                        is_available = False
-                        break
-                    rate = inv.get("rate", room.get("base_price", 500000))
-                    total_base_price += rate
-                    night_rates.append(rate)
-                else:
-                    # Default if no specific inventory
-                    rate = room.get("base_price", 500000)
-                    total_base_price += rate
-                    night_rates.append(rate)
+        room["rate_plans"] = calculated_plans
+        # Keep backward compatibility for frontend that expects 'available_rate'
+        room["available_rate"] = min(p["nightly_price"] for p in calculated_plans)
         
-        if is_available:
-            # Calculate available rate plans for this room
-            room_plans = global_plans + specific_plans.get(room["room_type_id"], [])
-            
-            calculated_plans = []
-            
-            # Always add "Room Only" if no plans, or as a base? 
-            # Let's assume there's always a "Room Only" implicitly or we can create a dummy one
-            # Ideally, the user creates rate plans. If there are none, we just show base price.
-            # But specific logic: "Room Only" is just base price.
-            
-            standard_plan = {
-                "rate_plan_id": "standard",
-                "name": "Room Only",
-                "description": "Room only, standard cancellation policy",
-                "total_price": total_base_price,
-                "nightly_price": total_base_price / nights if nights > 0 else 0,
-                "conditions": ["free-cancellation"]
-            }
-            calculated_plans.append(standard_plan)
-            
-            for plan in room_plans:
-                plan_price = total_base_price
-                
-                if plan["price_modifier_type"] == "percent":
-                    # e.g. -10 means 10% discount, +10 means 10% surcharge
-                    modifier = plan["price_modifier_val"] / 100
-                    plan_price = total_base_price * (1 + modifier)
-                elif plan["price_modifier_type"] == "absolute_add":
-                    # Add X per night
-                    plan_price = total_base_price + (plan["price_modifier_val"] * nights)
-                elif plan["price_modifier_type"] == "absolute_total":
-                    # Fixed total add (rare, but maybe "cleaning fee" style?) 
-                    # Or maybe replace price? "absolute_total" usually means "add X to total"
-                    plan_price = total_base_price + plan["price_modifier_val"]
-                
-                calculated_plans.append({
-                    "rate_plan_id": plan["rate_plan_id"],
-                    "name": plan["name"],
-                    "description": plan["description"],
-                    "total_price": plan_price,
-                    "nightly_price": plan_price / nights if nights > 0 else 0,
-                    "conditions": plan.get("conditions", [])
-                })
-            
-            room["rate_plans"] = calculated_plans
-            # Keep backward compatibility for frontend that expects 'available_rate'
-            room["available_rate"] = min(p["nightly_price"] for p in calculated_plans)
-            
-            available_rooms.append(room)
+        available_rooms.append(room)
     
     return available_rooms
@@ -5,6 +5,14 @@ import logging
 from config import CORS_ORIGINS
 from config import CORS_ORIGINS
 from prisma_client import connect_db, disconnect_db
+from database import ensure_indexes
+from services.analytics import daily_stats_buffer, event_sink
+from services.rollups import start_compaction, stop_compaction
+from services.captions import caption_queue
+from services.media_index import start_reconcile, stop_reconcile
+from services.inventory import start_hold_sweep, stop_hold_sweep
+from services.mailer import mail_queue
+from services.audit import audit_sink
 from routes import (
     auth_router,
     rooms_router,
@@ -50,6 +58,8 @@ app.add_middleware(
     allow_origins=["*"], # TEMPORARY FIX: Allow all origins to debug CORS
     allow_methods=["*"],
     allow_headers=["*"],
+    # Cursor pagination headers of the admin listings
+    expose_headers=["X-Next-Cursor", "X-Total-Count"],
 )
 
 @api_router.get("/")
@@ -62,7 +72,25 @@ app.include_router(api_router)
 @app.on_event("startup")
 async def startup_db_client():
     await connect_db()
+    await ensure_indexes()
+    daily_stats_buffer.start()
+    event_sink.start()
+    audit_sink.start()
+    start_compaction()
+    await caption_queue.start()
+    start_reconcile()
+    start_hold_sweep()
+    mail_queue.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    stop_compaction()
+    await caption_queue.stop()
+    stop_reconcile()
+    stop_hold_sweep()
+    await mail_queue.stop()
+    # Flush buffered writes before the connections go away
+    await daily_stats_buffer.stop()
+    await event_sink.stop()
+    await audit_sink.stop()
     await disconnect_db()
@@ -1,7 +1,7 @@
 from services.auth import hash_password, verify_password, create_token, get_current_user, require_admin
-from services.email import send_reservation_email, send_password_reset_email
+from services.email import send_reservation_email, queue_reservation_email, send_password_reset_email
 
 __all__ = [
     "hash_password", "verify_password", "create_token", "get_current_user", "require_admin",
-    "send_reservation_email", "send_password_reset_email"
+    "send_reservation_email", "queue_reservation_email", "send_password_reset_email"
 ]
@@ -0,0 +1,24 @@
+from config import (
+    ANALYTICS_FLUSH_INTERVAL_SECONDS, ANALYTICS_MAX_PENDING_COUNTERS,
+    ANALYTICS_EVENT_BATCH_SIZE, ANALYTICS_EVENT_MAX_LATENCY_SECONDS, ANALYTICS_EVENT_QUEUE_SIZE
+)
+from services.batching import CounterBuffer, BatchWriter
+from services.rollups import record_events
+
+# Page view counters for daily_stats, coalesced in memory per day
+daily_stats_buffer = CounterBuffer(
+    "daily_stats",
+    key_field="date",
+    flush_interval=ANALYTICS_FLUSH_INTERVAL_SECONDS,
+    max_counters=ANALYTICS_MAX_PENDING_COUNTERS
+)
+
+# Funnel / engagement events, written to analytics_events in batches
+event_sink = BatchWriter(
+    "analytics_events",
+    max_batch_size=ANALYTICS_EVENT_BATCH_SIZE,
+    max_latency=ANALYTICS_EVENT_MAX_LATENCY_SECONDS,
+    max_queue=ANALYTICS_EVENT_QUEUE_SIZE,
+    # Keeps the dashboard's daily funnel counters current
+    on_flush=record_events
+)
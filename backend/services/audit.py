@@ -1,6 +1,24 @@
 import uuid
+import logging
 from datetime import datetime, timezone
+
+from config import AUDIT_BATCH_SIZE, AUDIT_MAX_LATENCY_SECONDS, AUDIT_QUEUE_SIZE
 from database import db
+from services.batching import BatchWriter
+
+logger = logging.getLogger(__name__)
+
+# Audit entries, written to audit_logs in batches behind the request
+audit_sink = BatchWriter(
+    "audit_logs",
+    max_batch_size=AUDIT_BATCH_SIZE,
+    max_latency=AUDIT_MAX_LATENCY_SECONDS,
+    max_queue=AUDIT_QUEUE_SIZE
+)
+
+# Resources whose entries must be stored before the request returns
+SYNC_RESOURCES = {"users"}
+
 
 async def log_activity(
     user: dict,
@@ -8,11 +26,18 @@ async def log_activity(
     resource: str,
     resource_id: str = None,
     details: dict = None,
-    ip_address: str = None
+    ip_address: str = None,
+    sync: bool = None
 ):
     """
     Log an activity to the audit_logs collection.
     
+    Entries are queued on audit_sink and written in batches, except for
+    security-critical ones (SYNC_RESOURCES, e.g. user deletes), which are
+    inserted before returning; a failed insert raises. An entry that cannot
+    be queued, because the sink is full or not running, is written directly
+    rather than dropped.
+    
     Args:
         user: Current user dict (from auth)
         action: Action performed (create, update, delete, login)
@@ -20,6 +45,7 @@ async def log_activity(
         resource_id: ID of the affected resource
         details: Dictionary with change details (e.g., {"field": {"old": x, "new": y}})
         ip_address: Client IP address
+        sync: Force (True) or skip (False) the synchronous write; by default only for SYNC_RESOURCES
     """
     log_doc = {
         "log_id": str(uuid.uuid4()),
@@ -34,14 +60,39 @@ async def log_activity(
         "created_at": datetime.now(timezone.utc).isoformat()
     }
     
-    await db.audit_logs.insert_one(log_doc)
+    if sync is None:
+        sync = resource in SYNC_RESOURCES
+    if sync:
+        await db.audit_logs.insert_one(log_doc)
+        log_doc.pop("_id", None)
+    elif not audit_sink.running or not audit_sink.submit(log_doc, count_dropped=False):
+        await audit_sink.write_now([log_doc])
     return log_doc
 
 
+def _diff(old, new, path: str, changes: dict):
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in list(old) + [k for k in new if k not in old]:
+            _diff(old.get(key), new.get(key), f"{path}.{key}", changes)
+    elif old != new:
+        change = {"old": old, "new": new}
+        if isinstance(old, list) and isinstance(new, list):
+            try:
+                change["added"] = [v for v in new if v not in old]
+                change["removed"] = [v for v in old if v not in new]
+            except TypeError:
+                pass
+        changes[path] = change
+
+
 def get_changes(old_data: dict, new_data: dict, fields_to_track: list = None):
     """
     Compare old and new data and return a dict of changes.
     
+    Nested dictionaries are compared key by key and reported under dotted
+    paths ("permissions.rooms"); changed lists also get "added" and
+    "removed" items.
+    
     Args:
         old_data: Original data
         new_data: Updated data
@@ -56,10 +107,6 @@ def get_changes(old_data: dict, new_data: dict, fields_to_track: list = None):
         fields_to_track = set(old_data.keys()) | set(new_data.keys())
     
     for field in fields_to_track:
-        old_val = old_data.get(field)
-        new_val = new_data.get(field)
-        
-        if old_val != new_val:
-            changes[field] = {"old": old_val, "new": new_val}
+        _diff(old_data.get(field), new_data.get(field), field, changes)
     
     return changes
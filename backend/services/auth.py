@@ -1,18 +1,68 @@
+import asyncio
 import bcrypt
 import jwt
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone, timedelta
 from fastapi import HTTPException, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from config import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION_HOURS
+from cachetools import TTLCache
+from config import (
+    JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION_HOURS,
+    PRINCIPAL_CACHE_TTL_SECONDS, PRINCIPAL_CACHE_MAX_ENTRIES,
+    BCRYPT_ROUNDS, PASSWORD_HASH_WORKERS, PASSWORD_HASH_QUEUE_SIZE
+)
 
 security = HTTPBearer(auto_error=False)
 
+# Users resolved from bearer tokens, keyed by (user_id, token).
+# Admin user edits call invalidate_principal(); the short TTL bounds how long
+# other workers keep serving the old permissions.
+_principal_cache = TTLCache(maxsize=PRINCIPAL_CACHE_MAX_ENTRIES, ttl=PRINCIPAL_CACHE_TTL_SECONDS)
+
+def invalidate_principal(user_id: str):
+    """Drop cached principals of a user after their role or permissions change."""
+    for key in [k for k in list(_principal_cache.keys()) if k[0] == user_id]:
+        _principal_cache.pop(key, None)
+
 def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode('utf-8')
 
 def verify_password(password: str, hashed: str) -> bool:
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def needs_rehash(hashed: str) -> bool:
+    """True if the hash was made with a different cost factor than BCRYPT_ROUNDS."""
+    try:
+        return int(hashed.split("$")[2]) != BCRYPT_ROUNDS
+    except (IndexError, ValueError):
+        return True
+
+# bcrypt releases the GIL, so hashing runs on a small dedicated pool instead of
+# the event loop. At most PASSWORD_HASH_WORKERS hashes run at once and up to
+# PASSWORD_HASH_QUEUE_SIZE more may wait; beyond that callers get a 429.
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0
+
+async def _run_hash(func, *args):
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE_SIZE:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many login attempts, please try again shortly",
+            headers={"Retry-After": "1"}
+        )
+    _hash_pending += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, func, *args)
+    finally:
+        _hash_pending -= 1
+
+async def hash_password_async(password: str) -> str:
+    return await _run_hash(hash_password, password)
+
+async def verify_password_async(password: str, hashed: str) -> bool:
+    return await _run_hash(verify_password, password, hashed)
+
 def create_token(user_id: str, email: str, role: str) -> str:
     payload = {
         "user_id": user_id,
@@ -22,11 +72,21 @@ def create_token(user_id: str, email: str, role: str) -> str:
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
+def decode_auth_token(token: str) -> dict:
+    """
+    Decode a login token. Other tokens signed with JWT_SECRET (booking quotes
+    carry an audience) are rejected, as is anything without a user_id.
+    """
+    payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], options={"require": ["exp", "user_id"]})
+    if payload.get("type") is not None:
+        raise jwt.InvalidTokenError("Not an auth token")
+    return payload
+
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = decode_auth_token(credentials.credentials)
         return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
@@ -39,12 +99,19 @@ async def get_current_user_with_permissions(credentials: HTTPAuthorizationCreden
     if not credentials:
         raise HTTPException(status_code=401, detail="Not authenticated")
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        # Fetch full user from database to get permissions
-        user_doc = await db.users.find_one({"user_id": payload["user_id"]}, {"_id": 0, "password": 0})
-        if not user_doc:
-            raise HTTPException(status_code=404, detail="User not found")
-        return user_doc
+        payload = decode_auth_token(credentials.credentials)
+        # Signature and expiry are checked above on every request; only the
+        # user lookup is cached
+        cache_key = (payload["user_id"], credentials.credentials)
+        user_doc = _principal_cache.get(cache_key)
+        if user_doc is None:
+            # Fetch full user from database to get permissions
+            user_doc = await db.users.find_one({"user_id": payload["user_id"]}, {"_id": 0, "password": 0})
+            if not user_doc:
+                raise HTTPException(status_code=404, detail="User not found")
+            _principal_cache[cache_key] = user_doc
+        # Handlers may modify the dict they get
+        return dict(user_doc)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+
+from database import db
+
+DEFAULT_BASE_PRICE = 500000
+
+
+def stay_dates(check_in: str, check_out: str) -> list:
+    """
+    Return the list of night dates (YYYY-MM-DD) between check_in and check_out.
+    The check_out date itself is not a night of the stay.
+    """
+    start = datetime.strptime(check_in, "%Y-%m-%d")
+    end = datetime.strptime(check_out, "%Y-%m-%d")
+    return [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end - start).days)]
+
+
+async def load_inventory_grid(room_type_ids: list, start_date: str, end_date: str) -> dict:
+    """
+    Fetch inventory for all given room types in [start_date, end_date) with a single query.
+
+    Returns:
+        Dict keyed by (room_type_id, date) with the inventory document as value
+    """
+    if not room_type_ids:
+        return {}
+
+    inventory = await db.room_inventory.find({
+        "room_type_id": {"$in": room_type_ids},
+        "date": {"$gte": start_date, "$lt": end_date}
+    }, {"_id": 0, "room_type_id": 1, "date": 1, "allotment": 1, "rate": 1, "is_closed": 1}).to_list(None)
+
+    return {(inv["room_type_id"], inv["date"]): inv for inv in inventory}
+
+
+def nightly_rates(room: dict, dates: list, grid: dict):
+    """
+    Compute the rate for every night of the stay from the inventory grid.
+
+    Nights without an inventory record fall back to the room's base price.
+
+    Returns:
+        List of nightly rates, or None if any night is closed or sold out
+    """
+    base_price = room.get("base_price", DEFAULT_BASE_PRICE)
+    room_type_id = room["room_type_id"]
+    rates = []
+
+    for date_str in dates:
+        inv = grid.get((room_type_id, date_str))
+        if inv is None:
+            rates.append(base_price)
+            continue
+        if inv.get("is_closed", False) or inv.get("allotment", 0) <= 0:
+            return None
+        rates.append(inv.get("rate", base_price))
+
+    return rates
+
+
+def unavailable_dates(room_type_id: str, dates: list, grid: dict) -> list:
+    """Nights of the stay that are closed or sold out for this room type."""
+    unavailable = []
+    for date_str in dates:
+        inv = grid.get((room_type_id, date_str))
+        if inv and (inv.get("is_closed", False) or inv.get("allotment", 0) <= 0):
+            unavailable.append(date_str)
+    return unavailable
+
+
+async def get_room_availability(rooms: list, check_in: str, check_out: str) -> list:
+    """
+    Resolve availability for every room in one inventory round-trip.
+
+    Returns:
+        List of (room, nightly_rates) tuples for the rooms that are bookable
+        on every night of the stay, in the same order as `rooms`
+    """
+    dates = stay_dates(check_in, check_out)
+    if not dates:
+        return []
+
+    grid = await load_inventory_grid([r["room_type_id"] for r in rooms], check_in, check_out)
+
+    available = []
+    for room in rooms:
+        rates = nightly_rates(room, dates, grid)
+        if rates is not None:
+            available.append((room, rates))
+    return available
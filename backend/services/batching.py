@@ -0,0 +1,252 @@
+import asyncio
+import logging
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+class CounterBuffer:
+    """
+    Write-behind buffer that coalesces $inc updates in memory.
+
+    Increments are merged per (document key, counter field) and flushed as one
+    upserting $inc per document, either every `flush_interval` seconds or as
+    soon as `max_counters` distinct counters are pending. If the database is
+    unavailable, pending counters are kept up to 2 x max_counters; beyond
+    that new increments are dropped and counted in `dropped`.
+    """
+
+    def __init__(self, collection: str, key_field: str, flush_interval: float = 5.0, max_counters: int = 5000):
+        self.collection = collection
+        self.key_field = key_field
+        self.flush_interval = flush_interval
+        self.max_counters = max_counters
+
+        self._pending = {}
+        self._size = 0
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._stopping = asyncio.Event()
+        self._flush_scheduled = False
+        # Keeps size-triggered flushes referenced until they finish
+        self._flush_tasks = set()
+
+        self.flushes = 0
+        self.dropped = 0
+
+    def add(self, key: str, increments: dict):
+        """Queue increments for the document identified by key."""
+        self._merge(key, increments)
+
+        if self._size >= self.max_counters and not self._flush_scheduled:
+            self._flush_scheduled = True
+            task = asyncio.get_running_loop().create_task(self.flush())
+            self._flush_tasks.add(task)
+            task.add_done_callback(self._flush_tasks.discard)
+
+    def _merge(self, key: str, increments: dict):
+        counters = self._pending.setdefault(key, {})
+        for field, amount in increments.items():
+            if field not in counters:
+                if self._size >= self.max_counters * 2:
+                    self.dropped += amount
+                    continue
+                self._size += 1
+            counters[field] = counters.get(field, 0) + amount
+
+    async def flush(self):
+        """Write all pending increments, one upsert per document."""
+        async with self._lock:
+            self._flush_scheduled = False
+            pending, self._pending, self._size = self._pending, {}, 0
+            if not pending:
+                return
+
+            now = datetime.now(timezone.utc).isoformat()
+            items = list(pending.items())
+            operations = [
+                UpdateOne(
+                    {self.key_field: key},
+                    {"$inc": counters, "$set": {"last_updated": now}},
+                    upsert=True
+                )
+                for key, counters in items
+            ]
+            try:
+                await db[self.collection].bulk_write(operations, ordered=False)
+                self.flushes += 1
+            except BulkWriteError as e:
+                # Unordered: every op not listed in writeErrors was applied.
+                # Typically two workers upserting the same new key at once;
+                # the retry then hits the existing document.
+                failed = {err["index"] for err in e.details.get("writeErrors", [])}
+                logger.error(f"Failed to flush {len(failed)} of {len(items)} {self.collection} documents")
+                for index in failed:
+                    self._merge(*items[index])
+            except Exception as e:
+                logger.error(f"Failed to flush {self.collection} counters: {e}")
+                # Put the counters back so the next periodic flush retries them
+                for key, counters in pending.items():
+                    self._merge(key, counters)
+
+    async def _run(self):
+        # Never cancelled mid-flush: stop() sets _stopping and the loop ends
+        # after the flush in progress, so swapped-out counters are not lost
+        while not self._stopping.is_set():
+            try:
+                await asyncio.wait_for(self._stopping.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.error(f"{self.collection} counter flush loop error: {e}")
+
+    def start(self):
+        if self._task is None:
+            self._stopping.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Stop the periodic flush and write whatever is still pending."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        if self._flush_tasks:
+            await asyncio.gather(*self._flush_tasks)
+        await self.flush()
+
+    def stats(self) -> dict:
+        return {
+            "pending_counters": self._size,
+            "flushes": self.flushes,
+            "dropped": self.dropped
+        }
+
+
+class BatchWriter:
+    """
+    Queue-backed sink that writes documents with insert_many(ordered=False).
+
+    submit() never blocks: documents go into a bounded queue, and a single
+    worker drains it in batches of up to `max_batch_size`. A batch is written
+    no later than `max_latency` seconds after its first document arrived.
+    When the queue is full, documents are shed and counted in `dropped`.
+
+    `on_flush`, if given, is awaited with the documents of every batch that
+    were actually stored.
+    """
+
+    _STOP = object()
+
+    def __init__(self, collection: str, max_batch_size: int = 500, max_latency: float = 1.0,
+                 max_queue: int = 10000, on_flush=None):
+        self.collection = collection
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.on_flush = on_flush
+
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._task = None
+
+        self.written = 0
+        self.failed = 0
+        self.dropped = 0
+
+    def submit(self, doc: dict, count_dropped: bool = True) -> bool:
+        """
+        Queue a document for writing. Returns False if the queue is full;
+        pass count_dropped=False when the caller writes it some other way.
+        """
+        try:
+            self._queue.put_nowait(doc)
+            return True
+        except asyncio.QueueFull:
+            if count_dropped:
+                self.dropped += 1
+            return False
+
+    async def write_now(self, docs: list):
+        """Write documents immediately, bypassing the queue."""
+        await self._write(list(docs))
+
+    async def _write(self, batch: list):
+        if not batch:
+            return
+        try:
+            await db[self.collection].insert_many(batch, ordered=False)
+            self.written += len(batch)
+        except BulkWriteError as e:
+            # Unordered: every doc not listed in writeErrors was inserted
+            errors = e.details.get("writeErrors", [])
+            failed = {err["index"] for err in errors}
+            batch = [doc for i, doc in enumerate(batch) if i not in failed]
+            self.written += len(batch)
+            self.failed += len(failed)
+            logger.error(f"Partial failure writing {self.collection} batch: {errors[:1]}")
+        except Exception as e:
+            self.failed += len(batch)
+            logger.error(f"Failed to write {self.collection} batch of {len(batch)}: {e}")
+            return
+
+        if self.on_flush and batch:
+            try:
+                await self.on_flush(batch)
+            except Exception as e:
+                logger.error(f"{self.collection} on_flush hook failed: {e}")
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            first = await self._queue.get()
+            if first is self._STOP:
+                return
+
+            batch = [first]
+            deadline = loop.time() + self.max_latency
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    doc = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if doc is self._STOP:
+                    stopping = True
+                    break
+                batch.append(doc)
+
+            await self._write(batch)
+            if stopping:
+                return
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        """Write everything still queued, then stop the worker."""
+        if self._task is None:
+            return
+        await self._queue.put(self._STOP)
+        await self._task
+        self._task = None
+
+    def stats(self) -> dict:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "failed": self.failed,
+            "dropped": self.dropped
+        }
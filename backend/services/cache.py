@@ -0,0 +1,130 @@
+import json
+import hashlib
+from cachetools import TTLCache
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from config import RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES
+
+
+class ResponseCache:
+    """
+    In-process cache of serialized JSON responses, tagged by collection.
+
+    Entries expire after `ttl` seconds and the least recently used entry is
+    evicted once `maxsize` is reached. Entries carry their own tags, so
+    nothing outlives them; invalidate() drops every entry carrying one of the
+    given tags. Each tag also has a version, bumped on invalidation, so a
+    response loaded while a write was in flight is never stored.
+    """
+
+    def __init__(self, maxsize: int, ttl: int):
+        # key -> (tags, payload)
+        self._entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[1]
+
+    def versions(self, tags: list) -> tuple:
+        return tuple(self._versions.get(tag, 0) for tag in tags)
+
+    def set(self, key: str, entry, tags: list, versions: tuple):
+        if self.versions(tags) != versions:
+            return
+        self._entries[key] = (frozenset(tags), entry)
+
+    def invalidate(self, *tags: str):
+        for tag in tags:
+            self._versions[tag] = self._versions.get(tag, 0) + 1
+        # A scan over at most `maxsize` entries, on writes only
+        dropped = set(tags)
+        for key, (entry_tags, _) in list(self._entries.items()):
+            if entry_tags & dropped:
+                self._entries.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS)
+
+
+def invalidate(*tags: str):
+    """Drop cached responses built from the given collections."""
+    response_cache.invalidate(*tags)
+
+
+_declared_params = {}
+
+
+def _query_names(dependant) -> set:
+    names = {p.alias for p in dependant.query_params}
+    for sub in dependant.dependencies:
+        names |= _query_names(sub)
+    return names
+
+
+def _route_params(request: Request) -> frozenset:
+    """Query parameter names the matched route (and its dependencies) declare."""
+    route = request.scope.get("route")
+    # Routes live as long as the app, so their id is a stable key
+    names = _declared_params.get(id(route))
+    if names is None:
+        dependant = getattr(route, "dependant", None)
+        names = frozenset(_query_names(dependant)) if dependant is not None else frozenset()
+        _declared_params[id(route)] = names
+    return names
+
+
+def _cache_key(request: Request) -> str:
+    # Undeclared params don't change the response, so they must not create
+    # entries either (e.g. cache-busting ?x=<random>)
+    declared = _route_params(request)
+    params = sorted({(k, v) for k, v in request.query_params.multi_items() if k in declared})
+    return request.url.path + "?" + "&".join(f"{k}={v}" for k, v in params)
+
+
+async def cached_response(request: Request, tags: list, loader) -> Response:
+    """
+    Serve a JSON response from the cache, loading it on a miss.
+
+    Responses carry an ETag; a request whose If-None-Match matches it gets
+    an empty 304. `Cache-Control: no-cache` makes browsers revalidate on
+    every load, so admin edits show up immediately.
+
+    Args:
+        request: Incoming request; the path and the query params the route
+                 declares form the cache key
+        tags: Collections the response is built from
+        loader: Coroutine function returning the JSON-serializable payload
+
+    Returns:
+        200 JSON response or 304 Not Modified
+    """
+    key = _cache_key(request)
+    entry = response_cache.get(key)
+    if entry is None:
+        versions = response_cache.versions(tags)
+        body = json.dumps(jsonable_encoder(await loader()), separators=(",", ":")).encode()
+        entry = (body, f'"{hashlib.sha1(body).hexdigest()}"')
+        response_cache.set(key, entry, tags, versions)
+
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip().replace("W/", "", 1) for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import logging
+import uuid
+from datetime import datetime, timezone, timedelta
+from bson import Binary
+from pymongo import ReturnDocument
+
+from config import CAPTION_WORKERS, CAPTION_QUEUE_SIZE
+from database import db
+from ai_helper import generate_image_caption, downscale_image
+from services.media_index import set_caption
+
+logger = logging.getLogger(__name__)
+
+
+def job_view(job: dict) -> dict:
+    """Public shape of a caption job, compatible with the old inline ai_caption result."""
+    result = job.get("result") or {}
+    return {
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "success": job["status"] == "done",
+        "caption": result.get("caption", ""),
+        "alt_text": result.get("alt_text", ""),
+        "public_id": job.get("public_id"),
+        "error": job.get("error")
+    }
+
+
+class CaptionQueue:
+    """
+    Background image captioning backed by the caption_jobs collection.
+
+    submit() stores a job and returns immediately; `workers` tasks caption
+    queued jobs one at a time. Results are cached in caption_cache by the
+    sha256 of the original image and the caption context, so a repeated image
+    never reaches the model twice. Jobs keep a downscaled copy of the image
+    until they finish.
+
+    Running a job takes a lease (locked_until). Other processes leave it
+    alone while the lease holds, and pick it up again once it runs out, so a
+    job left behind by a crashed process is retried without a live worker's
+    job being run twice.
+
+    A job that does not fit in the in-memory queue stays "queued" in the
+    database and is picked up by the next sweep. Job ids already waiting in
+    this process are never queued twice.
+    """
+
+    LEASE_SECONDS = 300
+
+    def __init__(self, workers: int = 2, max_queue: int = 500):
+        self.workers = workers
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks = []
+        self._locks = {}
+        # Job ids waiting in _queue
+        self._enqueued = set()
+
+    def _enqueue(self, job_id: str) -> bool:
+        """Queue a job id unless it is already waiting; False when the queue is full."""
+        if job_id in self._enqueued:
+            return True
+        try:
+            self._queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            return False
+        self._enqueued.add(job_id)
+        return True
+
+    async def submit(self, image_content: bytes, context: str = "hotel", media: dict = None) -> dict:
+        """
+        Queue captioning for an uploaded image.
+
+        Args:
+            image_content: Original image bytes
+            context: Caption context passed to the model ("gallery", "room", ...)
+            media: Upload result the caption belongs to (public_id, secure_url)
+
+        Returns:
+            Job view; already "done" when the image was captioned before
+        """
+        media = media or {}
+        content_hash = hashlib.sha256(image_content).hexdigest()
+        job = {
+            "job_id": str(uuid.uuid4()),
+            "content_hash": content_hash,
+            "context": context,
+            "public_id": media.get("public_id"),
+            "url": media.get("secure_url"),
+            "created_at": datetime.now(timezone.utc).isoformat()
+        }
+
+        cached = await db.caption_cache.find_one({"content_hash": content_hash, "context": context}, {"_id": 0})
+        if cached:
+            job.update({
+                "status": "done",
+                "result": {"caption": cached["caption"], "alt_text": cached["alt_text"], "success": True},
+                "finished_at": job["created_at"]
+            })
+            await db.caption_jobs.insert_one(job)
+            await set_caption(job["public_id"], cached["caption"], cached["alt_text"])
+            return job_view(job)
+
+        small_image = await asyncio.to_thread(downscale_image, image_content)
+        job.update({"status": "queued", "image": Binary(small_image)})
+        await db.caption_jobs.insert_one(job)
+
+        if not self._enqueue(job["job_id"]):
+            # Stays queued in the database for the next sweep
+            logger.info(f"Caption queue is full; job {job['job_id']} waits for the sweep")
+        return job_view(job)
+
+    async def _process(self, job_id: str):
+        now = datetime.now(timezone.utc)
+        job = await db.caption_jobs.find_one_and_update(
+            {"job_id": job_id, "$or": [
+                {"status": "queued"},
+                {"status": "running", "locked_until": {"$lte": now.isoformat()}}
+            ]},
+            {"$set": {
+                "status": "running",
+                "started_at": now.isoformat(),
+                "locked_until": (now + timedelta(seconds=self.LEASE_SECONDS)).isoformat()
+            }},
+            projection={"_id": 0},
+            return_document=ReturnDocument.AFTER
+        )
+        if not job:
+            return
+
+        key = (job["content_hash"], job["context"])
+        lock, users = self._locks.get(key, (asyncio.Lock(), 0))
+        self._locks[key] = (lock, users + 1)
+        try:
+            # Identical images queued together wait here and then hit the cache
+            async with lock:
+                cached = await db.caption_cache.find_one(
+                    {"content_hash": job["content_hash"], "context": job["context"]}, {"_id": 0}
+                )
+                if cached:
+                    result = {"caption": cached["caption"], "alt_text": cached["alt_text"], "success": True}
+                else:
+                    result = await generate_image_caption(bytes(job["image"]), context=job["context"])
+                    if result.get("success"):
+                        await db.caption_cache.update_one(
+                            {"content_hash": job["content_hash"], "context": job["context"]},
+                            {"$set": {
+                                "caption": result["caption"],
+                                "alt_text": result["alt_text"],
+                                "created_at": datetime.now(timezone.utc).isoformat()
+                            }},
+                            upsert=True
+                        )
+        finally:
+            lock, users = self._locks[key]
+            if users == 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, users - 1)
+
+        await db.caption_jobs.update_one(
+            {"job_id": job_id},
+            {
+                "$set": {
+                    "status": "done" if result.get("success") else "failed",
+                    "result": result,
+                    "error": result.get("error"),
+                    "finished_at": datetime.now(timezone.utc).isoformat()
+                },
+                "$unset": {"image": ""}
+            }
+        )
+        if result.get("success"):
+            await set_caption(job.get("public_id"), result["caption"], result["alt_text"])
+
+    async def _run(self):
+        while True:
+            job_id = await self._queue.get()
+            self._enqueued.discard(job_id)
+            try:
+                await self._process(job_id)
+            except Exception as e:
+                logger.error(f"Caption job {job_id} failed: {e}")
+                await db.caption_jobs.update_one(
+                    {"job_id": job_id},
+                    {"$set": {"status": "failed", "error": str(e)}, "$unset": {"image": ""}}
+                )
+
+    async def _resume(self):
+        """Queue stored jobs that are waiting or whose lease ran out."""
+        room = self._queue.maxsize - self._queue.qsize()
+        if room <= 0:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        pending = await db.caption_jobs.find(
+            {"job_id": {"$nin": list(self._enqueued)}, "$or": [
+                {"status": "queued"},
+                {"status": "running", "locked_until": {"$lte": now}}
+            ]},
+            {"_id": 0, "job_id": 1}
+        ).sort("created_at", 1).to_list(room)
+        # A job another process also queued is claimed by only one of them
+        for job in pending:
+            if not self._enqueue(job["job_id"]):
+                break
+
+    async def _sweep(self):
+        while True:
+            try:
+                await self._resume()
+            except Exception as e:
+                logger.error(f"Could not resume caption jobs: {e}")
+            await asyncio.sleep(self.LEASE_SECONDS)
+
+    async def start(self):
+        """Start the workers and pick up stored jobs, now and every LEASE_SECONDS."""
+        if self._tasks:
+            return
+        loop = asyncio.get_running_loop()
+        self._tasks = [loop.create_task(self._run()) for _ in range(self.workers)]
+        self._tasks.append(loop.create_task(self._sweep()))
+
+    async def stop(self):
+        """Stop the workers; unfinished jobs stay queued in the database."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+caption_queue = CaptionQueue(workers=CAPTION_WORKERS, max_queue=CAPTION_QUEUE_SIZE)
+
+
+async def get_caption_job(job_id: str):
+    job = await db.caption_jobs.find_one({"job_id": job_id}, {"_id": 0, "image": 0})
+    return job_view(job) if job else None
@@ -0,0 +1,362 @@
+import time
+import logging
+from datetime import datetime, timezone
+from jinja2 import Environment
+
+from config import FRONTEND_URL, EMAIL_TEMPLATE_CHECK_SECONDS
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Default Indonesian Template
+DEFAULT_EMAIL_TEMPLATE = {
+    "subject_template": "Konfirmasi Reservasi - {booking_code}",
+    "logo_url": "https://res.cloudinary.com/dgfjos8xa/image/upload/v1769523647/logo_spencer_green_hotel_batu_malang_512_inv_h0zm3e.png",
+    "hero_image_url": "https://images.unsplash.com/photo-1566073771259-6a8506099945?fit=crop&w=1200&q=80",
+    "header_text_top": "SPENCER GREEN HOTEL",
+    "header_text_bottom": "Batu, Jawa Timur",
+    "greeting_template": "Hai {guest_name}!",
+    "intro_text": "Terima kasih telah memilih Spencer Green Hotel. Kami berkomitmen untuk memberikan pengalaman menginap yang nyaman bagi Anda.",
+    "labels": {
+        "reservation_number": "NOMOR RESERVASI",
+        "status": "STATUS",
+        "check_in": "CHECK-IN",
+        "check_out": "CHECK-OUT",
+        "guests": "TAMU",
+        "stay": "DURASI",
+        "reservation_under": "PEMESAN",
+        "contact": "KONTAK",
+        "room_details": "Detail Kamar",
+        "room_type": "Tipe Kamar:",
+        "rate_plan": "Paket:",
+        "special_req": "Permintaan Khusus:",
+        "description": "Deskripsi",
+        "total": "Total",
+        "room_charge": "Biaya Kamar ({nights} malam)",
+        "total_amount": "Total Tagihan",
+        "payment_info": "Silakan transfer pembayaran ke:",
+        "bank": "Bank:",
+        "account": "No. Rekening:",
+        "holder": "Atas Nama:",
+        "amount": "Nominal:",
+        "important_notes": "Catatan Penting:",
+        "cancellation_policy": "Kebijakan Pembatalan",
+        "website": "Website"
+    },
+    "payment_details": {
+        "bank_name": "BCA (Bank Central Asia)",
+        "account_number": "788-095-1909",
+        "account_holder": "PT. SPENCER GREEN",
+        "show": True
+    },
+    "important_notes_list": [
+        "Pembayaran harus diselesaikan dalam waktu 24 jam.",
+        "Mohon kirimkan bukti transfer melalui WhatsApp atau Email.",
+        "Non-refundable kecuali dinyatakan lain."
+    ],
+    "cancellation_policy_list": [
+        "Harga total dibayarkan saat pemesanan.",
+        "Ketidakhadiran (No-Show) tidak dapat dikembalikan."
+    ],
+    "footer_address": "Jl. Raya Punten No.86, Kec. Bumiaji, Kota Batu, Jawa Timur 65338 Indonesia",
+    "show_payment": True,
+    "show_policy": True
+}
+
+RESERVATION_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <meta charset="utf-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>Reservation Confirmation</title>
+    <style>
+        body { font-family: 'Nunito', 'Segoe UI', sans-serif; margin: 0; padding: 0; background-color: #f4f4f5; }
+        .container { max-width: 640px; margin: 0 auto; background-color: #ffffff; }
+        .header { background-color: #059669; padding: 10px 24px; color: white; display: flex; align-items: center; justify-content: space-between; }
+        .hero-image { width: 100%; height: auto; display: block; }
+        .content { padding: 24px; }
+        .greeting { margin-top: 24px; margin-bottom: 24px; color: #374151; line-height: 1.6; }
+        .grid-table { width: 100%; border-spacing: 0; margin-top: 24px; }
+        .grid-td { padding: 16px; border-top: 1px solid #e5e7eb; vertical-align: top; width: 50%; }
+        .grid-label { color: #9ca3af; text-transform: uppercase; font-size: 12px; font-weight: 600; display: block; margin-bottom: 4px; }
+        .grid-value { color: #111827; font-size: 18px; font-weight: 700; }
+        .grid-value-lg { font-size: 24px; }
+        .section-title { font-size: 20px; font-weight: 700; color: #111827; margin-top: 40px; margin-bottom: 16px; }
+        .box, .payment-details { border: 1px solid #e5e7eb; padding: 16px; border-radius: 4px; }
+        .room-details { width: 100%; border-collapse: collapse; margin-top: 10px; }
+        .room-details td { padding: 6px 0; font-size: 14px; color: #374151; vertical-align: top; }
+        .room-label { font-weight: 700; width: 120px; }
+        .price-table { width: 100%; border-collapse: collapse; margin-top: 16px; border: 1px solid #e5e7eb; }
+        .price-table th { background-color: #f9fafb; padding: 8px 12px; text-align: right; font-size: 13px; font-weight: 700; color: #374151; }
+        .price-table th:first-child { text-align: left; }
+        .price-table td { padding: 8px 12px; text-align: right; font-size: 14px; color: #374151; border-top: 1px solid #e5e7eb; }
+        .price-table td:first-child { text-align: left; }
+        .payment-info { background-color: #059669; color: white; padding: 16px; margin-top: 32px; font-size: 18px; font-weight: 600; }
+        .payment-details { border-color: #059669; background-color: #ecfdf5; }
+        .important-notes { background-color: #fffbeb; border: 1px solid #fcd34d; padding: 16px; margin-top: 24px; border-radius: 4px; }
+        .footer { background-color: #059669; color: white; padding: 32px 24px; margin-top: 40px; text-align: center; }
+    </style>
+</head>
+<body>
+    <div class="container">
+        <div class="header">
+            <img src="{{ config.logo_url }}" alt="Spencer Green Hotel" style="max-height: 40px; width: auto;">
+            <div style="text-align: right;">
+                <span style="display: block; font-size: 12px;">{{ config.header_text_top }}</span>
+                <span style="display: block; font-size: 10px; opacity: 0.8;">{{ config.header_text_bottom }}</span>
+            </div>
+        </div>
+
+        <img src="{{ config.hero_image_url }}" alt="Hotel" class="hero-image" style="background-color: #e5e7eb; min-height: 200px;">
+
+        <div class="content">
+            {% if is_resend %}
+            <div style="background-color: #fff7ed; color: #9a3412; padding: 12px; border: 1px solid #ffedd5; text-align: center; margin-bottom: 24px; font-weight: 600;">
+                <strong>Pemberitahuan:</strong> Ini adalah salinan ulang konfirmasi reservasi Anda.
+            </div>
+            {% endif %}
+
+            <div class="greeting">
+                <strong>{{ config.greeting_template.format(guest_name=r.guest_name) }}</strong>
+                <p>{{ config.intro_text }}</p>
+            </div>
+
+            <table class="grid-table">
+                <tr>
+                    <td class="grid-td" style="border-top: none;">
+                        <span class="grid-label">{{ labels.reservation_number }}</span>
+                        <span class="grid-value grid-value-lg" style="color: #059669;">{{ r.booking_code }}</span>
+                    </td>
+                    <td class="grid-td" style="border-top: none; text-align: right;">
+                        <span class="grid-label">{{ labels.status }}</span>
+                        <span class="grid-value" style="text-transform: capitalize;">{{ r.status.replace('_', ' ') }}</span>
+                    </td>
+                </tr>
+                <tr>
+                    <td class="grid-td">
+                        <span class="grid-label">{{ labels.check_in }}</span>
+                        <span class="grid-value grid-value-lg">{{ check_in }}</span>
+                        <br><small style="color: #6b7280;">14:00</small>
+                    </td>
+                    <td class="grid-td" style="border-left: 1px solid #e5e7eb;">
+                        <span class="grid-label">{{ labels.check_out }}</span>
+                        <span class="grid-value grid-value-lg">{{ check_out }}</span>
+                        <br><small style="color: #6b7280;">12:00</small>
+                    </td>
+                </tr>
+                <tr>
+                    <td class="grid-td">
+                        <span class="grid-label">{{ labels.guests }}</span>
+                        <span class="grid-value grid-value-lg">{{ r.guests }} Orang</span>
+                    </td>
+                    <td class="grid-td" style="border-left: 1px solid #e5e7eb;">
+                        <span class="grid-label">{{ labels.stay }}</span>
+                        <span class="grid-value grid-value-lg">{{ r.nights }} Malam</span>
+                    </td>
+                </tr>
+                <tr>
+                    <td class="grid-td">
+                        <span class="grid-label">{{ labels.reservation_under }}</span>
+                        <span class="grid-value" style="font-size: 16px;">{{ r.guest_name }}</span>
+                    </td>
+                    <td class="grid-td" style="border-left: 1px solid #e5e7eb;">
+                        <span class="grid-label">{{ labels.contact }}</span>
+                        <div style="font-size: 14px;">
+                            {{ r.guest_phone or '-' }}<br>
+                            <a href="mailto:{{ r.guest_email }}" style="color: #059669;">{{ r.guest_email }}</a>
+                        </div>
+                    </td>
+                </tr>
+            </table>
+
+            <div class="section-title">{{ labels.room_details }}</div>
+            <div class="box">
+                <div style="background-color: #f3f4f6; padding: 8px; margin-bottom: 12px; font-weight: 700;">Room 1</div>
+                <table class="room-details">
+                    <tr><td class="room-label">{{ labels.room_type }}</td><td>{{ r.room_type_name }}</td></tr>
+                    <tr><td class="room-label">{{ labels.rate_plan }}</td><td>{{ r.rate_plan_name or 'Standard' }}</td></tr>
+                    <tr><td class="room-label">{{ labels.special_req }}</td><td>{{ r.special_requests or '-' }}</td></tr>
+                </table>
+
+                <table class="price-table">
+                    <thead><tr><th>{{ labels.description }}</th><th>{{ labels.total }}</th></tr></thead>
+                    <tbody>
+                        <tr><td>{{ labels.room_charge.format(nights=r.nights) }}</td><td>{{ room_total }}</td></tr>
+                        <tr><td><strong>{{ labels.total_amount }}</strong></td><td style="color: #059669; font-weight: 700;">{{ total }}</td></tr>
+                    </tbody>
+                </table>
+            </div>
+
+            {% if config.get('show_payment', True) and config.payment_details.get('show', True) %}
+            <div class="payment-info">{{ labels.payment_info }}</div>
+            <div class="payment-details">
+                <p style="margin:0; line-height:1.6;">
+                    <strong>{{ labels.bank }}</strong> {{ config.payment_details.bank_name }}<br>
+                    <strong>{{ labels.account }}</strong> {{ config.payment_details.account_number }}<br>
+                    <strong>{{ labels.holder }}</strong> {{ config.payment_details.account_holder }}<br>
+                    <strong>{{ labels.amount }}</strong> <span style="font-size:18px; font-weight:bold; color:#059669;">{{ total }}</span>
+                </p>
+            </div>
+            {% endif %}
+
+            <div class="important-notes">
+                <strong>{{ labels.important_notes }}</strong>
+                <ul style="margin:0; padding-left:20px; color:#92400e; font-size:14px;">
+                    {% for item in config.important_notes_list %}<li>{{ item }}</li>{% endfor %}
+                </ul>
+            </div>
+
+            {% if config.get('show_policy', True) %}
+            <div style="margin-top: 32px;">
+                <h3 style="font-size:18px; margin-bottom:12px;">{{ labels.cancellation_policy }}</h3>
+                <div class="box" style="font-size:14px; color:#4b5563;">
+                    <ul style="padding-left:20px; margin:0;">
+                        {% for item in config.cancellation_policy_list %}<li>{{ item }}</li>{% endfor %}
+                    </ul>
+                </div>
+            </div>
+            {% endif %}
+        </div>
+
+        <div class="footer">
+            <p style="margin:0; font-size:14px;">&copy; {{ year }} Spencer Green Hotel</p>
+            <div style="margin-top:16px;">
+                <a href="{{ frontend_url }}" style="color:white; text-decoration:none; margin:0 8px;">{{ labels.website }}</a>
+            </div>
+        </div>
+    </div>
+</body>
+</html>
+"""
+
+# Guest input and config text are escaped, as the admin preview shows them
+_env = Environment(autoescape=True)
+
+MONTHS = ["", "Jan", "Feb", "Mar", "Apr", "Mei", "Jun", "Jul", "Agust", "Sep", "Okt", "Nov", "Des"]
+
+
+def merge_email_config(content: dict = None) -> dict:
+    """Merge a saved reservation_conf over DEFAULT_EMAIL_TEMPLATE (labels and payment_details key by key)."""
+    final_config = {**DEFAULT_EMAIL_TEMPLATE}
+    for key, value in (content or {}).items():
+        if key in ["labels", "payment_details"] and isinstance(final_config.get(key), dict):
+            final_config[key] = {**final_config[key], **value}
+        else:
+            final_config[key] = value
+    return final_config
+
+
+class CompiledEmailTemplate:
+    """The reservation template compiled once with its merged config bound as globals."""
+
+    def __init__(self, config: dict, version: str):
+        self.config = config
+        self.version = version
+        self.template = _env.from_string(RESERVATION_TEMPLATE, globals={
+            "config": config,
+            "labels": config["labels"],
+            "frontend_url": FRONTEND_URL
+        })
+
+    def render(self, reservation: dict, is_resend: bool = False) -> dict:
+        subject_prefix = "[RESENT] " if is_resend else ""
+        try:
+            guest_subject = subject_prefix + self.config["subject_template"].format(
+                booking_code=reservation['booking_code'],
+                guest_name=reservation['guest_name']
+            )
+        except (KeyError, IndexError, ValueError):
+            guest_subject = f"{subject_prefix}Konfirmasi Reservasi - {reservation['booking_code']}"
+        hotel_subject = f"{subject_prefix}[NEW BOOKING] {reservation['booking_code']} - {reservation['guest_name']}"
+
+        nights = reservation.get('nights', 1)
+        html = self.template.render(
+            r=reservation,
+            is_resend=is_resend,
+            check_in=format_date(reservation['check_in']),
+            check_out=format_date(reservation['check_out']),
+            total=format_idr(reservation.get('total_amount', 0)),
+            room_total=format_idr(reservation.get('rate_per_night', 0) * nights),
+            year=datetime.now(timezone.utc).year
+        )
+        return {"guest_subject": guest_subject, "hotel_subject": hotel_subject, "html": html}
+
+
+def format_idr(amount) -> str:
+    return f"{int(amount):,}".replace(",", ".") + " IDR"
+
+
+def format_date(value: str) -> str:
+    """2026-01-31 -> 31 Jan 2026 (Indonesian month names)"""
+    try:
+        d = datetime.strptime(value, "%Y-%m-%d")
+        return f"{d.day} {MONTHS[d.month]} {d.year}"
+    except (TypeError, ValueError):
+        return value
+
+
+_cached = None
+_checked_at = 0.0
+
+
+def invalidate_email_template():
+    """Drop the compiled template after the email config is saved."""
+    global _cached
+    _cached = None
+
+
+async def get_reservation_template() -> CompiledEmailTemplate:
+    """
+    The compiled reservation template for the current email config.
+
+    The cache is versioned by the config document's updated_at. Saves in
+    this process call invalidate_email_template(); other processes notice
+    the new version within EMAIL_TEMPLATE_CHECK_SECONDS, when only
+    updated_at is read back.
+    """
+    global _cached, _checked_at
+    query = {"page": "email", "section": "reservation_conf"}
+    now = time.monotonic()
+
+    if _cached is not None and now - _checked_at < EMAIL_TEMPLATE_CHECK_SECONDS:
+        return _cached
+
+    if _cached is not None:
+        doc = await db.site_content.find_one(query, {"_id": 0, "updated_at": 1})
+        _checked_at = now
+        if (doc or {}).get("updated_at", "default") == _cached.version:
+            return _cached
+
+    doc = await db.site_content.find_one(query, {"_id": 0})
+    content = doc.get("content") if doc else None
+    _cached = CompiledEmailTemplate(merge_email_config(content), (doc or {}).get("updated_at", "default"))
+    _checked_at = now
+    logger.info(f"Compiled reservation email template (version {_cached.version})")
+    return _cached
+
+
+# Sample booking for previews
+PREVIEW_RESERVATION = {
+    "reservation_id": "preview",
+    "booking_code": "SGH-PREVIEW",
+    "guest_name": "Budi Santoso",
+    "guest_email": "budi@example.com",
+    "guest_phone": "+62 812 3456 7890",
+    "room_type_name": "Deluxe Room",
+    "rate_plan_name": "Room Only",
+    "check_in": "2026-01-31",
+    "check_out": "2026-02-02",
+    "guests": 2,
+    "nights": 2,
+    "rate_per_night": 850000,
+    "total_amount": 1700000,
+    "special_requests": "Kamar bebas rokok",
+    "status": "pending"
+}
+
+
+async def render_preview(reservation: dict = None, is_resend: bool = False) -> dict:
+    """Render the cached template with a sample (or given) reservation."""
+    template = await get_reservation_template()
+    return {"version": template.version, **template.render({**PREVIEW_RESERVATION, **(reservation or {})}, is_resend)}
@@ -0,0 +1,234 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from pymongo import UpdateMany
+
+from config import HOLD_TIMEOUT_MINUTES
+from database import db
+from services.cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+
+async def hold_inventory(room_type_id: str, dates: list, hold_id: str) -> list:
+    """
+    Take one unit of allotment for every night of a stay, all or nothing.
+
+    Nights that are already sold out or closed are checked first, so a stay
+    that cannot fit is refused without touching any allotment. All nights are
+    then decremented by one conditional update guarded by `allotment >= 1` and
+    `not is_closed`, so concurrent bookings can never push allotment below
+    zero. Each decremented night is tagged with {hold_id, held_at} so a
+    partial hold can be rolled back exactly; once the booking is stored,
+    commit_hold() removes the tag again, and release_stale_holds() reaps tags
+    left by a process that died in between.
+
+    A night sold out between the check and the update still makes the hold
+    fail after other nights were decremented. Those nights look taken until
+    the rollback a moment later, so a concurrent booking for them can be
+    refused in that window.
+
+    Nights without an inventory record are not tracked and always succeed,
+    matching how availability treats them.
+
+    Args:
+        room_type_id: Room type being booked
+        dates: Night dates (YYYY-MM-DD) of the stay
+        hold_id: Unique id for this hold (the reservation_id)
+
+    Returns:
+        Empty list on success, otherwise the nights that could not be held
+        (in which case nothing is left decremented)
+    """
+    blocked = await db.room_inventory.find(
+        {
+            "room_type_id": room_type_id,
+            "date": {"$in": dates},
+            "$or": [{"allotment": {"$lt": 1}}, {"is_closed": True}]
+        },
+        {"_id": 0, "date": 1}
+    ).to_list(None)
+    if blocked:
+        return sorted({doc["date"] for doc in blocked})
+
+    held_at = datetime.now(timezone.utc).isoformat()
+    result = await db.room_inventory.update_many(
+        {
+            "room_type_id": room_type_id,
+            "date": {"$in": dates},
+            "allotment": {"$gte": 1},
+            "is_closed": {"$ne": True}
+        },
+        {"$inc": {"allotment": -1}, "$push": {"holds": {"hold_id": hold_id, "held_at": held_at}}}
+    )
+    # Public room listings show today's allotment
+    invalidate("room_inventory")
+    if result.modified_count >= len(dates):
+        return []
+
+    # Fewer nights were decremented than requested. Missing inventory records
+    # are fine; any existing record we did not tag is closed or sold out.
+    missed = await db.room_inventory.find(
+        {"room_type_id": room_type_id, "date": {"$in": dates}, "holds.hold_id": {"$ne": hold_id}},
+        {"_id": 0, "date": 1}
+    ).to_list(None)
+    if not missed:
+        return []
+
+    await release_inventory(room_type_id, dates, hold_id)
+    return sorted({doc["date"] for doc in missed})
+
+
+async def commit_hold(room_type_id: str, dates: list, hold_id: str):
+    """Keep the allotment taken by hold_id and drop its tag from the nights."""
+    await db.room_inventory.update_many(
+        {"room_type_id": room_type_id, "date": {"$in": dates}, "holds.hold_id": hold_id},
+        {"$pull": {"holds": {"hold_id": hold_id}}}
+    )
+
+
+async def release_inventory(room_type_id: str, dates: list, hold_id: str):
+    """Give back the allotment taken by hold_id. Safe to call more than once."""
+    await db.room_inventory.update_many(
+        {"room_type_id": room_type_id, "date": {"$in": dates}, "holds.hold_id": hold_id},
+        {"$inc": {"allotment": 1}, "$pull": {"holds": {"hold_id": hold_id}}}
+    )
+    invalidate("room_inventory")
+
+
+async def release_stale_holds() -> dict:
+    """
+    Settle holds older than HOLD_TIMEOUT_MINUTES, left by a process that died
+    between hold_inventory() and commit_hold()/release_inventory().
+
+    A hold whose reservation was stored is committed; any other hold gives
+    its allotment back.
+
+    Returns:
+        {"committed": n, "released": n} counted in holds
+    """
+    cutoff = (datetime.now(timezone.utc) - timedelta(minutes=HOLD_TIMEOUT_MINUTES)).isoformat()
+    docs = await db.room_inventory.find(
+        {"holds": {"$elemMatch": {"held_at": {"$lt": cutoff}}}},
+        {"_id": 0, "holds": 1}
+    ).to_list(None)
+    stale = {
+        hold["hold_id"]
+        for doc in docs
+        for hold in doc["holds"]
+        if isinstance(hold, dict) and hold.get("held_at", "") < cutoff
+    }
+    if not stale:
+        return {"committed": 0, "released": 0}
+
+    booked = await db.reservations.find(
+        {"reservation_id": {"$in": list(stale)}}, {"_id": 0, "reservation_id": 1}
+    ).to_list(None)
+    booked = {doc["reservation_id"] for doc in booked}
+
+    operations = []
+    for hold_id in stale:
+        update = {"$pull": {"holds": {"hold_id": hold_id}}}
+        if hold_id not in booked:
+            update["$inc"] = {"allotment": 1}
+        operations.append(UpdateMany({"holds.hold_id": hold_id}, update))
+    await db.room_inventory.bulk_write(operations, ordered=False)
+    invalidate("room_inventory")
+
+    stats = {"committed": len(stale & booked), "released": len(stale - booked)}
+    logger.warning(f"Settled stale inventory holds: {stats}")
+    return stats
+
+
+_hold_sweep_task = None
+
+
+async def _run_hold_sweep():
+    while True:
+        await asyncio.sleep(HOLD_TIMEOUT_MINUTES * 60)
+        try:
+            await release_stale_holds()
+        except Exception as e:
+            logger.error(f"Stale hold sweep failed: {e}")
+
+
+def start_hold_sweep():
+    global _hold_sweep_task
+    if _hold_sweep_task is None and HOLD_TIMEOUT_MINUTES > 0:
+        _hold_sweep_task = asyncio.get_running_loop().create_task(_run_hold_sweep())
+
+
+def stop_hold_sweep():
+    global _hold_sweep_task
+    if _hold_sweep_task is not None:
+        _hold_sweep_task.cancel()
+        _hold_sweep_task = None
+
+
+async def build_inventory_calendar(start_date: str, end_date: str, room_type_ids: list = None) -> dict:
+    """
+    Build a columnar inventory calendar for [start_date, end_date] across room types.
+
+    Rooms and their inventory come from a single aggregation. Dates are listed
+    once, and every room carries allotment/rate/is_closed arrays aligned with
+    them. Days without an inventory record are null.
+
+    Returns:
+        {"dates": [...], "rooms": {room_type_id: {"name", "base_price",
+        "allotment": [...], "rate": [...], "is_closed": [...]}}}
+    """
+    start = datetime.strptime(start_date, "%Y-%m-%d")
+    end = datetime.strptime(end_date, "%Y-%m-%d")
+    dates = [(start + timedelta(days=i)).strftime("%Y-%m-%d") for i in range((end - start).days + 1)]
+    index = {date_str: i for i, date_str in enumerate(dates)}
+
+    room_match = {"room_type_id": {"$in": room_type_ids}} if room_type_ids else {"is_active": True}
+    pipeline = [
+        {"$match": room_match},
+        {"$sort": {"display_order": 1}},
+        {
+            "$lookup": {
+                "from": "room_inventory",
+                "let": {"rid": "$room_type_id"},
+                "pipeline": [
+                    {
+                        "$match": {
+                            "$expr": {
+                                "$and": [
+                                    {"$eq": ["$room_type_id", "$$rid"]},
+                                    {"$gte": ["$date", start_date]},
+                                    {"$lte": ["$date", end_date]}
+                                ]
+                            }
+                        }
+                    },
+                    {"$project": {"_id": 0, "date": 1, "allotment": 1, "rate": 1, "is_closed": 1}}
+                ],
+                "as": "inventory"
+            }
+        },
+        {"$project": {"_id": 0, "room_type_id": 1, "name": 1, "base_price": 1, "inventory": 1}}
+    ]
+    rooms = await db.room_types.aggregate(pipeline).to_list(None)
+
+    columns = {}
+    for room in rooms:
+        allotment = [None] * len(dates)
+        rate = [None] * len(dates)
+        is_closed = [None] * len(dates)
+        for inv in room["inventory"]:
+            i = index.get(inv["date"])
+            if i is None:
+                continue
+            allotment[i] = inv.get("allotment")
+            rate[i] = inv.get("rate")
+            is_closed[i] = inv.get("is_closed", False)
+        columns[room["room_type_id"]] = {
+            "name": room.get("name"),
+            "base_price": room.get("base_price"),
+            "allotment": allotment,
+            "rate": rate,
+            "is_closed": is_closed
+        }
+
+    return {"dates": dates, "rooms": columns}
@@ -0,0 +1,387 @@
+import asyncio
+import logging
+import queue
+import random
+import smtplib
+import ssl
+import threading
+import time
+import uuid
+import resend
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone, timedelta
+from email.mime.text import MIMEText
+from email.mime.multipart import MIMEMultipart
+from pymongo import ReturnDocument
+
+from config import (
+    SMTP_HOST, SMTP_PORT, SMTP_USER, SMTP_PASSWORD, SENDER_EMAIL, RESEND_API_KEY,
+    MAIL_CONCURRENCY, SMTP_TIMEOUT_SECONDS, SMTP_IDLE_TIMEOUT_SECONDS,
+    MAIL_MAX_ATTEMPTS, MAIL_RETRY_BASE_SECONDS, MAIL_RETRY_MAX_SECONDS,
+    MAIL_RATE_PER_SECOND, MAIL_RATE_BURST
+)
+from database import db
+
+logger = logging.getLogger(__name__)
+
+
+# ==================== TRANSPORT ====================
+
+# Errors after which the SMTP session itself is still usable
+_SESSION_OK_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPDataError)
+
+
+class SMTPPool:
+    """
+    Authenticated SMTP sessions reused across messages.
+
+    At most `size` sessions exist at once. Idle sessions are kept for
+    `idle_timeout` seconds (mail servers drop idle clients themselves);
+    a session found dead is replaced and the message re-sent once.
+    All methods block and are meant to run on a worker thread.
+    """
+
+    def __init__(self, size: int, idle_timeout: float):
+        self.idle_timeout = idle_timeout
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        # Same relaxed verification as the mail host's certificate requires
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+
+        if SMTP_PORT == 465:
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, context=context, timeout=SMTP_TIMEOUT_SECONDS)
+        else:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=SMTP_TIMEOUT_SECONDS)
+            server.starttls(context=context)
+        server.login(SMTP_USER, SMTP_PASSWORD)
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                server, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if time.monotonic() - last_used < self.idle_timeout:
+                return server
+            self._close(server)
+
+    def send(self, to_email: str, message: str):
+        with self._slots:
+            server = self._checkout()
+            try:
+                try:
+                    server.sendmail(SENDER_EMAIL, to_email, message)
+                except _SESSION_OK_ERRORS:
+                    raise
+                except OSError:
+                    # Stale session (SMTP errors are OSErrors too): reconnect and try once more
+                    self._close(server)
+                    server = self._connect()
+                    server.sendmail(SENDER_EMAIL, to_email, message)
+            except _SESSION_OK_ERRORS:
+                self._idle.put((server, time.monotonic()))
+                raise
+            except Exception:
+                self._close(server)
+                raise
+            self._idle.put((server, time.monotonic()))
+
+    def close(self):
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._close(server)
+
+
+smtp_pool = SMTPPool(size=MAIL_CONCURRENCY, idle_timeout=SMTP_IDLE_TIMEOUT_SECONDS)
+_smtp_executor = ThreadPoolExecutor(max_workers=MAIL_CONCURRENCY, thread_name_prefix="smtp")
+
+
+async def send_email_resend(to_email: str, subject: str, html_content: str):
+    """
+    Send email via Resend API (recommended for Render)
+    """
+    if not RESEND_API_KEY:
+        logger.error("RESEND_API_KEY not set")
+        raise Exception("RESEND_API_KEY not set")
+
+    # Allow exceptions to bubble up so we can see the real error (e.g. domain validation)
+    resend.api_key = RESEND_API_KEY
+
+    params = {
+        "from": f"Spencer Green Hotel <{SENDER_EMAIL}>",
+        "to": [to_email],
+        "subject": subject,
+        "html": html_content,
+    }
+
+    # Run in thread since resend.Emails.send is blocking
+    def send():
+        return resend.Emails.send(params)
+
+    result = await asyncio.to_thread(send)
+    logger.info(f"Email sent successfully via Resend to {to_email}, id: {result.get('id')}")
+    return True
+
+
+async def send_email_smtp(to_email: str, subject: str, html_content: str):
+    """
+    Send email via SMTP over a pooled, already authenticated session.
+    Raises on failure.
+    """
+    message = MIMEMultipart("alternative")
+    message["Subject"] = subject
+    message["From"] = SENDER_EMAIL
+    message["To"] = to_email
+
+    # The email client will try to render the last part first
+    message.attach(MIMEText("Please enable HTML to view this email.", "plain"))
+    message.attach(MIMEText(html_content, "html"))
+
+    loop = asyncio.get_running_loop()
+    await loop.run_in_executor(_smtp_executor, smtp_pool.send, to_email, message.as_string())
+    logger.info(f"Email sent successfully to {to_email}")
+    return True
+
+
+class RateLimiter:
+    """Token bucket: `rate` sends per second on average, bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # Waiters queue on the lock, so sends leave in arrival order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+# Shared by the outbox dispatchers and direct sends of this process
+send_limiter = RateLimiter(MAIL_RATE_PER_SECOND, MAIL_RATE_BURST)
+
+
+async def deliver_email(to_email: str, subject: str, html_content: str):
+    """
+    Send one message through the configured transport; raises on failure.
+    Every send first takes a token from this process's send_limiter.
+    If RESEND_API_KEY is present, we rely on it and DO NOT fallback to SMTP
+    because SMTP on Render hangs (firewall) causing timeouts.
+    """
+    await send_limiter.acquire()
+    if RESEND_API_KEY:
+        return await send_email_resend(to_email, subject, html_content)
+    return await send_email_smtp(to_email, subject, html_content)
+
+
+async def log_deliveries(entries: list):
+    """
+    Write per-recipient delivery results to email_logs.
+
+    Each entry has to_email, subject, status ("sent" or "failed"),
+    latency_ms and error, plus any reservation fields to keep with it.
+    """
+    if not entries:
+        return
+    now = _now().isoformat()
+    try:
+        await db.email_logs.insert_many([{"sent_at": now, **entry} for entry in entries], ordered=False)
+    except Exception as e:
+        logger.error(f"Could not write email logs: {e}")
+
+
+# ==================== OUTBOX ====================
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def retry_delay(attempts: int) -> float:
+    """Exponential backoff with full jitter after `attempts` failed sends."""
+    return random.uniform(0, min(MAIL_RETRY_MAX_SECONDS, MAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+
+
+class MailQueue:
+    """
+    Durable outbound mail backed by the mail_outbox collection.
+
+    enqueue() stores a message and wakes the dispatchers; `workers` tasks
+    claim due messages, send them, and on failure reschedule them with
+    exponential backoff. After MAIL_MAX_ATTEMPTS failures a message is
+    dead-lettered (status "dead") and kept for inspection or retry.
+    A claim is a lease, so a message held by a crashed process is sent
+    again once the lease runs out.
+    """
+
+    LEASE_SECONDS = 120
+    POLL_SECONDS = 15
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._wake = asyncio.Event()
+        self._tasks = []
+
+    async def enqueue(self, to_email: str, subject: str, html_content: str, kind: str = "general", meta: dict = None) -> str:
+        """
+        Store a message for delivery.
+
+        Args:
+            to_email: Recipient
+            subject: Subject line
+            html_content: Rendered HTML body
+            kind: Message type, e.g. "reservation_guest" or "password_reset"
+            meta: Extra fields kept on the outbox record (reservation_id, booking_code, ...)
+
+        Returns:
+            message_id of the queued message
+        """
+        now = _now().isoformat()
+        message_id = str(uuid.uuid4())
+        await db.mail_outbox.insert_one({
+            "message_id": message_id,
+            "kind": kind,
+            "to_email": to_email,
+            "subject": subject,
+            "html": html_content,
+            "meta": meta or {},
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        })
+        self._wake.set()
+        return message_id
+
+    async def _claim(self):
+        now = _now()
+        return await db.mail_outbox.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now.isoformat()}},
+                {"status": "sending", "locked_until": {"$lte": now.isoformat()}}
+            ]},
+            {"$set": {
+                "status": "sending",
+                "locked_until": (now + timedelta(seconds=self.LEASE_SECONDS)).isoformat()
+            }},
+            projection={"_id": 0},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _process(self, message: dict):
+        attempts = message.get("attempts", 0) + 1
+        started = time.perf_counter()
+        try:
+            await deliver_email(message["to_email"], message["subject"], message["html"])
+        except Exception as e:
+            error = str(e)
+            if attempts >= MAIL_MAX_ATTEMPTS:
+                await self._log(message, "failed", started, attempts, error)
+                logger.error(f"Mail {message['message_id']} to {message['to_email']} dead-lettered: {error}")
+                update = {"status": "dead", "dead_at": _now().isoformat()}
+            else:
+                delay = retry_delay(attempts)
+                logger.warning(f"Mail {message['message_id']} failed (attempt {attempts}), retrying in {delay:.0f}s: {error}")
+                update = {"status": "pending", "next_attempt_at": (_now() + timedelta(seconds=delay)).isoformat()}
+            await db.mail_outbox.update_one(
+                {"message_id": message["message_id"]},
+                {"$set": {**update, "attempts": attempts, "last_error": error}, "$unset": {"locked_until": ""}}
+            )
+            return
+
+        await db.mail_outbox.update_one(
+            {"message_id": message["message_id"]},
+            {"$set": {"status": "sent", "attempts": attempts, "sent_at": _now().isoformat()},
+             "$unset": {"locked_until": "", "html": ""}}
+        )
+        await self._log(message, "sent", started, attempts)
+
+    @staticmethod
+    async def _log(message: dict, status: str, started: float, attempts: int, error: str = None):
+        """Record the final outcome of a message; retried failures are not logged."""
+        await log_deliveries([{
+            **message.get("meta", {}),
+            "message_id": message["message_id"],
+            "to_email": message["to_email"],
+            "subject": message["subject"],
+            "status": status,
+            "attempts": attempts,
+            "latency_ms": round((time.perf_counter() - started) * 1000),
+            "error": error
+        }])
+
+    async def _run(self):
+        while True:
+            # Cleared before claiming, so an enqueue during the claim is not missed
+            self._wake.clear()
+            try:
+                message = await self._claim()
+            except Exception as e:
+                logger.error(f"Mail outbox claim failed: {e}")
+                message = None
+            if message is None:
+                try:
+                    await asyncio.wait_for(self._wake.wait(), self.POLL_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._process(message)
+            except Exception as e:
+                logger.error(f"Mail {message['message_id']} processing failed: {e}")
+
+    def start(self):
+        if not self._tasks:
+            loop = asyncio.get_running_loop()
+            self._tasks = [loop.create_task(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        """Stop dispatching; queued messages stay in the outbox."""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await asyncio.to_thread(smtp_pool.close)
+
+    async def retry(self, message_id: str) -> bool:
+        """Put a dead-lettered message back in the queue."""
+        result = await db.mail_outbox.update_one(
+            {"message_id": message_id, "status": "dead"},
+            {"$set": {"status": "pending", "attempts": 0, "next_attempt_at": _now().isoformat()}}
+        )
+        if result.modified_count:
+            self._wake.set()
+        return result.modified_count > 0
+
+
+mail_queue = MailQueue(workers=MAIL_CONCURRENCY)
+
+
+async def enqueue_email(to_email: str, subject: str, html_content: str, kind: str = "general", meta: dict = None) -> str:
+    return await mail_queue.enqueue(to_email, subject, html_content, kind=kind, meta=meta)
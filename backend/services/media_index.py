@@ -0,0 +1,250 @@
+import re
+import asyncio
+import base64
+import logging
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+from config import MEDIA_RECONCILE_INTERVAL_SECONDS
+from database import db
+from cloudinary_helper import list_gallery_images, media_from_response, build_derivatives
+from services.cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+# Fields of an asset returned by the gallery, in Cloudinary's resource shape
+ASSET_PROJECTION = {
+    "_id": 0, "public_id": 1, "resource_type": 1, "secure_url": 1, "format": 1,
+    "width": 1, "height": 1, "bytes": 1, "duration": 1, "thumbnail_url": 1,
+    "created_at": 1, "tags": 1, "context": 1, "caption": 1, "alt_text": 1
+}
+
+RECONCILE_PREFIX = "spencer-green/"
+
+
+def _timestamp(value: str = None) -> str:
+    """
+    created_at in Cloudinary's format (2026-01-31T08:00:00Z), whatever the
+    source, so (created_at, public_id) cursors compare consistently.
+    """
+    moment = None
+    if value:
+        try:
+            moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+    if moment is None:
+        moment = datetime.now(timezone.utc)
+    elif moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def _asset_doc(media: dict, tags: list = None, context: dict = None) -> dict:
+    public_id = media["public_id"]
+    doc = {
+        "public_id": public_id,
+        "resource_type": media.get("resource_type") or "image",
+        "folder": public_id.rsplit("/", 1)[0] if "/" in public_id else "",
+        "secure_url": media.get("secure_url"),
+        "format": media.get("format"),
+        "width": media.get("width"),
+        "height": media.get("height"),
+        "bytes": media.get("bytes"),
+        "created_at": _timestamp(media.get("created_at")),
+        "synced_at": datetime.now(timezone.utc).isoformat()
+    }
+    if media.get("duration") is not None:
+        doc["duration"] = media["duration"]
+    if media.get("thumbnail_url"):
+        doc["thumbnail_url"] = media["thumbnail_url"]
+    if doc["resource_type"] == "image":
+        doc["derivatives"] = build_derivatives(doc)
+    if tags is not None:
+        doc["tags"] = tags
+    if context is not None:
+        doc["context"] = context
+    return doc
+
+
+async def index_asset(media: dict, tags: list = None, context: dict = None):
+    """Add or refresh an uploaded asset in media_assets."""
+    if not media or not media.get("public_id"):
+        return
+    doc = _asset_doc(media, tags, context)
+    await db.media_assets.update_one(
+        {"resource_type": doc["resource_type"], "public_id": doc["public_id"]},
+        {"$set": doc},
+        upsert=True
+    )
+    invalidate("media_assets")
+
+
+async def remove_asset(public_id: str, resource_type: str = "image"):
+    await db.media_assets.delete_one({"resource_type": resource_type, "public_id": public_id})
+    invalidate("media_assets")
+
+
+async def remove_assets(public_ids: list, resource_type: str = "image"):
+    if public_ids:
+        await db.media_assets.delete_many({"resource_type": resource_type, "public_id": {"$in": public_ids}})
+        invalidate("media_assets")
+
+
+async def remove_prefix(prefix: str):
+    """Drop every indexed asset under a folder, of any resource type."""
+    await db.media_assets.delete_many({"public_id": {"$regex": "^" + re.escape(prefix)}})
+    invalidate("media_assets")
+
+
+async def set_caption(public_id: str, caption: str, alt_text: str):
+    """Store an AI caption on the asset so the gallery can search it."""
+    if public_id:
+        await db.media_assets.update_many(
+            {"public_id": public_id},
+            {"$set": {"caption": caption, "alt_text": alt_text}}
+        )
+
+
+def _encode_cursor(asset: dict) -> str:
+    return base64.urlsafe_b64encode(f"{asset['created_at']}|{asset['public_id']}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, public_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return created_at, public_id
+    except Exception:
+        return None
+
+
+async def list_assets(
+    prefix: str = None,
+    resource_type: str = "image",
+    tags: list = None,
+    q: str = None,
+    limit: int = 50,
+    next_cursor: str = None
+) -> dict:
+    """
+    Page through indexed assets, newest first.
+
+    Args:
+        prefix: Only assets whose public_id starts with this folder path
+        resource_type: image or video
+        tags: Only assets carrying all of these tags
+        q: Text search over caption, alt text, context and public_id
+        limit: Page size
+        next_cursor: Opaque cursor from the previous page
+
+    Returns:
+        Dictionary with "resources" and "next_cursor", like the Cloudinary listing
+    """
+    query = {"resource_type": resource_type}
+    if prefix and prefix.strip():
+        query["public_id"] = {"$regex": "^" + re.escape(prefix.strip())}
+    if tags:
+        query["tags"] = {"$all": tags}
+    if q and q.strip():
+        query["$text"] = {"$search": q.strip()}
+
+    position = _decode_cursor(next_cursor) if next_cursor else None
+    if position:
+        created_at, public_id = position
+        query["$or"] = [
+            {"created_at": {"$lt": created_at}},
+            {"created_at": created_at, "public_id": {"$lt": public_id}}
+        ]
+
+    assets = await db.media_assets.find(query, ASSET_PROJECTION).sort(
+        [("created_at", -1), ("public_id", -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    has_more = len(assets) > limit
+    assets = assets[:limit]
+    return {
+        "resources": assets,
+        "next_cursor": _encode_cursor(assets[-1]) if has_more else None
+    }
+
+
+async def reconcile_media_index(resource_types: tuple = ("image", "video")) -> dict:
+    """
+    Re-sync media_assets with Cloudinary.
+
+    Lists every asset under RECONCILE_PREFIX, upserts it, and then drops
+    indexed assets that were not seen. Captions stored on the index are kept.
+    A resource type whose listing fails part-way is left untouched.
+    """
+    stats = {}
+    for resource_type in resource_types:
+        started = datetime.now(timezone.utc).isoformat()
+        seen = 0
+        cursor = None
+        complete = True
+        while True:
+            page = await list_gallery_images(
+                folder_prefix=RECONCILE_PREFIX, resource_type=resource_type, max_results=500, next_cursor=cursor
+            )
+            if page.get("error"):
+                complete = False
+                break
+            resources = page.get("resources", [])
+            if resources:
+                await db.media_assets.bulk_write([
+                    UpdateOne(
+                        {"resource_type": resource_type, "public_id": r["public_id"]},
+                        {"$set": _asset_doc(
+                            {**media_from_response(r, resource_type), "resource_type": resource_type},
+                            tags=r.get("tags", []),
+                            context=(r.get("context") or {}).get("custom", r.get("context") or {})
+                        )},
+                        upsert=True
+                    )
+                    for r in resources
+                ], ordered=False)
+                seen += len(resources)
+            cursor = page.get("next_cursor")
+            if not cursor:
+                break
+
+        removed = 0
+        if complete:
+            result = await db.media_assets.delete_many({
+                "resource_type": resource_type,
+                "public_id": {"$regex": "^" + re.escape(RECONCILE_PREFIX)},
+                "synced_at": {"$lt": started}
+            })
+            removed = result.deleted_count
+        stats[resource_type] = {"seen": seen, "removed": removed, "complete": complete}
+    invalidate("media_assets")
+    logger.info(f"Media index reconciled: {stats}")
+    return stats
+
+
+_reconcile_task = None
+
+
+async def _run_reconcile():
+    # Fill an empty index right away; otherwise wait a full interval first
+    if await db.media_assets.estimated_document_count() > 0:
+        await asyncio.sleep(MEDIA_RECONCILE_INTERVAL_SECONDS)
+    while True:
+        try:
+            await reconcile_media_index()
+        except Exception as e:
+            logger.error(f"Media index reconciliation failed: {e}")
+        await asyncio.sleep(MEDIA_RECONCILE_INTERVAL_SECONDS)
+
+
+def start_reconcile():
+    global _reconcile_task
+    if _reconcile_task is None and MEDIA_RECONCILE_INTERVAL_SECONDS > 0:
+        _reconcile_task = asyncio.get_running_loop().create_task(_run_reconcile())
+
+
+def stop_reconcile():
+    global _reconcile_task
+    if _reconcile_task is not None:
+        _reconcile_task.cancel()
+        _reconcile_task = None
@@ -0,0 +1,45 @@
+import asyncio
+import logging
+import time
+
+from services.mailer import deliver_email, log_deliveries
+
+logger = logging.getLogger(__name__)
+
+
+async def _send(message: dict) -> dict:
+    started = time.perf_counter()
+    try:
+        await deliver_email(message["to_email"], message["subject"], message["html"])
+        status, error = "sent", None
+    except Exception as e:
+        status, error = "failed", str(e)
+        logger.error(f"Failed to send email to {message['to_email']}: {error}")
+    return {
+        "role": message.get("role"),
+        "to_email": message["to_email"],
+        "subject": message["subject"],
+        "status": status,
+        "latency_ms": round((time.perf_counter() - started) * 1000),
+        "error": error
+    }
+
+
+async def fan_out(messages: list, meta: dict = None) -> list:
+    """
+    Send messages to all their recipients at once and log each delivery.
+
+    Sends run concurrently, each taking a token from the per-process mail rate
+    limit, so the call takes about one transport round-trip. Every
+    recipient gets its own email_logs record with status and latency.
+
+    Args:
+        messages: Dicts with to_email, subject, html and an optional role ("guest", "hotel")
+        meta: Fields stored with every log record (reservation_id, booking_code, is_resend)
+
+    Returns:
+        Per-recipient results in input order: role, to_email, status, latency_ms, error
+    """
+    results = await asyncio.gather(*(_send(m) for m in messages))
+    await log_deliveries([{**(meta or {}), **r} for r in results])
+    return list(results)
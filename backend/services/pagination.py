@@ -0,0 +1,105 @@
+import base64
+from fastapi import HTTPException, Response
+
+# Largest page an admin listing will return
+MAX_PAGE_SIZE = 500
+
+# count_documents() stops here for estimated counts of filtered listings
+ESTIMATE_COUNT_LIMIT = 10000
+
+
+def encode_cursor(doc: dict, id_field: str) -> str:
+    return base64.urlsafe_b64encode(f"{doc.get('created_at') or ''}|{doc[id_field]}".encode()).decode()
+
+
+def decode_cursor(cursor: str):
+    try:
+        created_at, doc_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return created_at, doc_id
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _after(created_at: str, id_field: str, doc_id: str) -> dict:
+    """Documents that come after (created_at, id) in newest-first order."""
+    if not created_at:
+        # Documents without created_at sort last and are ordered by id alone
+        return {"created_at": None, id_field: {"$lt": doc_id}}
+    return {"$or": [
+        {"created_at": {"$lt": created_at}},
+        {"created_at": created_at, id_field: {"$lt": doc_id}},
+        {"created_at": None}
+    ]}
+
+
+async def count(collection, query: dict, mode: str = None):
+    """
+    Total for a listing.
+
+    Args:
+        mode: None (don't count), "exact", or "estimated" - collection
+              metadata when unfiltered, otherwise a count capped at
+              ESTIMATE_COUNT_LIMIT
+    """
+    if mode == "exact":
+        return await collection.count_documents(query)
+    if mode == "estimated":
+        if not query:
+            return await collection.estimated_document_count()
+        return await collection.count_documents(query, limit=ESTIMATE_COUNT_LIMIT)
+    return None
+
+
+async def paginate(
+    collection,
+    query: dict,
+    id_field: str,
+    limit: int = 50,
+    cursor: str = None,
+    projection: dict = None,
+    count_mode: str = None
+) -> dict:
+    """
+    One page of a newest-first listing using a (created_at, id) keyset.
+
+    Each page is a range scan after the previous page's last document, so
+    deep pages cost the same as the first one and documents inserted
+    meanwhile don't shift results between pages.
+
+    Args:
+        collection: Motor collection
+        query: Filter
+        id_field: Unique id field used as the tie-breaker (e.g. "log_id")
+        limit: Page size, capped at MAX_PAGE_SIZE
+        cursor: Opaque cursor from the previous page
+        projection: Fields to return; _id is always excluded
+        count_mode: None, "exact" or "estimated" (see count())
+
+    Returns:
+        Dictionary with "items", "next_cursor" (None on the last page) and "total"
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    find_query = query
+    if cursor:
+        created_at, doc_id = decode_cursor(cursor)
+        find_query = {"$and": [query, _after(created_at, id_field, doc_id)]}
+
+    items = await collection.find(find_query, {**(projection or {}), "_id": 0}).sort(
+        [("created_at", -1), (id_field, -1)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    has_more = len(items) > limit
+    items = items[:limit]
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(items[-1], id_field) if has_more else None,
+        "total": await count(collection, query, count_mode)
+    }
+
+
+def set_cursor_header(response: Response, page: dict):
+    """Expose the next cursor on endpoints that return a bare list."""
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    if page["total"] is not None:
+        response.headers["X-Total-Count"] = str(page["total"])
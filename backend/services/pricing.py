@@ -0,0 +1,171 @@
+import time
+import jwt
+from datetime import datetime, timezone, timedelta
+
+from config import JWT_SECRET, JWT_ALGORITHM, QUOTE_EXPIRATION_MINUTES, PRICING_CACHE_TTL_SECONDS
+from database import db
+from models.quote import Quote
+
+STANDARD_PLAN = {
+    "rate_plan_id": "standard",
+    "name": "Room Only",
+    "description": "Room only, standard cancellation policy",
+    "conditions": ["free-cancellation"]
+}
+
+# In-process cache of active rate plans and promo codes.
+# Admin writes call invalidate_pricing_cache(); the TTL bounds staleness
+# across workers that did not see the write.
+_cache = {
+    "rate_plans": None,
+    "promo_codes": None,
+    "loaded_at": 0.0
+}
+
+
+def invalidate_pricing_cache():
+    """Drop cached rate plans and promo codes so the next read reloads them."""
+    _cache["rate_plans"] = None
+    _cache["promo_codes"] = None
+    _cache["loaded_at"] = 0.0
+
+
+async def _load_cache():
+    if _cache["rate_plans"] is not None and time.monotonic() - _cache["loaded_at"] < PRICING_CACHE_TTL_SECONDS:
+        return _cache
+
+    rate_plans = await db.rate_plans.find({"is_active": True}, {"_id": 0}).to_list(None)
+    promos = await db.promo_codes.find({"is_active": True}, {"_id": 0}).to_list(None)
+
+    _cache["rate_plans"] = rate_plans
+    _cache["promo_codes"] = {p["code"]: p for p in promos}
+    _cache["loaded_at"] = time.monotonic()
+    return _cache
+
+
+async def get_active_rate_plans() -> list:
+    return (await _load_cache())["rate_plans"]
+
+
+async def get_active_rate_plan(rate_plan_id: str):
+    for plan in await get_active_rate_plans():
+        if plan["rate_plan_id"] == rate_plan_id:
+            return plan
+    return None
+
+
+async def get_active_promo(code: str):
+    return (await _load_cache())["promo_codes"].get(code.upper())
+
+
+def plans_for_room(rate_plans: list, room_type_id: str) -> list:
+    """Global plans (no room_type_id) followed by the plans specific to this room."""
+    global_plans = [p for p in rate_plans if not p.get("room_type_id")]
+    specific_plans = [p for p in rate_plans if p.get("room_type_id") == room_type_id]
+    return global_plans + specific_plans
+
+
+def apply_rate_plan(total_base_price: float, plan: dict, nights: int) -> float:
+    """
+    Apply a rate plan modifier to the base price of a stay.
+
+    Args:
+        total_base_price: Sum of the nightly rates
+        plan: Rate plan document (the standard plan has no modifier)
+        nights: Number of nights in the stay
+    """
+    modifier_type = plan.get("price_modifier_type")
+    modifier_val = plan.get("price_modifier_val", 0)
+
+    if modifier_type == "percent":
+        # e.g. -10 means 10% discount, +10 means 10% surcharge
+        return total_base_price * (1 + modifier_val / 100)
+    if modifier_type == "absolute_add":
+        # Add X per night
+        return total_base_price + (modifier_val * nights)
+    if modifier_type == "absolute_total":
+        # Add X to the total of the stay
+        return total_base_price + modifier_val
+    return total_base_price
+
+
+def build_quote(room_type_id: str, check_in: str, check_out: str, night_rates: list, plan: dict = None) -> Quote:
+    plan = plan or STANDARD_PLAN
+    nights = len(night_rates)
+    base_price = sum(night_rates)
+    return Quote(
+        room_type_id=room_type_id,
+        check_in=check_in,
+        check_out=check_out,
+        nights=nights,
+        rate_plan_id=plan["rate_plan_id"],
+        rate_plan_name=plan["name"],
+        base_price=base_price,
+        total_price=apply_rate_plan(base_price, plan, nights)
+    )
+
+
+QUOTE_AUDIENCE = "quote"
+
+
+def sign_quote(quote: Quote) -> str:
+    """Sign a quote so it can be handed back on booking without re-pricing."""
+    # The audience keeps quote tokens from being accepted as login tokens
+    payload = {
+        "aud": QUOTE_AUDIENCE,
+        "type": "quote",
+        "quote": quote.model_dump(),
+        "exp": datetime.now(timezone.utc) + timedelta(minutes=QUOTE_EXPIRATION_MINUTES)
+    }
+    return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+
+
+def verify_quote(token: str):
+    """Return the Quote carried by a valid token, or None if it is invalid or expired."""
+    try:
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM], audience=QUOTE_AUDIENCE)
+    except jwt.InvalidTokenError:
+        return None
+    if payload.get("type") != "quote":
+        return None
+    return Quote(**payload["quote"])
+
+
+def promo_discount(promo: dict, total_price: float, room_type_id: str, check_in: datetime) -> float:
+    """
+    Discount a promo code gives on a stay, or 0 if the promo does not apply.
+
+    Usage limits are checked here against the cached document; callers must
+    still claim a use atomically before granting the discount.
+    """
+    if not promo:
+        return 0
+
+    now = datetime.now(timezone.utc).isoformat()
+    if not (promo["valid_from"] <= now <= promo["valid_until"]):
+        return 0
+    if promo["current_usage"] >= promo["max_usage"]:
+        return 0
+    if promo["room_type_ids"] and room_type_id not in promo["room_type_ids"]:
+        return 0
+
+    # Check valid_days (0=Sunday, 6=Saturday in JS convention)
+    valid_days = promo.get("valid_days", [])
+    if valid_days:
+        # Convert Python weekday (0=Mon) to JS (0=Sun)
+        js_weekday = (check_in.weekday() + 1) % 7
+        if js_weekday not in valid_days:
+            return 0
+
+    if promo["discount_type"] == "percent":
+        return total_price * (promo["discount_value"] / 100)
+    return promo["discount_value"]
+
+
+async def claim_promo_usage(promo: dict) -> bool:
+    """Atomically consume one use of a promo code, failing if the limit is reached."""
+    result = await db.promo_codes.update_one(
+        {"promo_id": promo["promo_id"], "$expr": {"$lt": ["$current_usage", "$max_usage"]}},
+        {"$inc": {"current_usage": 1}}
+    )
+    return result.modified_count == 1
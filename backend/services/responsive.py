@@ -0,0 +1,126 @@
+import logging
+from cloudinary import exceptions as cloudinary_errors
+
+from database import db
+from cloudinary_helper import build_derivatives, public_id_from_url, get_media, generate_derivatives
+from services.media_index import index_asset
+from services.cache import invalidate
+
+logger = logging.getLogger(__name__)
+
+# `sizes` attributes for the layouts images are shown in
+SIZES = {
+    "card": "(max-width: 1024px) 100vw, 33vw",
+    "detail": "(max-width: 1024px) 100vw, 50vw",
+    "full": "100vw",
+    "thumb": "96px"
+}
+
+# Content fields holding image URLs
+CONTENT_IMAGE_KEYS = {"image", "images", "background", "background_image"}
+
+
+def srcset_entry(url: str, asset: dict = None, sizes: str = "full") -> dict:
+    """
+    Ready-to-use <img> attributes for one image URL.
+
+    Uses the asset's registered derivatives when it is indexed, otherwise
+    derives them from the URL. Non-Cloudinary URLs get only `src`.
+    """
+    derivatives = (asset or {}).get("derivatives") or build_derivatives({"secure_url": url})
+    entry = {
+        "src": url,
+        "srcset": "",
+        "sizes": SIZES.get(sizes, sizes),
+        "width": (asset or {}).get("width"),
+        "height": (asset or {}).get("height")
+    }
+    if derivatives:
+        # 800w (or the closest) as the fallback for browsers without srcset
+        entry["src"] = derivatives[min(1, len(derivatives) - 1)]["url"]
+        entry["srcset"] = ", ".join(f"{d['url']} {d['width']}w" for d in derivatives)
+    return entry
+
+
+async def responsive_images(urls: list, sizes: str = "full") -> dict:
+    """
+    srcset entries for many image URLs with one media_assets lookup.
+
+    Returns:
+        Dictionary of url -> srcset_entry()
+    """
+    urls = [u for u in dict.fromkeys(urls) if u]
+    assets = await db.media_assets.find(
+        {"secure_url": {"$in": urls}},
+        {"_id": 0, "secure_url": 1, "width": 1, "height": 1, "derivatives": 1}
+    ).to_list(len(urls))
+    by_url = {a["secure_url"]: a for a in assets}
+    return {u: srcset_entry(u, by_url.get(u), sizes) for u in urls}
+
+
+def _content_images(value, key: str = None, out: list = None) -> list:
+    if out is None:
+        out = []
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _content_images(v, k, out)
+    elif isinstance(value, list):
+        for v in value:
+            _content_images(v, key, out)
+    elif isinstance(value, str) and key in CONTENT_IMAGE_KEYS and value.startswith("http"):
+        out.append(value)
+    return out
+
+
+async def backfill_derivatives() -> dict:
+    """
+    Register derivatives for images used by rooms and site content.
+
+    Images missing from media_assets are indexed from Cloudinary metadata
+    and their responsive derivatives are generated eagerly. URLs whose asset
+    can't be looked up (deleted, or a failed request) are counted as failed
+    and left out of the index. Safe to run repeatedly.
+    """
+    urls = []
+    async for room in db.room_types.find({}, {"_id": 0, "images": 1}):
+        urls.extend(room.get("images") or [])
+    async for content in db.site_content.find({}, {"_id": 0, "content": 1}):
+        urls.extend(_content_images(content.get("content") or {}))
+    urls = [u for u in dict.fromkeys(urls) if public_id_from_url(u)]
+
+    indexed = await db.media_assets.find(
+        {"secure_url": {"$in": urls}, "derivatives": {"$exists": True}},
+        {"_id": 0, "secure_url": 1}
+    ).to_list(len(urls))
+    known = {a["secure_url"] for a in indexed}
+
+    stats = {"checked": len(urls), "indexed": 0, "generated": 0, "failed": 0}
+    for url in urls:
+        if url in known:
+            continue
+        public_id = public_id_from_url(url)
+        try:
+            media = await get_media(public_id, "image")
+        except cloudinary_errors.NotFound:
+            logger.warning(f"Skipping {url}: asset {public_id} no longer exists")
+            stats["failed"] += 1
+            continue
+        except Exception as e:
+            logger.warning(f"Could not fetch {public_id} for backfill: {e}")
+            stats["failed"] += 1
+            continue
+        # Keep the URL rooms and content reference so lookups by URL hit
+        media["secure_url"] = url
+        await index_asset(media)
+        stats["indexed"] += 1
+
+        try:
+            await generate_derivatives(public_id)
+            stats["generated"] += 1
+        except Exception as e:
+            logger.warning(f"Could not generate derivatives for {public_id}: {e}")
+            stats["failed"] += 1
+
+    invalidate("media_assets")
+    logger.info(f"Derivative backfill: {stats}")
+    return stats
@@ -0,0 +1,301 @@
+import asyncio
+import logging
+from datetime import datetime, timezone, timedelta
+from pymongo import UpdateOne, ReplaceOne
+
+from database import db
+
+logger = logging.getLogger(__name__)
+
+# Events counted in the booking funnel
+FUNNEL_EVENTS = ["view_room_detail", "click_book_now", "view_guest_info", "view_payment", "booking_success"]
+
+# Rolled-up collections:
+#   daily_rollups  one document per day (reservation created_at / event timestamp):
+#                  bookings, cancelled, revenue, lead_days_sum, lead_count,
+#                  rooms.<room name>, funnel.<event name>
+#   rollup_totals  all-time aggregates, currently {"key": "room_popularity", "rooms": {...}}
+ROOM_POPULARITY_KEY = "room_popularity"
+
+
+def _field_key(value: str) -> str:
+    # Dots would be read as nested paths by $inc
+    return (value or "Unknown").replace(".", "_")
+
+
+def _lead_days(reservation: dict):
+    try:
+        check_in = datetime.strptime(reservation["check_in"], "%Y-%m-%d").replace(tzinfo=timezone.utc)
+        created_at = datetime.fromisoformat(reservation["created_at"])
+        if created_at.tzinfo is None:
+            created_at = created_at.replace(tzinfo=timezone.utc)
+        return (check_in - created_at).total_seconds() / 86400
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _contribution(reservation: dict) -> dict:
+    """Counters a single reservation adds to the rollup of the day it was created."""
+    counters = {"bookings": 1}
+    if reservation.get("status") == "cancelled":
+        counters["cancelled"] = 1
+        return counters
+
+    counters["revenue"] = reservation.get("total_amount", 0) or 0
+    counters[f"rooms.{_field_key(reservation.get('room_type_name'))}"] = 1
+    lead_days = _lead_days(reservation)
+    if lead_days is not None:
+        counters["lead_days_sum"] = lead_days
+        counters["lead_count"] = 1
+    return counters
+
+
+async def _apply(day: str, counters: dict):
+    counters = {k: v for k, v in counters.items() if v}
+    if not counters:
+        return
+
+    now = datetime.now(timezone.utc).isoformat()
+    await db.daily_rollups.update_one(
+        {"date": day},
+        {"$inc": counters, "$set": {"last_updated": now}},
+        upsert=True
+    )
+
+    room_counters = {k: v for k, v in counters.items() if k.startswith("rooms.")}
+    if room_counters:
+        await db.rollup_totals.update_one(
+            {"key": ROOM_POPULARITY_KEY},
+            {"$inc": room_counters, "$set": {"last_updated": now}},
+            upsert=True
+        )
+
+
+async def record_reservation_change(before: dict = None, after: dict = None):
+    """
+    Apply the difference between two versions of a reservation to the rollups.
+
+    Pass only `after` for a new reservation, only `before` for a deleted one,
+    and both for an update. Rollup failures are logged, never raised; the
+    nightly compaction repairs any drift.
+    """
+    reference = after or before
+    if not reference or not reference.get("created_at"):
+        return
+
+    counters = dict(_contribution(after)) if after else {}
+    if before:
+        for key, value in _contribution(before).items():
+            counters[key] = counters.get(key, 0) - value
+
+    try:
+        await _apply(reference["created_at"][:10], counters)
+    except Exception as e:
+        logger.error(f"Failed to update reservation rollups: {e}")
+
+
+async def record_events(events: list):
+    """Count funnel events per day. Used as the event sink's flush hook."""
+    per_day = {}
+    for event in events:
+        if event.get("event_name") not in FUNNEL_EVENTS:
+            continue
+        counters = per_day.setdefault(event["timestamp"][:10], {})
+        key = f"funnel.{event['event_name']}"
+        counters[key] = counters.get(key, 0) + 1
+
+    if not per_day:
+        return
+
+    now = datetime.now(timezone.utc).isoformat()
+    await db.daily_rollups.bulk_write([
+        UpdateOne({"date": day}, {"$inc": counters, "$set": {"last_updated": now}}, upsert=True)
+        for day, counters in per_day.items()
+    ], ordered=False)
+
+
+async def rebuild_rollups(start_date: str = None, end_date: str = None) -> dict:
+    """
+    Recompute rollups from the source collections.
+
+    Days in [start_date, end_date] (all history if omitted) are replaced with
+    freshly aggregated values, one upsert per day, and all-time room
+    popularity is recomputed. Increments that land between the aggregation
+    and a day's replace can be lost; the nightly compaction repairs them.
+
+    Returns:
+        Dictionary with the number of days rebuilt
+    """
+    date_match = {}
+    if start_date:
+        date_match["$gte"] = start_date
+    if end_date:
+        # Inclusive end day for ISO timestamps
+        date_match["$lt"] = (datetime.strptime(end_date, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+
+    reservation_match = {"created_at": date_match} if date_match else {}
+    not_cancelled = {"$ne": ["$status", "cancelled"]}
+    day_pipeline = [
+        {"$match": reservation_match},
+        {
+            "$group": {
+                "_id": {"$substr": ["$created_at", 0, 10]},
+                "bookings": {"$sum": 1},
+                "cancelled": {"$sum": {"$cond": [not_cancelled, 0, 1]}},
+                "revenue": {"$sum": {"$cond": [not_cancelled, "$total_amount", 0]}},
+                "lead_days_sum": {
+                    "$sum": {
+                        "$cond": [
+                            not_cancelled,
+                            {"$divide": [
+                                {"$subtract": [{"$toDate": "$check_in"}, {"$toDate": "$created_at"}]},
+                                1000 * 60 * 60 * 24
+                            ]},
+                            0
+                        ]
+                    }
+                },
+                "lead_count": {"$sum": {"$cond": [not_cancelled, 1, 0]}}
+            }
+        }
+    ]
+    room_pipeline = [
+        {"$match": {**reservation_match, "status": {"$ne": "cancelled"}}},
+        {
+            "$group": {
+                "_id": {"day": {"$substr": ["$created_at", 0, 10]}, "room": "$room_type_name"},
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+    event_match = {"event_name": {"$in": FUNNEL_EVENTS}}
+    if date_match:
+        event_match["timestamp"] = date_match
+    funnel_pipeline = [
+        {"$match": event_match},
+        {
+            "$group": {
+                "_id": {"day": {"$substr": ["$timestamp", 0, 10]}, "event": "$event_name"},
+                "count": {"$sum": 1}
+            }
+        }
+    ]
+
+    day_stats, room_stats, funnel_stats = await asyncio.gather(
+        db.reservations.aggregate(day_pipeline).to_list(None),
+        db.reservations.aggregate(room_pipeline).to_list(None),
+        db.analytics_events.aggregate(funnel_pipeline).to_list(None)
+    )
+
+    now = datetime.now(timezone.utc).isoformat()
+    days = {}
+    for item in day_stats:
+        doc = days.setdefault(item["_id"], {"date": item["_id"], "rooms": {}, "funnel": {}})
+        for field in ["bookings", "cancelled", "revenue", "lead_days_sum", "lead_count"]:
+            doc[field] = item[field]
+    for item in room_stats:
+        doc = days.setdefault(item["_id"]["day"], {"date": item["_id"]["day"], "rooms": {}, "funnel": {}})
+        doc["rooms"][_field_key(item["_id"]["room"])] = item["count"]
+    for item in funnel_stats:
+        doc = days.setdefault(item["_id"]["day"], {"date": item["_id"]["day"], "rooms": {}, "funnel": {}})
+        doc["funnel"][item["_id"]["event"]] = item["count"]
+
+    range_filter = {}
+    if start_date:
+        range_filter["$gte"] = start_date
+    if end_date:
+        range_filter["$lte"] = end_date
+    # Days that no longer have any data are zeroed in place rather than
+    # deleted, so the range never shows gaps while the rebuild runs
+    stale = await db.daily_rollups.distinct("date", {"date": range_filter} if range_filter else {})
+    for day in stale:
+        days.setdefault(day, {
+            "date": day, "rooms": {}, "funnel": {},
+            "bookings": 0, "cancelled": 0, "revenue": 0, "lead_days_sum": 0, "lead_count": 0
+        })
+    if days:
+        await db.daily_rollups.bulk_write([
+            ReplaceOne({"date": day}, {**doc, "last_updated": now}, upsert=True)
+            for day, doc in days.items()
+        ], ordered=False)
+
+    # All-time popularity is small to recompute from its own group stage
+    popularity = await db.reservations.aggregate([
+        {"$match": {"status": {"$ne": "cancelled"}}},
+        {"$group": {"_id": "$room_type_name", "count": {"$sum": 1}}}
+    ]).to_list(None)
+    await db.rollup_totals.replace_one(
+        {"key": ROOM_POPULARITY_KEY},
+        {
+            "key": ROOM_POPULARITY_KEY,
+            "rooms": {_field_key(item["_id"]): item["count"] for item in popularity},
+            "last_updated": now
+        },
+        upsert=True
+    )
+
+    return {"days_rebuilt": len(days)}
+
+
+async def get_rollups(start_date: str, end_date: str) -> list:
+    return await db.daily_rollups.find(
+        {"date": {"$gte": start_date, "$lte": end_date}},
+        {"_id": 0}
+    ).sort("date", 1).to_list(None)
+
+
+async def get_room_popularity(limit: int = 5) -> list:
+    totals = await db.rollup_totals.find_one({"key": ROOM_POPULARITY_KEY}, {"_id": 0})
+    rooms = (totals or {}).get("rooms", {})
+    ranked = sorted(((name, count) for name, count in rooms.items() if count > 0), key=lambda x: -x[1])
+    return [{"_id": name, "count": count} for name, count in ranked[:limit]]
+
+
+# ==================== NIGHTLY COMPACTION ====================
+
+COMPACTION_HOUR_UTC = 0
+COMPACTION_MINUTE_UTC = 15
+COMPACTION_DAYS = 2
+
+_compaction_task = None
+
+
+async def compact_recent_rollups():
+    """Rebuild the last COMPACTION_DAYS days to repair any incremental drift."""
+    today = datetime.now(timezone.utc)
+    start = (today - timedelta(days=COMPACTION_DAYS - 1)).strftime("%Y-%m-%d")
+    result = await rebuild_rollups(start, today.strftime("%Y-%m-%d"))
+    logger.info(f"Rollup compaction rebuilt {result['days_rebuilt']} days from {start}")
+
+
+async def _run_compaction():
+    # Fill an empty rollup store from history right away
+    try:
+        if await db.daily_rollups.estimated_document_count() == 0:
+            result = await rebuild_rollups()
+            logger.info(f"Initial rollup backfill rebuilt {result['days_rebuilt']} days")
+    except Exception as e:
+        logger.error(f"Initial rollup backfill failed: {e}")
+    while True:
+        now = datetime.now(timezone.utc)
+        next_run = now.replace(hour=COMPACTION_HOUR_UTC, minute=COMPACTION_MINUTE_UTC, second=0, microsecond=0)
+        if next_run <= now:
+            next_run += timedelta(days=1)
+        await asyncio.sleep((next_run - now).total_seconds())
+        try:
+            await compact_recent_rollups()
+        except Exception as e:
+            logger.error(f"Rollup compaction failed: {e}")
+
+
+def start_compaction():
+    global _compaction_task
+    if _compaction_task is None:
+        _compaction_task = asyncio.get_running_loop().create_task(_run_compaction())
+
+
+def stop_compaction():
+    global _compaction_task
+    if _compaction_task is not None:
+        _compaction_task.cancel()
+        _compaction_task = None
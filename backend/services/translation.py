@@ -0,0 +1,180 @@
+import asyncio
+import hashlib
+import logging
+from datetime import datetime, timezone
+from pymongo import UpdateOne
+
+from config import TRANSLATION_BATCH_SIZE, AI_TEXT_CONCURRENCY
+from database import db
+from ai_helper import translate_batch, generate_copy
+
+logger = logging.getLogger(__name__)
+
+# Bounds concurrent LLM requests made by this module
+_ai_limit = asyncio.Semaphore(AI_TEXT_CONCURRENCY)
+
+# Content fields that are never translated
+SKIP_KEYS = {"image", "images", "video", "video_url", "url", "link", "code", "icon", "validUntil", "hours"}
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+async def _cached(kind: str, variant: str, hashes: list) -> dict:
+    """Cached results of one kind/variant, by source hash."""
+    docs = await db.ai_text_cache.find(
+        {"kind": kind, "variant": variant, "source_hash": {"$in": hashes}},
+        {"_id": 0, "source_hash": 1, "result": 1}
+    ).to_list(len(hashes))
+    return {d["source_hash"]: d["result"] for d in docs}
+
+
+async def _store(kind: str, variant: str, results: dict):
+    if not results:
+        return
+    now = datetime.now(timezone.utc).isoformat()
+    await db.ai_text_cache.bulk_write([
+        UpdateOne(
+            {"kind": kind, "variant": variant, "source_hash": h},
+            {"$set": {"result": result, "created_at": now}},
+            upsert=True
+        )
+        for h, result in results.items()
+    ], ordered=False)
+
+
+async def translate_texts(texts: list, target_language: str) -> tuple:
+    """
+    Translate strings, reusing cached translations.
+
+    The cache is keyed by (sha256 of the source text, target language), so
+    edited text simply misses and is translated again. Missing strings are
+    sent TRANSLATION_BATCH_SIZE at a time, at most AI_TEXT_CONCURRENCY
+    requests at once. A failed batch (including no configured LLM client)
+    falls back to the source text, is not cached and is reported as failed.
+
+    Args:
+        texts: Source strings; duplicates are translated once
+        target_language: "zh", "en" or "id"
+
+    Returns:
+        (translations in input order, set of source hashes that failed)
+    """
+    by_hash = {text_hash(t): t for t in texts}
+    translated = await _cached("translation", target_language, list(by_hash))
+    missing = [h for h in by_hash if h not in translated]
+
+    async def run_batch(batch: list) -> dict:
+        async with _ai_limit:
+            result = await translate_batch([by_hash[h] for h in batch], target_language)
+        if result is None:
+            logger.warning(f"Translation batch of {len(batch)} strings to {target_language} failed")
+            return {}
+        return dict(zip(batch, result))
+
+    batches = [missing[i:i + TRANSLATION_BATCH_SIZE] for i in range(0, len(missing), TRANSLATION_BATCH_SIZE)]
+    fresh = {}
+    for result in await asyncio.gather(*(run_batch(b) for b in batches)):
+        fresh.update(result)
+    await _store("translation", target_language, fresh)
+
+    translated.update(fresh)
+    failed = {h for h in missing if h not in fresh}
+    return [translated.get(text_hash(t), t) for t in texts], failed
+
+
+def _collect(value, key: str = None, out: list = None) -> list:
+    """Translatable strings in a content value, in traversal order."""
+    if out is None:
+        out = []
+    if key in SKIP_KEYS:
+        return out
+    if isinstance(value, dict):
+        for k, v in value.items():
+            _collect(v, k, out)
+    elif isinstance(value, list):
+        for v in value:
+            _collect(v, key, out)
+    elif isinstance(value, str) and value.strip() and not value.startswith(("http://", "https://", "/")):
+        out.append(value)
+    return out
+
+
+def _replace(value, translations, key: str = None):
+    """Rebuild a content value, taking strings from `translations` in _collect order."""
+    if key in SKIP_KEYS:
+        return value
+    if isinstance(value, dict):
+        return {k: _replace(v, translations, k) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_replace(v, translations, key) for v in value]
+    if isinstance(value, str) and value.strip() and not value.startswith(("http://", "https://", "/")):
+        return next(translations)
+    return value
+
+
+async def translate_page(page: str, target_language: str, section: str = None, save: bool = False) -> tuple:
+    """
+    Translate every section of a site_content page with one pass over the cache.
+
+    Args:
+        page: site_content page
+        target_language: "zh", "en" or "id"
+        section: Only translate this section
+        save: Store the result on each document under translations.<lang>;
+              only fully translated sections are stored
+
+    Returns:
+        (dictionary of section -> translated content, list of sections with
+        strings that could not be translated)
+    """
+    query = {"page": page}
+    if section:
+        query["section"] = section
+    docs = await db.site_content.find(query, {"_id": 0}).to_list(500)
+
+    strings = [_collect(doc.get("content", {})) for doc in docs]
+    flat, failed = await translate_texts([s for group in strings for s in group], target_language)
+
+    translations = iter(flat)
+    result = {}
+    incomplete = []
+    for doc, group in zip(docs, strings):
+        result[doc["section"]] = _replace(doc.get("content", {}), translations)
+        if any(text_hash(s) in failed for s in group):
+            incomplete.append(doc["section"])
+
+    complete = [doc for doc in docs if doc["section"] not in incomplete]
+    if save and complete:
+        now = datetime.now(timezone.utc).isoformat()
+        await db.site_content.bulk_write([
+            UpdateOne(
+                {"content_id": doc["content_id"]},
+                {"$set": {f"translations.{target_language}": result[doc["section"]], "updated_at": now}}
+            )
+            for doc in complete
+        ], ordered=False)
+    return result, incomplete
+
+
+async def generate_copy_batch(prompts: list, content_type: str = "general") -> list:
+    """
+    Generate marketing copy for several prompts, reusing cached results.
+
+    Each prompt is its own request, run at most AI_TEXT_CONCURRENCY at a time.
+    Results are cached by (sha256 of the prompt, content_type); errors are not.
+    """
+    by_hash = {text_hash(p): p for p in prompts}
+    generated = await _cached("copy", content_type, list(by_hash))
+
+    async def run(h: str):
+        async with _ai_limit:
+            return h, await generate_copy(by_hash[h], content_type)
+
+    results = await asyncio.gather(*(run(h) for h in by_hash if h not in generated))
+    fresh = {h: text for h, text in results if not text.startswith("Error")}
+    await _store("copy", content_type, fresh)
+
+    generated.update(dict(results))
+    return [generated[text_hash(p)] for p in prompts]
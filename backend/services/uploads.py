@@ -0,0 +1,156 @@
+import uuid
+import logging
+from datetime import datetime, timezone
+from fastapi import HTTPException
+
+from config import MEDIA_NOTIFICATION_URL
+from database import db
+from cloudinary_helper import sign_direct_upload, get_media
+from services.cache import invalidate
+from services.media_index import index_asset
+
+logger = logging.getLogger(__name__)
+
+# What a direct upload may be used for: resource type, folder, accepted
+# formats, and whether the target is a room type the asset is attached to.
+UPLOAD_TARGETS = {
+    "room_image": {
+        "resource_type": "image",
+        "folder": "rooms/{target_id}",
+        "allowed_formats": "jpg,jpeg,png,webp",
+        "format": "webp",
+        "room": True
+    },
+    "room_video": {
+        "resource_type": "video",
+        "folder": "rooms/{target_id}/videos",
+        "allowed_formats": "mp4,mov,mpeg",
+        "room": True
+    },
+    "gallery": {
+        "resource_type": "image",
+        "folder": "gallery/{target_id}",
+        "allowed_formats": "jpg,jpeg,png,webp",
+        "format": "webp",
+        "room": False
+    },
+    "content": {
+        "resource_type": "image",
+        "folder": "content/{target_id}",
+        "allowed_formats": "jpg,jpeg,png,webp",
+        "room": False
+    }
+}
+
+
+async def create_upload_intent(kind: str, target_id: str, user: dict) -> dict:
+    """
+    Record a pending upload and sign the browser's direct upload for it.
+
+    Args:
+        kind: One of UPLOAD_TARGETS
+        target_id: room_type_id for room uploads, category/section otherwise
+        user: Admin creating the upload
+
+    Returns:
+        Dictionary with intent_id, resource_type, upload_url and form fields
+    """
+    target = UPLOAD_TARGETS.get(kind)
+    if not target:
+        raise HTTPException(status_code=400, detail=f"Unknown upload kind: {kind}")
+    if not target_id:
+        raise HTTPException(status_code=400, detail="Upload target is required")
+
+    if target["room"]:
+        room = await db.room_types.find_one({"room_type_id": target_id}, {"_id": 1})
+        if not room:
+            raise HTTPException(status_code=404, detail="Room type not found")
+
+    intent_id = str(uuid.uuid4())
+    folder = target["folder"].format(target_id=target_id)
+    public_id = f"spencer-green/{folder}/{intent_id}"
+
+    extra_params = {"allowed_formats": target["allowed_formats"]}
+    if target.get("format"):
+        extra_params["format"] = target["format"]
+    if MEDIA_NOTIFICATION_URL:
+        extra_params["notification_url"] = MEDIA_NOTIFICATION_URL
+
+    await db.upload_intents.insert_one({
+        "intent_id": intent_id,
+        "kind": kind,
+        "target_id": target_id,
+        "resource_type": target["resource_type"],
+        "public_id": public_id,
+        "status": "pending",
+        "created_by": user.get("user_id"),
+        "created_at": datetime.now(timezone.utc).isoformat()
+    })
+
+    signed = sign_direct_upload(public_id, target["resource_type"], extra_params)
+    return {
+        "intent_id": intent_id,
+        "resource_type": target["resource_type"],
+        **signed
+    }
+
+
+async def _attach(intent: dict, media: dict):
+    """Attach an uploaded asset to its room. Safe to run more than once."""
+    now = datetime.now(timezone.utc).isoformat()
+    if intent["kind"] == "room_image":
+        # $addToSet: completion and webhook may both deliver the same upload
+        await db.room_types.update_one(
+            {"room_type_id": intent["target_id"]},
+            {"$addToSet": {"images": media["secure_url"]}, "$set": {"updated_at": now}}
+        )
+        invalidate("room_types")
+    elif intent["kind"] == "room_video":
+        await db.room_types.update_one(
+            {"room_type_id": intent["target_id"]},
+            {"$set": {
+                "video_url": media["secure_url"],
+                "video_thumbnail": media.get("thumbnail_url"),
+                "video_public_id": media["public_id"],
+                "updated_at": now
+            }}
+        )
+        invalidate("room_types")
+
+
+async def complete_upload(intent: dict, media: dict = None) -> dict:
+    """
+    Attach a verified upload and mark its intent completed.
+
+    The asset is attached before the intent is marked, and attaching is
+    idempotent, so a crash in between is repaired by the next delivery.
+
+    Args:
+        intent: Pending or completed upload intent
+        media: Asset metadata from a signed webhook; fetched from storage if omitted
+
+    Returns:
+        Media metadata of the attached asset
+    """
+    if intent["status"] == "completed":
+        return intent["media"]
+
+    if media is None:
+        media = await get_media(intent["public_id"], intent["resource_type"])
+
+    await _attach(intent, media)
+    await index_asset(media)
+    await db.upload_intents.update_one(
+        {"intent_id": intent["intent_id"], "status": "pending"},
+        {"$set": {
+            "status": "completed",
+            "media": media,
+            "completed_at": datetime.now(timezone.utc).isoformat()
+        }}
+    )
+    return media
+
+
+async def get_upload_intent(intent_id: str = None, public_id: str = None) -> dict:
+    query = {"intent_id": intent_id} if intent_id else {"public_id": public_id}
+    return await db.upload_intents.find_one(query, {"_id": 0})
@@ -16,13 +16,17 @@ const MediaPicker = ({ onSelect, onClose, onUpload, multiple = false, resourceTy
     const [nextCursor, setNextCursor] = useState(null);
     const [selectedItems, setSelectedItems] = useState([]);
     const [view, setView] = useState('gallery'); // 'gallery' | 'optimizer'
+    const [search, setSearch] = useState('');
 
     const fetchImages = async (cursor = null) => {
         try {
             setLoading(true);
             let url = `${API_URL}/api/media/gallery?resource_type=${resourceType}`;
+            if (search.trim()) {
+                url += `&q=${encodeURIComponent(search.trim())}`;
+            }
             if (cursor) {
-                url += `&next_cursor=${cursor}`;
+                url += `&next_cursor=${encodeURIComponent(cursor)}`;
             }
 
             const response = await fetch(url, {
@@ -56,8 +60,10 @@ const MediaPicker = ({ onSelect, onClose, onUpload, multiple = false, resourceTy
         setImages([]); // Reset images when resourceType changes
         setNextCursor(null);
         setSelectedItems([]);
-        fetchImages();
-    }, [resourceType]);
+        // Debounced so typing a search runs one query against the media index
+        const timer = setTimeout(() => fetchImages(), search ? 300 : 0);
+        return () => clearTimeout(timer);
+    }, [resourceType, search]);
 
     const handleSelect = (image) => {
         if (multiple) {
@@ -133,6 +139,13 @@ const MediaPicker = ({ onSelect, onClose, onUpload, multiple = false, resourceTy
                         ? "Mode: Pilih Banyak (Klik untuk memilih beberapa)"
                         : "Mode: Pilih Satu (Klik untuk memilih)"}
                 </p>
+                <input
+                    type="search"
+                    value={search}
+                    onChange={(e) => setSearch(e.target.value)}
+                    placeholder="Cari media..."
+                    className="text-sm border rounded-md px-2 py-1 w-48"
+                />
                 {multiple && selectedItems.length > 0 && (
                     <span className="text-xs font-medium bg-emerald-100 text-emerald-700 px-2 py-1 rounded-full">
                         {selectedItems.length} terpilih
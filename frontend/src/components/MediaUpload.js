@@ -23,7 +23,9 @@ export const MediaUpload = ({
   showCloudinaryBrowser = true,
   showUrlInput = true,
   cloudinaryResourceType = 'image',
-  onCloseDialog = null
+  onCloseDialog = null,
+  // { kind, targetId }: upload straight to Cloudinary via a signed upload intent
+  directUpload = null
 }) => {
   const { getToken } = useAuth(); // Ensure useAuth is imported or passed. Wait, previous snippet didn't show useAuth import. 
   // Inspecting MediaUpload.js first to see if useAuth is imported.
@@ -268,6 +270,91 @@ export const MediaUpload = ({
     setShowMediaPicker(true);
   };
 
+  // POST a form with upload progress; resolves with the parsed JSON response
+  const postWithProgress = (url, formData, headers, onProgress) => new Promise((resolve, reject) => {
+    const xhr = new XMLHttpRequest();
+
+    xhr.upload.addEventListener('progress', (e) => {
+      if (e.lengthComputable) {
+        onProgress(Math.round((e.loaded / e.total) * 100));
+      }
+    });
+
+    xhr.addEventListener('load', () => {
+      let body = {};
+      try {
+        body = xhr.responseText ? JSON.parse(xhr.responseText) : {};
+      } catch (e) {
+        // Non-JSON error page
+      }
+      if (xhr.status >= 200 && xhr.status < 300) {
+        resolve(body);
+      } else {
+        reject(new Error(body.detail || body.error?.message || 'Upload failed'));
+      }
+    });
+
+    xhr.addEventListener('error', () => reject(new Error('Network error')));
+
+    xhr.open('POST', url);
+    Object.entries(headers).forEach(([key, value]) => xhr.setRequestHeader(key, value));
+    xhr.send(formData);
+  });
+
+  // Signed upload straight to Cloudinary, then confirm it with the backend
+  // Captions are generated in the background; poll the job and report the result
+  const pollCaption = async (jobId, attempt = 0) => {
+    if (attempt >= 30) return;
+    await new Promise(resolve => setTimeout(resolve, 2000));
+    try {
+      const res = await fetch(`${API_URL}/media/caption-jobs/${jobId}`, {
+        headers: { Authorization: `Bearer ${getToken()}` }
+      });
+      if (!res.ok) return;
+      const job = await res.json();
+      if (job.status === 'done') {
+        toast.success(`✨ AI Caption: "${job.caption}"`);
+      } else if (job.status === 'queued' || job.status === 'running') {
+        pollCaption(jobId, attempt + 1);
+      }
+    } catch (err) {
+      console.error('Caption status error:', err);
+    }
+  };
+
+  const uploadDirect = async (file, onProgress) => {
+    const authHeaders = {
+      'Authorization': `Bearer ${getToken()}`,
+      'Content-Type': 'application/json'
+    };
+
+    const intentResponse = await fetch(`${API_URL}/media/upload-intents`, {
+      method: 'POST',
+      headers: authHeaders,
+      body: JSON.stringify({ kind: directUpload.kind, target_id: directUpload.targetId })
+    });
+    const intent = await intentResponse.json();
+    if (!intentResponse.ok) throw new Error(intent.detail || 'Could not start upload');
+
+    const formData = new FormData();
+    Object.entries(intent.fields).forEach(([key, value]) => formData.append(key, value));
+    formData.append('file', file);
+    const uploaded = await postWithProgress(intent.upload_url, formData, {}, onProgress);
+
+    const completeResponse = await fetch(`${API_URL}/media/upload-intents/${intent.intent_id}/complete`, {
+      method: 'POST',
+      headers: authHeaders,
+      body: JSON.stringify({
+        public_id: uploaded.public_id,
+        version: uploaded.version,
+        signature: uploaded.signature
+      })
+    });
+    const completed = await completeResponse.json();
+    if (!completeResponse.ok) throw new Error(completed.detail || 'Could not confirm upload');
+    return completed;
+  };
+
   const uploadFiles = async () => {
     if (files.length === 0) return;
 
@@ -276,65 +363,48 @@ export const MediaUpload = ({
 
     for (let i = 0; i < files.length; i++) {
       const fileData = files[i];
-      const formData = new FormData();
-      formData.append('file', fileData.file);
 
       // Update status to uploading
       setFiles(prev => prev.map((f, idx) =>
         idx === i ? { ...f, status: 'uploading' } : f
       ));
 
-      try {
-        const xhr = new XMLHttpRequest();
-
-        await new Promise((resolve, reject) => {
-          xhr.upload.addEventListener('progress', (e) => {
-            if (e.lengthComputable) {
-              const percent = Math.round((e.loaded / e.total) * 100);
-              setFiles(prev => prev.map((f, idx) =>
-                idx === i ? { ...f, progress: percent } : f
-              ));
-            }
-          });
-
-          xhr.addEventListener('load', () => {
-            if (xhr.status >= 200 && xhr.status < 300) {
-              const response = JSON.parse(xhr.responseText);
-              setFiles(prev => prev.map((f, idx) =>
-                idx === i ? { ...f, status: 'complete', progress: 100 } : f
-              ));
-
-              // Include AI caption in response if available
-              const mediaData = response.data;
-              if (response.ai_caption && response.ai_caption.success) {
-                mediaData.ai_caption = response.ai_caption.caption;
-                mediaData.ai_alt_text = response.ai_caption.alt_text;
-                toast.success(`✨ AI Caption: "${response.ai_caption.caption}"`);
-              }
+      const setProgress = (percent) => setFiles(prev => prev.map((f, idx) =>
+        idx === i ? { ...f, progress: percent } : f
+      ));
 
-              uploadedMedia.push(mediaData);
-              resolve(response);
-            } else {
-              const error = xhr.responseText ? JSON.parse(xhr.responseText).detail : 'Upload failed';
-              setFiles(prev => prev.map((f, idx) =>
-                idx === i ? { ...f, status: 'error', error } : f
-              ));
-              reject(new Error(error));
-            }
-          });
+      try {
+        let response;
+        if (directUpload) {
+          response = await uploadDirect(fileData.file, setProgress);
+        } else {
+          const formData = new FormData();
+          formData.append('file', fileData.file);
+          response = await postWithProgress(
+            `${API_URL}${uploadEndpoint}`, formData, { Authorization: `Bearer ${getToken()}` }, setProgress
+          );
+        }
 
-          xhr.addEventListener('error', () => {
-            setFiles(prev => prev.map((f, idx) =>
-              idx === i ? { ...f, status: 'error', error: 'Network error' } : f
-            ));
-            reject(new Error('Network error'));
-          });
+        setFiles(prev => prev.map((f, idx) =>
+          idx === i ? { ...f, status: 'complete', progress: 100 } : f
+        ));
+
+        // Include AI caption in response if available (cached captions are ready at once)
+        const mediaData = response.data;
+        if (response.ai_caption && response.ai_caption.success) {
+          mediaData.ai_caption = response.ai_caption.caption;
+          mediaData.ai_alt_text = response.ai_caption.alt_text;
+          toast.success(`✨ AI Caption: "${response.ai_caption.caption}"`);
+        } else if (response.ai_caption && response.ai_caption.job_id && response.ai_caption.status === 'queued') {
+          mediaData.caption_job_id = response.ai_caption.job_id;
+          pollCaption(response.ai_caption.job_id);
+        }
 
-          xhr.open('POST', `${API_URL}${uploadEndpoint}`);
-          xhr.setRequestHeader('Authorization', `Bearer ${getToken()}`);
-          xhr.send(formData);
-        });
+        uploadedMedia.push(mediaData);
       } catch (err) {
+        setFiles(prev => prev.map((f, idx) =>
+          idx === i ? { ...f, status: 'error', error: err.message } : f
+        ));
         console.error('Upload error:', err);
       }
     }
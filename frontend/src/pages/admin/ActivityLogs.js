@@ -16,6 +16,9 @@ const ActivityLogs = () => {
     const [isLoading, setIsLoading] = useState(true);
     const [page, setPage] = useState(1);
     const [totalPages, setTotalPages] = useState(1);
+    // cursors[i] fetches page i + 1; filled in as pages are visited
+    const [cursors, setCursors] = useState([null]);
+    const [hasNextPage, setHasNextPage] = useState(false);
     const [selectedLog, setSelectedLog] = useState(null);
     const [filters, setFilters] = useState({
         resource: 'all',
@@ -29,9 +32,11 @@ const ActivityLogs = () => {
         setIsLoading(true);
         try {
             const params = {
-                page: page,
-                limit: 20
+                limit: 20,
+                // Only the first page needs the total
+                count: page === 1 ? 'estimated' : ''
             };
+            if (cursors[page - 1]) params.cursor = cursors[page - 1];
 
             if (filters.resource !== 'all') params.resource = filters.resource;
             if (filters.action !== 'all') params.action = filters.action;
@@ -41,8 +46,17 @@ const ActivityLogs = () => {
                 params
             });
 
-            setLogs(response.data.logs);
-            setTotalPages(response.data.pages);
+            const { logs, next_cursor, pages } = response.data;
+            setLogs(logs);
+            if (pages !== undefined) setTotalPages(Math.max(1, pages));
+            setHasNextPage(!!next_cursor);
+            if (next_cursor) {
+                setCursors(prev => {
+                    const next = prev.slice(0, page);
+                    next[page] = next_cursor;
+                    return next;
+                });
+            }
         } catch (error) {
             console.error('Error fetching logs:', error);
         } finally {
@@ -54,6 +68,12 @@ const ActivityLogs = () => {
         fetchLogs();
     }, [page, filters]);
 
+    const updateFilter = (key, value) => {
+        setFilters(prev => ({ ...prev, [key]: value }));
+        setPage(1);
+        setCursors([null]);
+    };
+
     const getActionColor = (action) => {
         switch (action.toLowerCase()) {
             case 'create': return 'bg-emerald-100 text-emerald-800 border-emerald-200';
@@ -155,7 +175,7 @@ const ActivityLogs = () => {
                         <div className="w-48">
                             <Select
                                 value={filters.resource}
-                                onValueChange={(v) => setFilters(prev => ({ ...prev, resource: v }))}
+                                onValueChange={(v) => updateFilter('resource', v)}
                             >
                                 <SelectTrigger>
                                     <SelectValue placeholder="All Resources" />
@@ -171,7 +191,7 @@ const ActivityLogs = () => {
                         <div className="w-48">
                             <Select
                                 value={filters.action}
-                                onValueChange={(v) => setFilters(prev => ({ ...prev, action: v }))}
+                                onValueChange={(v) => updateFilter('action', v)}
                             >
                                 <SelectTrigger>
                                     <SelectValue placeholder="All Actions" />
@@ -268,8 +288,8 @@ const ActivityLogs = () => {
                             <Button
                                 variant="outline"
                                 size="sm"
-                                onClick={() => setPage(p => Math.min(totalPages, p + 1))}
-                                disabled={page === totalPages}
+                                onClick={() => setPage(p => p + 1)}
+                                disabled={!hasNextPage}
                             >
                                 <ChevronRight className="w-4 h-4" />
                             </Button>
@@ -12,6 +12,7 @@ import { Dialog, DialogContent, DialogHeader, DialogTitle } from '../../componen
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '../../components/ui/table';
 import { Switch } from '../../components/ui/switch';
 import { Checkbox } from '../../components/ui/checkbox';
+import { fetchAllPages } from '../../utils/pagination';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
@@ -40,8 +41,7 @@ const PromoCodes = () => {
 
   const fetchPromoCodes = async () => {
     try {
-      const response = await axios.get(`${API_URL}/admin/promo-codes`);
-      setPromoCodes(response.data);
+      setPromoCodes(await fetchAllPages(`${API_URL}/admin/promo-codes`));
     } catch (error) {
       toast.error('Error fetching promo codes');
     } finally {
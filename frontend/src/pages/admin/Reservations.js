@@ -10,6 +10,7 @@ import { Input } from '../../components/ui/input';
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '../../components/ui/select';
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '../../components/ui/dialog';
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '../../components/ui/table';
+import { fetchPage } from '../../utils/pagination';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
@@ -17,6 +18,8 @@ const Reservations = () => {
   const [reservations, setReservations] = useState([]);
   const [filteredReservations, setFilteredReservations] = useState([]);
   const [isLoading, setIsLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [isLoadingMore, setIsLoadingMore] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
   const [selectedReservation, setSelectedReservation] = useState(null);
@@ -36,18 +39,28 @@ const Reservations = () => {
     }
   }, [showDetailModal]);
 
+  // Search and status are applied by the server, so older reservations are found too
   useEffect(() => {
-    fetchReservations();
-  }, []);
+    const timer = setTimeout(fetchReservations, searchQuery ? 300 : 0);
+    return () => clearTimeout(timer);
+  }, [searchQuery, statusFilter]);
 
   useEffect(() => {
     filterReservations();
   }, [reservations, searchQuery, statusFilter]);
 
+  const listParams = () => {
+    const params = {};
+    if (searchQuery.trim()) params.q = searchQuery.trim();
+    if (statusFilter !== 'all') params.status = statusFilter;
+    return { params };
+  };
+
   const fetchReservations = async () => {
     try {
-      const response = await axios.get(`${API_URL}/admin/reservations`);
-      setReservations(response.data);
+      const page = await fetchPage(`${API_URL}/admin/reservations`, null, listParams());
+      setReservations(page.items);
+      setNextCursor(page.nextCursor);
     } catch (error) {
       toast.error('Error fetching reservations');
     } finally {
@@ -55,6 +68,19 @@ const Reservations = () => {
     }
   };
 
+  const loadMoreReservations = async () => {
+    setIsLoadingMore(true);
+    try {
+      const page = await fetchPage(`${API_URL}/admin/reservations`, nextCursor, listParams());
+      setReservations(prev => [...prev, ...page.items]);
+      setNextCursor(page.nextCursor);
+    } catch (error) {
+      toast.error('Error fetching reservations');
+    } finally {
+      setIsLoadingMore(false);
+    }
+  };
+
   const deleteReservation = async (reservationId) => {
     if (!window.confirm('APAKAH ANDA YAKIN? Data reservasi ini akan dihapus PERMANEN dan tidak bisa dikembalikan.')) {
       return;
@@ -305,6 +331,15 @@ const Reservations = () => {
         </Table>
       </div>
 
+      {nextCursor && (
+        <div className="flex justify-center mt-4">
+          <Button variant="outline" onClick={loadMoreReservations} disabled={isLoadingMore}>
+            {isLoadingMore && <Loader2 className="w-4 h-4 mr-2 animate-spin" />}
+            Muat Lebih Banyak
+          </Button>
+        </div>
+      )}
+
       {/* Detail Modal */}
       <Dialog open={showDetailModal} onOpenChange={setShowDetailModal}>
         <DialogContent className="max-w-lg max-h-[90vh] overflow-y-auto">
@@ -8,6 +8,7 @@ import { useAuth } from '../../context/AuthContext';
 import { Button } from '../../components/ui/button';
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '../../components/ui/table';
 import { Switch } from '../../components/ui/switch';
+import { fetchAllPages } from '../../utils/pagination';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
@@ -23,8 +24,7 @@ const Reviews = () => {
 
   const fetchReviews = async () => {
     try {
-      const response = await axios.get(`${API_URL}/admin/reviews`);
-      setReviews(response.data);
+      setReviews(await fetchAllPages(`${API_URL}/admin/reviews`));
     } catch (error) {
       toast.error('Error fetching reviews');
     } finally {
@@ -17,7 +17,7 @@ const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
 const RoomManagement = () => {
   const [rooms, setRooms] = useState([]);
-  const [inventory, setInventory] = useState([]);
+  const [inventory, setInventory] = useState({ dates: [], rooms: {} });
   const [isLoading, setIsLoading] = useState(true);
   const [showRoomModal, setShowRoomModal] = useState(false);
   const [showDeleteModal, setShowDeleteModal] = useState(false);
@@ -73,7 +73,7 @@ const RoomManagement = () => {
     const endDate = addDays(startDate, days);
 
     try {
-      const response = await axios.get(`${API_URL}/inventory`, {
+      const response = await axios.get(`${API_URL}/inventory/grid`, {
         params: {
           start_date: format(startDate, 'yyyy-MM-dd'),
           end_date: format(endDate, 'yyyy-MM-dd')
@@ -269,7 +269,14 @@ const RoomManagement = () => {
 
   const getInventoryForDate = (roomId, date) => {
     const dateStr = format(date, 'yyyy-MM-dd');
-    return inventory.find(inv => inv.room_type_id === roomId && inv.date === dateStr);
+    const index = inventory.dates.indexOf(dateStr);
+    const columns = inventory.rooms[roomId];
+    if (index < 0 || !columns || columns.allotment[index] === null) return undefined;
+    return {
+      allotment: columns.allotment[index],
+      rate: columns.rate[index],
+      is_closed: columns.is_closed[index]
+    };
   };
 
   const handleCellUpdate = async (roomId, date, field, value) => {
@@ -970,6 +977,7 @@ const RoomManagement = () => {
                 ? `/media/upload/room-image?room_type_id=${editingRoom.room_type_id}&filename=${slugify(roomForm.name)}`
                 : `/media/upload/gallery?category=rooms&filename=${slugify(roomForm.name || 'kamar-baru')}`
             }
+            directUpload={editingRoom ? { kind: 'room_image', targetId: editingRoom.room_type_id } : null}
             acceptedTypes={['image/jpeg', 'image/png', 'image/webp']}
             maxFileSize={10 * 1024 * 1024}
             isMultiple={true}
@@ -993,6 +1001,7 @@ const RoomManagement = () => {
           </DialogHeader>
           <MediaUpload
             uploadEndpoint={editingRoom ? `/media/upload/room-video?room_type_id=${editingRoom.room_type_id}` : "/media/upload/gallery?category=videos"}
+            directUpload={editingRoom ? { kind: 'room_video', targetId: editingRoom.room_type_id } : null}
             acceptedTypes={['video/mp4', 'video/quicktime']}
             maxFileSize={500 * 1024 * 1024}
             title="Upload Room Tour Video"
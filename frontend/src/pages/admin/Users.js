@@ -9,6 +9,7 @@ import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from '.
 import { Dialog, DialogContent, DialogHeader, DialogTitle } from '../../components/ui/dialog';
 import { Table, TableBody, TableCell, TableHead, TableHeader, TableRow } from '../../components/ui/table';
 import { Checkbox } from '../../components/ui/checkbox';
+import { fetchAllPages } from '../../utils/pagination';
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
@@ -62,10 +63,9 @@ const Users = () => {
 
   const fetchUsers = async () => {
     try {
-      const response = await axios.get(`${API_URL}/admin/users`, {
+      setUsers(await fetchAllPages(`${API_URL}/admin/users`, {
         headers: { Authorization: `Bearer ${getToken()}` }
-      });
-      setUsers(response.data);
+      }));
     } catch (error) {
       toast.error('Error fetching users');
     } finally {
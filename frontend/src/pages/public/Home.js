@@ -503,8 +503,10 @@ const Home = () => {
     trackFunnelStep('payment', { room_name: selectedRoom?.name }); // Intent to pay (redirect to WA)
 
     try {
+      const selectedPlan = selectedRoom.rate_plans?.find(p => p.rate_plan_id === bookingForm.rate_plan_id);
       const response = await axios.post(`${API_URL}/reservations`, {
         ...bookingForm,
+        quote_token: selectedPlan?.quote_token || '',
         room_type_id: selectedRoom.room_type_id,
         check_in: format(checkIn, 'yyyy-MM-dd'),
         check_out: format(checkOut, 'yyyy-MM-dd'),
@@ -853,7 +855,9 @@ const Home = () => {
                       <div className="grid grid-cols-1 lg:grid-cols-3">
                         <div className="relative h-64 lg:h-auto overflow-hidden group cursor-pointer" onClick={() => openGallery(room, 0)}>
                           <img
-                            src={room.images?.[0] || 'https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800'}
+                            src={room.image_set?.[0]?.src || room.images?.[0] || 'https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800'}
+                            srcSet={room.image_set?.[0]?.srcset || undefined}
+                            sizes="(max-width: 1024px) 100vw, 33vw"
                             alt={room.name}
                             className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
                           />
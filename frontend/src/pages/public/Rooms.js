@@ -315,7 +315,9 @@ const Rooms = () => {
                   {/* Main Image */}
                   <div className="relative aspect-[4/3] rounded-2xl overflow-hidden group cursor-pointer" onClick={() => openGallery(room, 0)}>
                     <img
-                      src={room.images?.[0] || 'https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800'}
+                      src={room.image_set?.[0]?.src || room.images?.[0] || 'https://images.unsplash.com/photo-1631049307264-da0ec9d70304?w=800'}
+                      srcSet={room.image_set?.[0]?.srcset || undefined}
+                      sizes={room.image_set?.[0]?.sizes}
                       alt={room.name}
                       className="w-full h-full object-cover transition-transform duration-500 group-hover:scale-105"
                     />
@@ -364,7 +366,14 @@ const Rooms = () => {
                             }`}
                           data-testid={`room-thumb-${room.room_type_id}-${imgIdx}`}
                         >
-                          <img src={img} alt={`${room.name} ${imgIdx + 1}`} className="w-full h-full object-cover" />
+                          <img
+                            src={img}
+                            srcSet={room.image_set?.[imgIdx]?.srcset || undefined}
+                            sizes="64px"
+                            loading="lazy"
+                            alt={`${room.name} ${imgIdx + 1}`}
+                            className="w-full h-full object-cover"
+                          />
                         </button>
                       ))}
                       {room.images.length > 5 && (
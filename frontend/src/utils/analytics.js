@@ -25,6 +25,12 @@ export const initAnalytics = () => {
 
 const API_URL = process.env.REACT_APP_BACKEND_URL + '/api';
 
+// Client-side event batching
+const EVENT_BATCH_SIZE = 20;
+const EVENT_FLUSH_DELAY_MS = 2000;
+let pendingEvents = [];
+let flushTimer = null;
+
 /**
  * Track Page View to Backend with Referrer and UTM
  * @param {string} pagePath 
@@ -71,25 +77,49 @@ export const trackEvent = async (eventName, category, label, metadata = {}) => {
         });
     }
 
-    // Backend Tracking
-    try {
-        await fetch(`${API_URL}/analytics/event`, {
-            method: 'POST',
-            headers: {
-                'Content-Type': 'application/json'
-            },
-            body: JSON.stringify({
-                event_name: eventName,
-                category,
-                label,
-                metadata
-            })
-        });
-    } catch (error) {
-        // fail silently
+    // Backend Tracking (batched, see flushEvents)
+    pendingEvents.push({
+        event_name: eventName,
+        category,
+        label,
+        metadata
+    });
+
+    if (pendingEvents.length >= EVENT_BATCH_SIZE) {
+        flushEvents();
+    } else if (!flushTimer) {
+        flushTimer = setTimeout(flushEvents, EVENT_FLUSH_DELAY_MS);
     }
 };
 
+/**
+ * Send queued events to the backend in a single request.
+ * keepalive lets the request finish while the page is being closed.
+ */
+export const flushEvents = () => {
+    if (flushTimer) {
+        clearTimeout(flushTimer);
+        flushTimer = null;
+    }
+    if (pendingEvents.length === 0) return;
+
+    const events = pendingEvents.splice(0, pendingEvents.length);
+    fetch(`${API_URL}/analytics/events`, {
+        method: 'POST',
+        keepalive: true,
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify(events)
+    }).catch(() => {
+        // fail silently
+    });
+};
+
+if (typeof window !== 'undefined') {
+    window.addEventListener('pagehide', flushEvents);
+}
+
 /**
  * Track Funnel Step
  * @param {string} step - 'view_room', 'click_book', 'guest_info', 'payment', 'success'
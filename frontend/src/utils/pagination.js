@@ -0,0 +1,36 @@
+import axios from 'axios';
+
+/**
+ * Fetch one page of a cursor-paginated admin listing.
+ * The backend returns the items as a list and the next page's cursor in X-Next-Cursor.
+ * @param {string} url
+ * @param {string|null} cursor - Cursor from the previous page, null for the first page
+ * @param {object} config - Extra axios config (headers, params)
+ * @returns {Promise<{items: Array, nextCursor: string|null}>}
+ */
+export const fetchPage = async (url, cursor = null, config = {}) => {
+    const params = { ...(config.params || {}) };
+    if (cursor) params.cursor = cursor;
+    const response = await axios.get(url, { ...config, params });
+    return {
+        items: response.data,
+        nextCursor: response.headers['x-next-cursor'] || null
+    };
+};
+
+/**
+ * Fetch every page of a (small) cursor-paginated listing.
+ * @param {string} url
+ * @param {object} config - Extra axios config (headers, params)
+ * @returns {Promise<Array>}
+ */
+export const fetchAllPages = async (url, config = {}) => {
+    const items = [];
+    let cursor = null;
+    do {
+        const page = await fetchPage(url, cursor, config);
+        items.push(...page.items);
+        cursor = page.nextCursor;
+    } while (cursor);
+    return items;
+};
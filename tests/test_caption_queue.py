@@ -0,0 +1,114 @@
+"""
+Spencer Green Hotel - Caption Queue Tests
+Tests background captioning with the deterministic fake model
+Endpoints: /api/media/upload/gallery, /api/media/caption-jobs/{job_id}
+Needs the server running with CAPTION_MODEL=fake and MEDIA_BACKEND=fake
+"""
+import pytest
+import requests
+import os
+import time
+
+# Get BASE_URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+ADMIN_EMAIL = "admin@spencergreenhotel.com"
+ADMIN_PASSWORD = "admin123"
+
+
+@pytest.fixture(scope="module", autouse=True)
+def fake_backends():
+    if os.environ.get("CAPTION_MODEL") != "fake" or os.environ.get("MEDIA_BACKEND") != "fake":
+        pytest.skip("Needs the server running with CAPTION_MODEL=fake and MEDIA_BACKEND=fake")
+
+
+class TestCaptionQueue:
+    """Test caption jobs are queued, deduplicated and served from the cache"""
+
+    @pytest.fixture
+    def auth_headers(self):
+        """Get authentication headers"""
+        response = requests.post(f"{BASE_URL}/api/auth/login", json={
+            "email": ADMIN_EMAIL,
+            "password": ADMIN_PASSWORD
+        })
+        if response.status_code == 200:
+            return {"Authorization": f"Bearer {response.json()['token']}"}
+        pytest.skip("Authentication failed")
+
+    @pytest.fixture
+    def uploaded(self, auth_headers):
+        """public_ids uploaded by a test, deleted afterwards"""
+        public_ids = []
+        yield public_ids
+        for public_id in public_ids:
+            requests.delete(
+                f"{BASE_URL}/api/media/delete",
+                params={"public_id": public_id},
+                headers=auth_headers
+            )
+
+    def _upload(self, content, auth_headers, uploaded):
+        files = {'file': ('caption-test.jpg', content, 'image/jpeg')}
+        response = requests.post(
+            f"{BASE_URL}/api/media/upload/gallery",
+            files=files,
+            params={"category": "tests"},
+            headers=auth_headers
+        )
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}: {response.text}"
+        data = response.json()
+        uploaded.append(data["data"]["public_id"])
+        return data["ai_caption"]
+
+    def _wait(self, job_id, auth_headers, timeout=30):
+        deadline = time.time() + timeout
+        while time.time() < deadline:
+            response = requests.get(f"{BASE_URL}/api/media/caption-jobs/{job_id}", headers=auth_headers)
+            assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+            job = response.json()
+            if job["status"] in ("done", "failed"):
+                return job
+            time.sleep(0.5)
+        pytest.fail(f"Caption job {job_id} did not finish within {timeout}s")
+
+    def test_job_is_queued_and_captioned(self, auth_headers, uploaded):
+        """Test a new image gets a queued job that finishes with the fake caption"""
+        job = self._upload(os.urandom(2048), auth_headers, uploaded)
+        assert job["status"] in ("queued", "running", "done"), f"Unexpected status {job['status']}"
+
+        job = self._wait(job["job_id"], auth_headers)
+        assert job["status"] == "done", f"Job failed: {job['error']}"
+        assert job["success"] is True
+        assert job["caption"].startswith("Spencer Green Hotel gallery ")
+        assert job["alt_text"]
+        print(f"✓ Caption job finished: {job['caption']}")
+
+    def test_identical_images_are_captioned_once(self, auth_headers, uploaded):
+        """Test identical images queued together share one caption"""
+        content = os.urandom(2048)
+        jobs = [self._upload(content, auth_headers, uploaded) for _ in range(3)]
+        assert len({job["job_id"] for job in jobs}) == 3, "Every upload should get its own job"
+
+        finished = [self._wait(job["job_id"], auth_headers) for job in jobs]
+        assert all(job["status"] == "done" for job in finished)
+        assert len({job["caption"] for job in finished}) == 1, "Identical images should share one caption"
+        print("✓ Identical images in flight share one caption")
+
+    def test_repeated_image_is_served_from_cache(self, auth_headers, uploaded):
+        """Test an image captioned before is done at submit time"""
+        content = os.urandom(2048)
+        first = self._wait(self._upload(content, auth_headers, uploaded)["job_id"], auth_headers)
+        assert first["status"] == "done"
+
+        repeat = self._upload(content, auth_headers, uploaded)
+        assert repeat["status"] == "done", f"Expected a cached result, got {repeat['status']}"
+        assert repeat["caption"] == first["caption"]
+        assert repeat["alt_text"] == first["alt_text"]
+        print("✓ Repeated image served from the caption cache")
+
+
+# Run tests if executed directly
+if __name__ == "__main__":
+    pytest.main([__file__, "-v", "--tb=short"])
@@ -0,0 +1,125 @@
+"""
+Spencer Green Hotel - Inventory Concurrency Stress Tests
+Fires parallel bookings at a single-allotment date and checks that the
+allotment hold never oversells. Run against a backend connected to a local
+mongod (REACT_APP_BACKEND_URL).
+"""
+import pytest
+import requests
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+# Get BASE_URL from environment
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+ADMIN_EMAIL = "admin@spencergreenhotel.com"
+ADMIN_PASSWORD = "admin123"
+
+PARALLEL_BOOKINGS = 200
+
+
+@pytest.fixture(scope="module")
+def auth_headers():
+    """Get headers with admin auth token"""
+    response = requests.post(f"{BASE_URL}/api/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    if response.status_code != 200:
+        pytest.skip("Authentication failed - cannot run inventory tests")
+    return {
+        "Authorization": f"Bearer {response.json()['token']}",
+        "Content-Type": "application/json"
+    }
+
+
+@pytest.fixture(scope="module")
+def room_type_id():
+    """Use the first active room type"""
+    response = requests.get(f"{BASE_URL}/api/rooms")
+    if response.status_code != 200 or not response.json():
+        pytest.skip("No rooms available")
+    return response.json()[0]["room_type_id"]
+
+
+def far_future_date(offset_days=0):
+    """Pick a random far-future date so reruns never collide with real bookings"""
+    base = datetime.now() + timedelta(days=3 * 365 + random.randint(0, 3000))
+    return (base + timedelta(days=offset_days)).strftime("%Y-%m-%d")
+
+
+def set_inventory(headers, room_type_id, date, allotment):
+    response = requests.post(f"{BASE_URL}/api/admin/inventory", json={
+        "room_type_id": room_type_id,
+        "date": date,
+        "allotment": allotment,
+        "rate": 1000000,
+        "is_closed": False
+    }, headers=headers)
+    assert response.status_code == 200, f"Set inventory failed: {response.text}"
+
+
+def get_allotment(room_type_id, date):
+    response = requests.get(f"{BASE_URL}/api/inventory", params={
+        "room_type_id": room_type_id,
+        "start_date": date,
+        "end_date": date
+    })
+    assert response.status_code == 200
+    return response.json()[0]["allotment"]
+
+
+def book(room_type_id, check_in, check_out, i):
+    return requests.post(f"{BASE_URL}/api/reservations", json={
+        "guest_name": f"TEST_Concurrency_{i}",
+        "guest_email": f"test_concurrency_{i}@example.com",
+        "guest_phone": "+6281234567890",
+        "room_type_id": room_type_id,
+        "check_in": check_in,
+        "check_out": check_out,
+        "guests": 1
+    }).status_code
+
+
+def fire_bookings(room_type_id, check_in, check_out):
+    with ThreadPoolExecutor(max_workers=50) as pool:
+        return list(pool.map(
+            lambda i: book(room_type_id, check_in, check_out, i),
+            range(PARALLEL_BOOKINGS)
+        ))
+
+
+class TestInventoryConcurrency:
+    """Parallel bookings against POST /api/reservations"""
+
+    def test_single_allotment_never_oversold(self, auth_headers, room_type_id):
+        """Exactly one of many parallel bookings wins the last room"""
+        night = far_future_date()
+        check_out = (datetime.strptime(night, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        set_inventory(auth_headers, room_type_id, night, 1)
+
+        statuses = fire_bookings(room_type_id, night, check_out)
+
+        assert statuses.count(200) == 1, f"Expected exactly one booking, got {statuses.count(200)}"
+        assert statuses.count(400) == PARALLEL_BOOKINGS - 1
+        assert get_allotment(room_type_id, night) == 0
+        print(f"✓ {PARALLEL_BOOKINGS} parallel bookings, 1 succeeded, allotment 0")
+
+    def test_partial_hold_is_rolled_back(self, auth_headers, room_type_id):
+        """Failed multi-night holds give back the nights they already took"""
+        first_night = far_future_date()
+        second_night = (datetime.strptime(first_night, "%Y-%m-%d") + timedelta(days=1)).strftime("%Y-%m-%d")
+        check_out = (datetime.strptime(first_night, "%Y-%m-%d") + timedelta(days=2)).strftime("%Y-%m-%d")
+        set_inventory(auth_headers, room_type_id, first_night, 50)
+        set_inventory(auth_headers, room_type_id, second_night, 1)
+
+        statuses = fire_bookings(room_type_id, first_night, check_out)
+
+        assert statuses.count(200) == 1
+        assert statuses.count(400) == PARALLEL_BOOKINGS - 1, "Every other booking should be refused, not error"
+        assert get_allotment(room_type_id, second_night) == 0
+        assert get_allotment(room_type_id, first_night) == 49, "Rolled back nights must be restored"
+        print("✓ Partial holds rolled back, first night allotment 49")
@@ -7,6 +7,8 @@ import pytest
 import requests
 import os
 import io
+import time
+import hashlib
 
 # Get BASE_URL from environment
 BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
@@ -223,6 +225,53 @@ class TestContentImageUpload:
         print("✓ Content image upload rejects GIF files")
 
 
+class TestCloudinaryWebhook:
+    """Test upload notification signature checks - /api/media/webhooks/cloudinary"""
+    
+    # FakeMediaBackend signing secret (MEDIA_BACKEND=fake)
+    FAKE_SECRET = "fake-media-secret"
+    
+    def _post(self, body, timestamp, signature="invalid"):
+        headers = {"Content-Type": "application/json", "X-Cld-Signature": signature}
+        if timestamp is not None:
+            headers["X-Cld-Timestamp"] = str(timestamp)
+        return requests.post(f"{BASE_URL}/api/media/webhooks/cloudinary", data=body, headers=headers)
+    
+    def test_webhook_missing_timestamp(self):
+        """Test a notification without X-Cld-Timestamp is rejected, not a server error"""
+        response = self._post('{"notification_type": "upload"}', None)
+        assert response.status_code == 401, f"Expected 401, got {response.status_code}"
+    
+    def test_webhook_non_numeric_timestamp(self):
+        """Test a non-numeric X-Cld-Timestamp is rejected, not a server error"""
+        response = self._post('{"notification_type": "upload"}', "yesterday")
+        assert response.status_code == 401, f"Expected 401, got {response.status_code}"
+    
+    def test_webhook_bad_signature(self):
+        """Test a numeric timestamp goes through the verifier and a wrong signature is rejected"""
+        response = self._post('{"notification_type": "upload"}', int(time.time()))
+        assert response.status_code == 401, f"Expected 401, got {response.status_code}"
+    
+    def test_webhook_valid_and_stale(self):
+        """Test a correctly signed notification is accepted and a stale one rejected"""
+        if os.environ.get("MEDIA_BACKEND") != "fake":
+            pytest.skip("Needs the server running with MEDIA_BACKEND=fake")
+        body = '{"notification_type": "resource_tags_changed"}'
+        
+        def sign(ts):
+            return hashlib.sha1(f"{body}{ts}{self.FAKE_SECRET}".encode()).hexdigest()
+        
+        now = int(time.time())
+        response = self._post(body, now, sign(now))
+        assert response.status_code == 200, f"Expected 200, got {response.status_code}"
+        assert response.json()["status"] == "ignored"
+        
+        stale = now - 3 * 3600
+        response = self._post(body, stale, sign(stale))
+        assert response.status_code == 401, f"Expected 401, got {response.status_code}"
+        print("✓ Webhook timestamps are parsed and checked for freshness")
+
+
 # Run tests if executed directly
 if __name__ == "__main__":
     pytest.main([__file__, "-v", "--tb=short"])
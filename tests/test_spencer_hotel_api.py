@@ -188,6 +188,24 @@ class TestAvailabilityEndpoint:
         assert response.status_code == 422
         print("✓ Missing availability params correctly rejected")
 
+    def test_quote_token_is_not_an_auth_token(self):
+        """Test a quote token from /api/availability is rejected as a bearer token"""
+        check_in = (datetime.now() + timedelta(days=7)).strftime("%Y-%m-%d")
+        check_out = (datetime.now() + timedelta(days=9)).strftime("%Y-%m-%d")
+        response = requests.get(
+            f"{BASE_URL}/api/availability",
+            params={"check_in": check_in, "check_out": check_out}
+        )
+        assert response.status_code == 200
+        tokens = [p["quote_token"] for room in response.json() for p in room.get("rate_plans", [])]
+        if not tokens:
+            pytest.skip("No rooms available to quote")
+        
+        headers = {"Authorization": f"Bearer {tokens[0]}"}
+        assert requests.get(f"{BASE_URL}/api/auth/me", headers=headers).status_code == 401
+        assert requests.get(f"{BASE_URL}/api/admin/users", headers=headers).status_code == 401
+        print("✓ Quote tokens are rejected by auth")
+
 
 class TestContentEndpoints:
     """Test content management - /api/content/*"""
@@ -430,6 +448,53 @@ class TestAdminReservations:
             assert res["status"] == "pending"
         print(f"✓ Filtered reservations (pending): {len(data)}")
 
+    def test_reservations_cursor_pagination(self, auth_token):
+        """Test GET /api/admin/reservations pages through X-Next-Cursor without overlap"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        first = requests.get(f"{BASE_URL}/api/admin/reservations", params={"limit": 2}, headers=headers)
+        assert first.status_code == 200
+        assert len(first.json()) <= 2
+
+        cursor = first.headers.get("X-Next-Cursor")
+        if not cursor:
+            pytest.skip("Not enough reservations for a second page")
+
+        second = requests.get(
+            f"{BASE_URL}/api/admin/reservations",
+            params={"limit": 2, "cursor": cursor},
+            headers=headers
+        )
+        assert second.status_code == 200
+        first_ids = {r["reservation_id"] for r in first.json()}
+        assert not first_ids & {r["reservation_id"] for r in second.json()}
+        print(f"✓ Second page: {len(second.json())} reservations")
+
+    def test_reservations_search(self, auth_token):
+        """Test GET /api/admin/reservations?q= finds a reservation by booking code"""
+        headers = {"Authorization": f"Bearer {auth_token}"}
+        data = requests.get(f"{BASE_URL}/api/admin/reservations", params={"limit": 1}, headers=headers).json()
+        if not data:
+            pytest.skip("No reservations to search for")
+        code = data[0]["booking_code"]
+        
+        response = requests.get(
+            f"{BASE_URL}/api/admin/reservations",
+            params={"q": code.lower()},
+            headers=headers
+        )
+        assert response.status_code == 200
+        assert code in [r["booking_code"] for r in response.json()]
+        print(f"✓ Search found {code}")
+
+    def test_reservations_invalid_cursor(self, auth_token):
+        """Test GET /api/admin/reservations rejects a malformed cursor"""
+        response = requests.get(
+            f"{BASE_URL}/api/admin/reservations",
+            params={"cursor": "not-a-cursor"},
+            headers={"Authorization": f"Bearer {auth_token}"}
+        )
+        assert response.status_code == 400
+
 
 class TestAdminUsers:
     """Test admin user management - /api/admin/users/*"""